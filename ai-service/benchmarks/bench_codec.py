@@ -0,0 +1,88 @@
+"""
+Compare encode/decode cost and payload size of the Redis message formats.
+
+The old str(dict) + eval format is measured next to the codec envelopes
+(JSON via orjson or the standard library, msgpack) on ai_results messages
+with a growing number of detected people.
+
+Usage:
+    python benchmarks/bench_codec.py [--people 1 10 50] [--iterations N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codec_utils  # noqa: E402
+from utils.codec_utils import encode_message, decode_message  # noqa: E402
+from utils.detection_utils import JOINT_GROUPS  # noqa: E402
+from utils.result_utils import format_result_data  # noqa: E402
+
+
+def sample_result(people):
+    """ai_results message with every joint of every person visible"""
+    people_data = []
+    for i in range(people):
+        person = {
+            group: {
+                joint: {"x": 100.5 + i + j, "y": 200.25 + i * j, "confidence": 0.91234}
+                for j, joint in enumerate(joints)
+            }
+            for group, joints in JOINT_GROUPS.items()
+        }
+        person["bounding_box"] = {"x1": 10.0 + i, "y1": 20.0, "x2": 110.0 + i, "y2": 320.0}
+        person["confidence"] = 0.87654
+        people_data.append(person)
+    return format_result_data(
+        "cam1_2024-01-01T00-00-00.jpg", "frames", "processed_cam1_2024-01-01T00-00-00.jpg", "yolo-images",
+        "https://minio.example.com/frames/cam1.jpg?X-Amz-Signature=" + "a" * 64,
+        "https://minio.example.com/yolo-images/cam1.jpg?X-Amz-Signature=" + "b" * 64,
+        0.0421, people_data,
+        stage_times={"download": 0.01, "decode": 0.004, "inference": 0.03, "encode": 0.006}
+    )
+
+
+def candidates():
+    """(name, encode, decode) triples to compare"""
+    rows = [
+        ("str + eval (old)", str, eval),
+        ("str + literal_eval", str, decode_message),
+        ("stdlib json", lambda data: json.dumps(data).encode('utf-8'), json.loads),
+        ("envelope json", lambda data: encode_message(data, "json"), decode_message),
+    ]
+    if codec_utils.msgpack is not None:
+        rows.append(("envelope msgpack", lambda data: encode_message(data, "msgpack"), decode_message))
+    return rows
+
+
+def time_call(func, arg, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - start_time) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"JSON backend: {'orjson' if codec_utils.orjson is not None else 'stdlib json'}")
+    for people in args.people:
+        data = sample_result(people)
+        print(f"\n{people} people")
+        print(f"{'format':<22}{'encode us':>12}{'decode us':>12}{'bytes':>10}")
+        for name, encode, decode in candidates():
+            payload = encode(data)
+            assert decode(payload)['detections']['total_persons'] == people
+            encode_time = time_call(encode, data, args.iterations)
+            decode_time = time_call(decode, payload, args.iterations)
+            print(f"{name:<22}{encode_time * 1e6:>12.1f}{decode_time * 1e6:>12.1f}{len(payload):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare encode time and output size of the processed image formats.
+
+Usage:
+    python benchmarks/bench_encoding.py [image ...] [--iterations N]
+
+Without images a synthetic 1080p frame is used.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_utils import encode_image  # noqa: E402
+
+# (format, quality) pairs to compare, quality is the PNG compression level for PNG
+CANDIDATES = [
+    ("png", 3),
+    ("png", 6),
+    ("jpeg", 95),
+    ("jpeg", 85),
+    ("jpeg", 75),
+    ("webp", 85),
+    ("webp", 75)
+]
+
+
+def synthetic_frame(width=1920, height=1080):
+    """Camera-like frame: smooth gradients with sensor noise"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    noise = rng.normal(0, 8, (height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def benchmark(img, iterations):
+    """Encode img with every candidate and collect timing and size"""
+    rows = []
+    for fmt, quality in CANDIDATES:
+        encoded = encode_image(img, fmt, quality)
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            encode_image(img, fmt, quality)
+        elapsed = (time.perf_counter() - start_time) / iterations
+        rows.append((fmt, quality, elapsed * 1000, encoded.getbuffer().nbytes))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="Reference frames to encode")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    frames = [(path, cv2.imread(path, cv2.IMREAD_COLOR)) for path in args.images]
+    if not frames:
+        frames = [("synthetic 1920x1080", synthetic_frame())]
+
+    for name, img in frames:
+        if img is None:
+            print(f"Could not read {name}, skipping")
+            continue
+        print(f"\n{name} ({img.shape[1]}x{img.shape[0]})")
+        print(f"{'format':<8}{'quality':>8}{'encode ms':>12}{'size KiB':>12}{'vs png':>10}")
+        rows = benchmark(img, args.iterations)
+        png_size = rows[0][3]
+        for fmt, quality, encode_ms, size in rows:
+            print(f"{fmt:<8}{quality:>8}{encode_ms:>12.2f}{size / 1024:>12.1f}{size / png_size:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Microbenchmark the stages of process_image with regression thresholds.
+
+Each stage (decode, extract, build, draw, encode) and the whole of
+process_image run on fixed synthetic reference frames at several resolutions
+with 0, 1, 5 and 20 people. A stub model returns fixed detections, so the
+numbers only depend on the code under test and not on the pose model.
+The stub "inference" stage only measures overhead.
+
+For every case the suite reports ops/sec (from the median of the timed
+iterations) and peak traced memory per call (tracemalloc), and exits 1
+when a case is slower or allocates more than the baseline allows. A
+missing baseline file is an error too, unless --save-baseline records it.
+
+Usage:
+    python benchmarks/bench_stages.py [--resolutions 640x480 1920x1080] [--people 0 1 5 20]
+        [--stages decode draw ...] [--iterations N] [--format png] [--json out.json]
+        [--baseline stage_baseline.json] [--save-baseline] [--tolerance 0.2]
+
+Baselines depend on the machine; record them with --save-baseline on the
+machine that runs the check.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import MODEL_CONFIG, OUTPUT_CONFIG  # noqa: E402
+from utils.detection_utils import KEYPOINT_NAMES, extract_detections, build_people_data  # noqa: E402
+from utils.render_utils import draw_detections, draw_legend  # noqa: E402
+from utils.image_utils import decode_image, encode_image, process_image  # noqa: E402
+
+STAGES = ("decode", "inference", "extract", "build", "draw", "encode", "end_to_end")
+DEFAULT_RESOLUTIONS = ("640x480", "1280x720", "1920x1080")
+DEFAULT_PEOPLE = (0, 1, 5, 20)
+
+# Keypoints of a standing person in a unit box, COCO order
+UNIT_SKELETON = np.array([
+    (0.50, 0.08), (0.45, 0.06), (0.55, 0.06), (0.40, 0.08), (0.60, 0.08),
+    (0.30, 0.22), (0.70, 0.22), (0.22, 0.38), (0.78, 0.38), (0.18, 0.52), (0.82, 0.52),
+    (0.38, 0.55), (0.62, 0.55), (0.36, 0.76), (0.64, 0.76), (0.35, 0.96), (0.65, 0.96)
+], dtype=np.float32)
+
+
+class _StubBoxes:
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class _StubKeypoints:
+    def __init__(self, data):
+        self.data = data
+
+
+class _StubResult:
+    def __init__(self, boxes, keypoints):
+        self.boxes = _StubBoxes(boxes)
+        self.keypoints = _StubKeypoints(keypoints)
+
+
+class StubPoseModel:
+    """Returns the same Ultralytics-shaped detections for every image"""
+
+    def __init__(self, boxes, keypoints):
+        self.boxes = boxes
+        self.keypoints = keypoints
+
+    def __call__(self, imgs, **kwargs):
+        count = len(imgs) if isinstance(imgs, list) else 1
+        return [_StubResult(self.boxes, self.keypoints) for _ in range(count)]
+
+
+def reference_people(people, width, height):
+    """
+    Fixed detections laid out on a grid covering the frame.
+
+    Returns:
+        tuple: (box data as (N, 6) x1, y1, x2, y2, confidence, class, keypoints as (N, 17, 3))
+    """
+    rng = np.random.default_rng(people)
+    columns = max(1, int(np.ceil(np.sqrt(people))))
+    rows = max(1, int(np.ceil(people / columns)))
+    cell_w, cell_h = width / columns, height / rows
+    box_data = np.zeros((people, 6), dtype=np.float32)
+    keypoints = np.zeros((people, len(KEYPOINT_NAMES), 3), dtype=np.float32)
+    for i in range(people):
+        x1 = (i % columns) * cell_w + cell_w * 0.2
+        y1 = (i // columns) * cell_h + cell_h * 0.05
+        w, h = cell_w * 0.6, cell_h * 0.9
+        box_data[i] = (x1, y1, x1 + w, y1 + h, 0.9, 0)
+        keypoints[i, :, 0] = x1 + UNIT_SKELETON[:, 0] * w
+        keypoints[i, :, 1] = y1 + UNIT_SKELETON[:, 1] * h
+        # Mostly visible joints with a few below the keypoint threshold
+        keypoints[i, :, 2] = rng.uniform(0.3, 1.0, len(KEYPOINT_NAMES))
+    return box_data, keypoints
+
+
+def reference_frame(width, height):
+    """Camera-like frame with gradients, edges and sensor noise"""
+    rng = np.random.default_rng(width * height)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    img = np.clip(img + rng.normal(0, 8, img.shape), 0, 255).astype(np.uint8)
+    for i in range(12):
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        cv2.rectangle(img, (x0, y0), (x0 + width // 10, y0 + height // 10), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return img
+
+
+def stage_calls(stage, jpeg, img, model, detections):
+    """
+    (setup, call) for one stage. setup() runs untimed before every call and
+    returns its arguments, so in-place stages get a fresh image each time.
+    """
+    boxes, confidences, keypoints = detections
+    results = model(img)
+    if stage == "decode":
+        return (lambda: (jpeg,)), decode_image
+    if stage == "inference":
+        return (lambda: (img,)), model
+    if stage == "extract":
+        return (lambda: (results,)), extract_detections
+    if stage == "build":
+        return (lambda: (boxes, confidences, keypoints)), build_people_data
+
+    if stage == "draw":
+        def draw(frame):
+            draw_detections(frame, boxes, keypoints, MODEL_CONFIG["keypoint_threshold"])
+            draw_legend(frame)
+        return (lambda: (img.copy(),)), draw
+
+    if stage == "encode":
+        annotated = img.copy()
+        draw_detections(annotated, boxes, keypoints, MODEL_CONFIG["keypoint_threshold"])
+        draw_legend(annotated)
+        return (lambda: (annotated,)), encode_image
+
+    if stage == "end_to_end":
+        return (lambda: (jpeg, model)), process_image
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def measure(setup, call, iterations, warmup=3):
+    """
+    Time a stage call by call and trace its memory on one extra call.
+
+    Returns:
+        dict: ops/sec from the median call, mean and p95 ms and peak KiB
+    """
+    for _ in range(warmup):
+        call(*setup())
+
+    durations = []
+    for _ in range(iterations):
+        args = setup()
+        start_time = time.perf_counter()
+        call(*args)
+        durations.append(time.perf_counter() - start_time)
+
+    args = setup()
+    tracemalloc.start()
+    try:
+        call(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = np.array(durations)
+    median = float(np.median(durations))
+    return {
+        'ops_per_sec': 1.0 / median if median > 0 else float('inf'),
+        'median_ms': median * 1000,
+        'mean_ms': float(durations.mean() * 1000),
+        'p95_ms': float(np.percentile(durations, 95) * 1000),
+        'peak_kib': peak / 1024
+    }
+
+
+def run_suite(resolutions, people_counts, stages, iterations):
+    """
+    Measure every (stage, resolution, people) case.
+
+    Returns:
+        dict: Case results keyed by "stage/WxH/people"
+    """
+    cases = {}
+    for resolution in resolutions:
+        width, height = (int(value) for value in resolution.lower().split("x"))
+        img = reference_frame(width, height)
+        jpeg = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        for people in people_counts:
+            model = StubPoseModel(*reference_people(people, width, height))
+            detections = extract_detections(model(img))
+            for stage in stages:
+                if stage == "decode" and people != people_counts[0]:
+                    continue  # decode does not depend on the detections
+                setup, call = stage_calls(stage, jpeg, img, model, detections)
+                key = f"{stage}/{width}x{height}/{people}"
+                cases[key] = measure(setup, call, iterations)
+                result = cases[key]
+                print(f"{key:<28}{result['ops_per_sec']:>12.1f}{result['median_ms']:>11.3f}"
+                      f"{result['p95_ms']:>11.3f}{result['peak_kib']:>12.1f}")
+    return cases
+
+
+def check_regressions(cases, baseline, tolerance, memory_slack_kib=64):
+    """
+    Compare cases against a baseline.
+
+    A case regresses when its ops/sec drop below (1 - tolerance) of the
+    baseline, or its peak memory grows by more than tolerance and more than
+    memory_slack_kib. Cases missing from either side are ignored.
+
+    Returns:
+        list: Human-readable regression descriptions
+    """
+    regressions = []
+    for key, result in sorted(cases.items()):
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if result['ops_per_sec'] < reference['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {result['ops_per_sec']:.1f} ops/s vs baseline {reference['ops_per_sec']:.1f} "
+                f"({(result['ops_per_sec'] / reference['ops_per_sec'] - 1) * 100:+.1f}%)"
+            )
+        growth = result['peak_kib'] - reference['peak_kib']
+        if growth > memory_slack_kib and result['peak_kib'] > reference['peak_kib'] * (1 + tolerance):
+            regressions.append(
+                f"{key}: peak {result['peak_kib']:.0f} KiB vs baseline {reference['peak_kib']:.0f} KiB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--people", nargs="+", type=int, default=list(DEFAULT_PEOPLE))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--format", default=None, help="Output format for encode, defaults to OUTPUT_FORMAT")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", default=os.path.join(os.path.dirname(__file__), "stage_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.exit(1, f"No baseline at {args.baseline}; record one with --save-baseline first\n")
+
+    if args.format:
+        OUTPUT_CONFIG["format"] = args.format
+    print(f"Output format {OUTPUT_CONFIG['format']}, {args.iterations} iteration(s) per case\n")
+    print(f"{'case':<28}{'ops/sec':>12}{'median ms':>11}{'p95 ms':>11}{'peak KiB':>12}")
+    cases = run_suite(args.resolutions, args.people, args.stages, args.iterations)
+    report = {'output_format': OUTPUT_CONFIG["format"], 'iterations': args.iterations, 'cases': cases}
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('output_format') != report['output_format']:
+        print(f"\nBaseline was recorded with output format {baseline.get('output_format')}, "
+              f"encode and end_to_end cases are not comparable")
+        baseline['cases'] = {
+            key: value for key, value in baseline['cases'].items()
+            if not key.startswith(("encode/", "end_to_end/"))
+        }
+    regressions = check_regressions(cases, baseline['cases'], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {args.tolerance * 100:.0f}% of the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Check that the steady-state frame path doesn't grow memory.
+
+Runs a stream of frames through process_image_batch, the way the serial
+loop does, and traces Python and numpy allocations with tracemalloc. After
+an untraced warm-up, which fills the per-camera and per-resolution caches,
+memory is sampled every window of frames:
+
+    retained  traced memory still allocated after the window (gc collected)
+    peak      highest traced memory during the window
+
+The check fails (exit 1) when retained memory grows by more than
+--max-growth-kib over the run, or when the peak of the last window exceeds
+the first window's by more than --peak-tolerance. On failure the allocation
+sites that grew the most are printed.
+
+A stub model returns fixed detections, so only our own code is measured;
+--real-model runs the configured model instead.
+
+Usage:
+    python benchmarks/check_memory.py [--frames 1000] [--warmup 100] [--window 100]
+        [--resolution 1280x720] [--people 5] [--cameras 4] [--batch-size N]
+        [--tracking | --motion-gate] [--real-model] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import MODEL_CONFIG  # noqa: E402
+from utils.image_utils import process_image_batch  # noqa: E402
+from utils.motion_utils import MotionGate  # noqa: E402
+from utils.tracking_utils import KeyframeTracker  # noqa: E402
+from bench_stages import StubPoseModel, reference_people, reference_frame  # noqa: E402
+
+# Distinct frames per camera; frames repeat after that
+FRAME_VARIANTS = 8
+
+
+def camera_frames(width, height, cameras):
+    """JPEG frames per camera, shifted a little from one frame to the next"""
+    base = reference_frame(width, height)
+    frames = {}
+    for camera in range(cameras):
+        frames[f"cam{camera}"] = [
+            cv2.imencode(".jpg", np.roll(base, (camera * 40 + variant * 6, variant * 4), axis=(1, 0)))[1].tobytes()
+            for variant in range(FRAME_VARIANTS)
+        ]
+    return frames
+
+
+def rss_kib():
+    """Resident set size of this process, or None off Linux"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def frame_stream(frames):
+    """Round-robin over cameras, each camera cycling through its frames"""
+    index = 0
+    while True:
+        for camera_id, jpegs in frames.items():
+            yield camera_id, jpegs[index % len(jpegs)]
+        index += 1
+
+
+def run_frames(stream, count, batch_size, model, motion_gate, tracker):
+    """Process count frames in batches and drop the outputs like the serial loop"""
+    done = 0
+    while done < count:
+        batch = [next(stream) for _ in range(min(batch_size, count - done))]
+        outputs = process_image_batch(
+            [jpeg for _, jpeg in batch], model,
+            camera_ids=[camera_id for camera_id, _ in batch],
+            motion_gate=motion_gate,
+            tracker=tracker,
+            keep_results=False
+        )
+        for processed_image, _, people_data in outputs:
+            processed_image.getvalue()
+        done += len(batch)
+
+
+def check_memory(args):
+    width, height = (int(value) for value in args.resolution.split("x"))
+    if args.real_model:
+        from utils.model_utils import initialize_model
+        model = initialize_model()
+    else:
+        model = StubPoseModel(*reference_people(args.people, width, height))
+    motion_gate = MotionGate() if args.motion_gate else None
+    tracker = KeyframeTracker() if args.tracking else None
+    stream = frame_stream(camera_frames(width, height, args.cameras))
+
+    run_frames(stream, args.warmup, args.batch_size, model, motion_gate, tracker)
+    gc.collect()
+
+    tracemalloc.start()
+    first_snapshot = None
+    windows = []
+    done = 0
+    while done < args.frames:
+        count = min(args.window, args.frames - done)
+        tracemalloc.reset_peak()
+        run_frames(stream, count, args.batch_size, model, motion_gate, tracker)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        done += count
+        windows.append({'frames': done, 'retained_kib': retained / 1024, 'peak_kib': peak / 1024, 'rss_kib': rss_kib()})
+        if first_snapshot is None:
+            first_snapshot = tracemalloc.take_snapshot()
+    last_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    growth = windows[-1]['retained_kib'] - windows[0]['retained_kib']
+    peak_ratio = windows[-1]['peak_kib'] / windows[0]['peak_kib'] if windows[0]['peak_kib'] else 1.0
+    failures = []
+    if growth > args.max_growth_kib:
+        failures.append(f"retained memory grew by {growth:.0f}KiB (limit {args.max_growth_kib:.0f}KiB)")
+    if peak_ratio > 1 + args.peak_tolerance:
+        failures.append(f"peak memory grew by {(peak_ratio - 1) * 100:.0f}% (limit {args.peak_tolerance * 100:.0f}%)")
+
+    top_growth = []
+    if failures:
+        for stat in last_snapshot.compare_to(first_snapshot, "lineno")[:10]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            top_growth.append(f"{stat.size_diff / 1024:+.1f}KiB in {stat.count_diff:+d} block(s) "
+                              f"at {frame.filename}:{frame.lineno}")
+
+    return {
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'resolution': args.resolution,
+        'cameras': args.cameras,
+        'batch_size': args.batch_size,
+        'model': 'configured' if args.real_model else f"stub ({args.people} people)",
+        'gating': 'tracking' if tracker else 'motion' if motion_gate else 'none',
+        'windows': windows,
+        'retained_growth_kib': growth,
+        'peak_ratio': peak_ratio,
+        'failures': failures,
+        'top_growth': top_growth
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=1000, help="Frames processed while tracing")
+    parser.add_argument("--warmup", type=int, default=100, help="Untraced frames processed first")
+    parser.add_argument("--window", type=int, default=100, help="Frames per memory sample")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--people", type=int, default=5, help="People returned by the stub model")
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=MODEL_CONFIG["batch_size"])
+    gating = parser.add_mutually_exclusive_group()
+    gating.add_argument("--tracking", action="store_true", help="Run with a KeyframeTracker")
+    gating.add_argument("--motion-gate", action="store_true", help="Run with a MotionGate")
+    parser.add_argument("--real-model", action="store_true", help="Use the configured model instead of the stub")
+    parser.add_argument("--max-growth-kib", type=float, default=512, help="Allowed growth of retained memory")
+    parser.add_argument("--peak-tolerance", type=float, default=0.1, help="Allowed peak growth as a fraction")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = check_memory(args)
+
+    print(f"{report['frames']} frames at {report['resolution']}, {report['cameras']} camera(s), "
+          f"batch {report['batch_size']}, model {report['model']}, gating {report['gating']}")
+    print(f"{'frames':>8}{'retained KiB':>14}{'peak KiB':>12}{'RSS KiB':>12}")
+    for window in report['windows']:
+        rss = window['rss_kib'] if window['rss_kib'] is not None else '-'
+        print(f"{window['frames']:>8}{window['retained_kib']:>14.0f}{window['peak_kib']:>12.0f}{rss:>12}")
+    print(f"\nRetained growth: {report['retained_growth_kib']:+.0f}KiB, peak ratio: {report['peak_ratio']:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote report to {args.json}")
+
+    if report['failures']:
+        print("\nMemory check failed:")
+        for failure in report['failures']:
+            print(f"  {failure}")
+        print("Largest growth since the first window:")
+        for line in report['top_growth']:
+            print(f"  {line}")
+        sys.exit(1)
+    print("Memory check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare the PyTorch and ONNX Runtime pose model backends.
+
+Runs both backends over the same fixed set of frames and reports latency,
+throughput and how far the ONNX detections are from the PyTorch ones.
+
+Usage:
+    python benchmarks/compare_backends.py frames_dir/ [more images ...]
+        [--limit N] [--batch-size N] [--threads N] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import MODEL_CONFIG  # noqa: E402
+from utils.model_utils import initialize_model  # noqa: E402
+from utils.onnx_utils import export_onnx_model, OnnxPoseModel  # noqa: E402
+from utils.eval_utils import (  # noqa: E402
+    load_reference_frames,
+    compare_detections,
+    summarize_comparisons,
+    time_model,
+    latency_summary
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Reference frames or directories of frames")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most N frames")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="onnxruntime intra-op threads")
+    parser.add_argument("--model", default=MODEL_CONFIG["path"], help="PyTorch .pt model")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    frames = load_reference_frames(args.paths, args.limit)
+    if not frames:
+        parser.error("No readable frames found")
+    print(f"Comparing backends on {len(frames)} frame(s), batch size {args.batch_size}")
+
+    torch_model = initialize_model(args.model, backend="torch")
+    onnx_model = OnnxPoseModel(export_onnx_model(args.model), intra_op_threads=args.threads)
+
+    report = {'frames': len(frames), 'batch_size': args.batch_size, 'backends': {}}
+    detections = {}
+    for name, model in (("torch", torch_model), ("onnx", onnx_model)):
+        detections[name], latencies, throughput = time_model(model, frames, batch_size=args.batch_size)
+        report['backends'][name] = dict(latency_summary(latencies), throughput_fps=throughput)
+
+    comparisons = [
+        compare_detections(reference, candidate)
+        for reference, candidate in zip(detections["torch"], detections["onnx"])
+    ]
+    report['agreement'] = summarize_comparisons(comparisons)
+    report['speedup'] = report['backends']['onnx']['throughput_fps'] / report['backends']['torch']['throughput_fps']
+
+    print(f"\n{'backend':<8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'fps':>10}")
+    for name, stats in report['backends'].items():
+        print(f"{name:<8}{stats['mean_ms']:>10.1f}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['throughput_fps']:>10.2f}")
+    print(f"\nONNX speed-up: {report['speedup']:.2f}x")
+    print("\nONNX vs PyTorch detections:")
+    for key, value in report['agreement'].items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
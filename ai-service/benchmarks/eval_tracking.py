@@ -0,0 +1,159 @@
+"""
+Measure keyframe tracking against per-frame detection on a recorded clip.
+
+The model runs once on every frame of the clip to get reference
+detections. The clip is then replayed through run_inference with a
+KeyframeTracker for each keyframe interval. Keyframes reuse the reference
+results, so every difference comes from tracking. For each interval the
+report has inference calls saved, tracking cost, and the drift of the
+tracked people from the per-frame detections: recall, IoU and keypoint
+error, overall and by the number of frames since the last keyframe.
+
+Usage:
+    python benchmarks/eval_tracking.py clip.mp4|frames_dir/ [--intervals 2 5 10] [--limit N]
+        [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_utils import initialize_model  # noqa: E402
+from utils.detection_utils import extract_detections  # noqa: E402
+from utils.eval_utils import (  # noqa: E402
+    load_reference_frames,
+    compare_detections,
+    summarize_comparisons,
+    latency_summary
+)
+from utils.image_utils import run_inference  # noqa: E402
+from utils.tracking_utils import KeyframeTracker  # noqa: E402
+
+CAMERA_ID = "clip"
+
+
+class ReplayModel:
+    """Returns the precomputed results of the frame being replayed"""
+
+    def __init__(self):
+        self.results = None
+        self.calls = 0
+
+    def __call__(self, imgs, **kwargs):
+        self.calls += 1
+        return [self.results] * (len(imgs) if isinstance(imgs, list) else 1)
+
+
+def load_clip(path, limit=None):
+    """Frames of a video file or an ordered directory of images"""
+    if os.path.isdir(path):
+        return load_reference_frames([path], limit)
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while limit is None or len(frames) < limit:
+        ok, img = capture.read()
+        if not ok:
+            break
+        frames.append((f"frame_{len(frames):06d}", img))
+    capture.release()
+    return frames
+
+
+def evaluate_interval(frames, reference_results, reference_detections, interval):
+    """Replay the clip with one keyframe interval and compare against per-frame detection"""
+    tracker = KeyframeTracker(interval=interval)
+    model = ReplayModel()
+    comparisons = []
+    by_distance = defaultdict(list)
+    track_times = []
+    track_ids = set()
+    distance = 0
+    for (_, img), results, reference in zip(frames, reference_results, reference_detections):
+        model.results = results
+        calls = model.calls
+        timings = {}
+        _, detections, ids = run_inference([img], model, [timings], camera_ids=[CAMERA_ID], tracker=tracker)[0]
+        distance = 0 if model.calls > calls else distance + 1
+        if distance:
+            track_times.append(timings.get('track', 0.0))
+        track_ids.update(ids or [])
+        comparison = compare_detections(reference, detections)
+        comparisons.append(comparison)
+        by_distance[distance].append(comparison)
+
+    stats = tracker.get_stats()['cameras'].get(CAMERA_ID, {})
+    return {
+        'interval': interval,
+        'inference_calls': model.calls,
+        'inference_calls_saved': len(frames) - model.calls,
+        'lost': stats.get('lost', 0),
+        'track_ms': float(np.mean(track_times) * 1000) if track_times else 0.0,
+        'unique_track_ids': len(track_ids),
+        'drift': summarize_comparisons(comparisons),
+        'drift_by_distance': {
+            str(distance): summarize_comparisons(items) for distance, items in sorted(by_distance.items())
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clip", help="Video file or directory of frames in order")
+    parser.add_argument("--intervals", nargs="+", type=int, default=[2, 5, 10])
+    parser.add_argument("--limit", type=int, default=None, help="Use at most N frames")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    frames = load_clip(args.clip, args.limit)
+    if not frames:
+        parser.error("No readable frames found")
+
+    model = initialize_model()
+    print(f"Running per-frame detection on {len(frames)} frame(s)")
+    model([frames[0][1]])  # warm-up
+    reference_results, latencies = [], []
+    for _, img in frames:
+        start_time = time.perf_counter()
+        reference_results.append(model([img])[0])
+        latencies.append(time.perf_counter() - start_time)
+    reference_detections = [extract_detections([results]) for results in reference_results]
+    report = {
+        'frames': len(frames),
+        'inference': latency_summary(latencies),
+        'intervals': [
+            evaluate_interval(frames, reference_results, reference_detections, interval)
+            for interval in args.intervals
+        ]
+    }
+
+    inference_ms = report['inference']['mean_ms']
+    print(f"\nPer-frame inference: {inference_ms:.1f}ms mean")
+    print(f"\n{'K':>4}{'calls':>8}{'saved':>8}{'lost':>6}{'track ms':>10}{'recall':>8}{'IoU':>7}"
+          f"{'kpt px':>8}{'p95 px':>8}{'ids':>6}")
+    for result in report['intervals']:
+        drift = result['drift']
+        print(f"{result['interval']:>4}{result['inference_calls']:>8}{result['inference_calls_saved']:>8}"
+              f"{result['lost']:>6}{result['track_ms']:>10.2f}{drift['recall']:>8.3f}{drift['mean_iou']:>7.3f}"
+              f"{drift['mean_keypoint_error_px']:>8.1f}{drift['p95_keypoint_error_px']:>8.1f}"
+              f"{result['unique_track_ids']:>6}")
+    for result in report['intervals']:
+        print(f"\nK={result['interval']} drift by frames since keyframe:")
+        for distance, drift in result['drift_by_distance'].items():
+            print(f"  {distance:>3}: recall {drift['recall']:.3f}, IoU {drift['mean_iou']:.3f}, "
+                  f"keypoint error {drift['mean_keypoint_error_px']:.1f}px")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote report to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
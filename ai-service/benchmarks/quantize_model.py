@@ -0,0 +1,114 @@
+"""
+Build and gate the INT8 pose model.
+
+"build" writes the quantized variant next to the FP32 ONNX export, using
+frames from the MinIO frames bucket to calibrate static quantization.
+"evaluate" runs the FP32 and INT8 models over the same frames, reports
+latency, throughput and detection agreement, and exits with status 1 when
+recall/precision or keypoint error fall outside the configured gate, so it
+can guard MODEL_QUANTIZATION rollouts.
+
+Usage:
+    python benchmarks/quantize_model.py build [--mode static] [--bucket frames] [--limit N]
+    python benchmarks/quantize_model.py evaluate [--mode static] [frames_dir/ ...]
+        [--bucket frames] [--limit N] [--batch-size N] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import MODEL_CONFIG, QUANTIZATION_CONFIG  # noqa: E402
+from utils.onnx_utils import export_onnx_model, OnnxPoseModel  # noqa: E402
+from utils.eval_utils import load_reference_frames  # noqa: E402
+from utils.quantization_utils import (  # noqa: E402
+    QUANTIZATION_MODES,
+    quantize_model,
+    get_quantized_model_path,
+    load_calibration_frames,
+    evaluate_quantized_model
+)
+
+
+def build(args):
+    onnx_path = export_onnx_model(args.model)
+    calibration_frames = None
+    if args.mode == "static":
+        calibration_frames = load_calibration_frames(args.bucket, args.limit)
+        if not calibration_frames:
+            sys.exit("No calibration frames found")
+    quantize_model(onnx_path, args.mode, calibration_frames)
+
+
+def evaluate(args):
+    if args.paths:
+        frames = load_reference_frames(args.paths, args.limit)
+    else:
+        frames = load_calibration_frames(args.bucket, args.limit)
+    if not frames:
+        sys.exit("No readable frames found")
+
+    onnx_path = export_onnx_model(args.model)
+    quantized_path = get_quantized_model_path(onnx_path, args.mode)
+    if not os.path.exists(quantized_path):
+        sys.exit(f"{quantized_path} not found, run the build command first")
+    print(f"Evaluating {quantized_path} against {onnx_path} on {len(frames)} frame(s)")
+
+    report, passed = evaluate_quantized_model(
+        OnnxPoseModel(onnx_path), OnnxPoseModel(quantized_path), frames,
+        min_recall=args.min_recall, max_keypoint_error=args.max_keypoint_error,
+        batch_size=args.batch_size, min_precision=args.min_precision
+    )
+    report['mode'] = args.mode
+
+    print(f"\n{'model':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'fps':>10}")
+    for name in ('reference', 'quantized'):
+        stats = report[name]
+        print(f"{name:<10}{stats['mean_ms']:>10.1f}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['throughput_fps']:>10.2f}")
+    print(f"\nINT8 speed-up: {report['speedup']:.2f}x")
+    print("\nINT8 vs FP32 detections:")
+    for key, value in report['agreement'].items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote report to {args.json}")
+
+    if not passed:
+        print("\nAccuracy gate FAILED: " + "; ".join(report['gate']['failures']))
+        sys.exit(1)
+    print("\nAccuracy gate passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Write the quantized model")
+    evaluate_parser = subparsers.add_parser("evaluate", help="Compare the quantized model with FP32")
+    for subparser in (build_parser, evaluate_parser):
+        subparser.add_argument("--mode", choices=QUANTIZATION_MODES, default="static")
+        subparser.add_argument("--model", default=MODEL_CONFIG["path"], help="PyTorch .pt model")
+        subparser.add_argument("--bucket", default=None, help="MinIO bucket to read frames from")
+        subparser.add_argument("--limit", type=int, default=QUANTIZATION_CONFIG["calibration_frames"])
+
+    evaluate_parser.add_argument("paths", nargs="*", help="Frames or directories, defaults to the bucket")
+    evaluate_parser.add_argument("--batch-size", type=int, default=1)
+    evaluate_parser.add_argument("--min-recall", type=float, default=None)
+    evaluate_parser.add_argument("--min-precision", type=float, default=None)
+    evaluate_parser.add_argument("--max-keypoint-error", type=float, default=None)
+    evaluate_parser.add_argument("--json", help="Write the report to this file")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build(args)
+    else:
+        evaluate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,62 @@
 import time
+
+_import_start_time = time.perf_counter()
+
+import argparse
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 # Import our utility modules
 from utils import (
     process_image,
-    ensure_bucket_exists,
+    process_image_batch,
+    ensure_buckets_exist,
     get_minio_url,
     minio_client,
     MINIO_BUCKET,
     MINIO_BUCKET_PROCESSED,
     MINIO_BUCKET_PROCESSED_TEST,
+    MINIO_BUCKET_BACKFILL,
     initialize_redis,
     initialize_model,
     format_result_data,
     format_error_data,
     publish_result,
     REDIS_CHANNEL_INPUT,
-    REDIS_CHANNEL_OUTPUT
+    REDIS_CHANNEL_OUTPUT,
+    REDIS_CONFIG,
+    MODEL_CONFIG,
+    PIPELINE_CONFIG,
+    MOTION_CONFIG,
+    RESOLUTION_CONFIG,
+    TRACKING_CONFIG,
+    WORKER_CONFIG,
+    FramePipeline,
+    run_backfill,
+    WorkerPool,
+    prepare_worker_model,
+    MotionGate,
+    AdaptiveResolution,
+    RegionsOfInterest,
+    KeyframeTracker,
+    create_transport,
+    parse_frame_message,
+    load_frame,
+    upload_processed_image,
+    publish_frame_result,
+    publish_frame_error,
+    start_metrics_server,
+    startup_phase,
+    record_startup_phase,
+    warm_up_model,
+    set_ready,
+    TRANSPORT_LAG,
+    QUEUE_DEPTH
 )
 
+_import_time = time.perf_counter() - _import_start_time
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,84 +64,316 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize YOLO model
-model = initialize_model()
+# Loaded by startup() so importing this module stays cheap
+model = None
+motion_gate = None
+resolution = None
+regions = None
+tracker = None
+
+
+def startup(batch_size=1, warmup=True):
+    """
+    Load and warm up the model and check the buckets, timing every phase.
+    
+    The bucket checks run in the background while the model loads. Frames
+    should only be consumed, and the service reported ready, once this returns.
+    """
+    global model, motion_gate, resolution, regions, tracker
+    durations = {}
+    record_startup_phase('imports', _import_time, durations)
+    start_time = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        buckets = executor.submit(
+            ensure_buckets_exist, [MINIO_BUCKET, MINIO_BUCKET_PROCESSED, MINIO_BUCKET_PROCESSED_TEST]
+        )
+        with startup_phase('model_load', durations):
+            model = initialize_model()
+        resolution = create_resolution_controller(model)
+        if warmup:
+            with startup_phase('warmup', durations):
+                warm_up_model(model, batch_size=batch_size, sizes=resolution.sizes if resolution else None)
+        with startup_phase('buckets_wait', durations):
+            bucket_status = buckets.result()
+    
+    failed = [bucket for bucket, ready in bucket_status.items() if not ready]
+    if failed:
+        logger.warning(f"Could not set up bucket(s): {', '.join(failed)}")
+    
+    # Skip inference on frames whose camera view hasn't changed
+    motion_gate = MotionGate() if MOTION_CONFIG["enabled"] else None
+    # Run the model on keyframes only and track people in between
+    tracker = KeyframeTracker() if TRACKING_CONFIG["enabled"] else None
+    if tracker and motion_gate:
+        logger.warning("MOTION_GATE_ENABLED is ignored when keyframe tracking is enabled")
+        motion_gate = None
+    # Only run inference inside each camera's regions of interest
+    regions = RegionsOfInterest() or None
+    
+    record_startup_phase('total', _import_time + time.perf_counter() - start_time, durations)
+    logger.info(
+        "Startup complete: " + ", ".join(f"{phase}={duration * 1000:.0f}ms" for phase, duration in durations.items())
+    )
+    return durations
 
-# Ensure all required buckets exist
-ensure_bucket_exists(MINIO_BUCKET)
-ensure_bucket_exists(MINIO_BUCKET_PROCESSED)
-ensure_bucket_exists(MINIO_BUCKET_PROCESSED_TEST)
 
+def create_resolution_controller(model):
+    """Adaptive inference size controller, if enabled and the model supports it"""
+    if not RESOLUTION_CONFIG["adaptive"]:
+        return None
+    if not getattr(model, 'dynamic_shape', True):
+        logger.warning("ADAPTIVE_IMGSZ needs an ONNX model exported with dynamic shapes, running at a fixed size")
+        return None
+    return AdaptiveResolution()
+
+def collect_batch(transport, batch_size, max_wait, idle_timeout=0.1):
+    """
+    Collect up to batch_size frame messages from the input transport.
+    
+    The batch is closed as soon as it is full or max_wait seconds have passed
+    since its first message arrived. Waits at most idle_timeout seconds for
+    the first message and returns an empty list if none arrives.
+    
+    Returns:
+        tuple: (entries, wait_time) where entries are (entry_id, data) tuples
+               and wait_time is the time spent waiting for the batch to fill
+               after its first message
+    """
+    entries = []
+    first_message_time = None
+    timeout = idle_timeout
+    
+    while len(entries) < batch_size:
+        new_entries = transport.read(batch_size - len(entries), timeout=timeout)
+        if new_entries:
+            entries.extend(new_entries)
+            if first_message_time is None:
+                first_message_time = time.time()
+        elif first_message_time is None:
+            # Nothing arrived and the batch hasn't started yet
+            break
+        
+        timeout = first_message_time + max_wait - time.time()
+        if timeout <= 0:
+            break
+    
+    wait_time = time.time() - first_message_time if first_message_time else 0.0
+    return entries, wait_time
+
+def process_batch(r, transport, entries, wait_time=0.0):
+    """Download, run batched inference on, upload and publish a batch of frames"""
+    try:
+        _process_batch(r, entries, wait_time)
+    finally:
+        # Every frame has a published result or error by now. A worker that
+        # dies mid-batch never gets here, so its entries stay pending until
+        # another consumer reclaims them
+        transport.ack([entry_id for entry_id, _ in entries])
+
+def _process_batch(r, entries, wait_time=0.0):
+    """Process a batch of (entry_id, data) entries without acknowledging them"""
+    frames = []
+    
+    for _, data in entries:
+        filename = None
+        timings = {}
+        try:
+            frame_info = parse_frame_message(data)
+            bucket = frame_info['bucket']
+            filename = frame_info['filename']
+            camera_id = frame_info.get('camera_id')
+            
+            # Get image data from MinIO
+            image_data = load_frame(frame_info, timings, r)
+            frames.append((bucket, filename, camera_id, image_data, timings))
+            
+        except Exception as e:
+            logger.error(f"Error fetching image: {e}", exc_info=True)
+            publish_frame_error(r, filename, e, stage='download')
+    
+    if not frames:
+        return
+    
+    # Run one forward pass for the whole batch
+    start_time = time.time()
+    try:
+        outputs = process_image_batch(
+            [image_data for _, _, _, image_data, _ in frames], model,
+            timings=[timings for _, _, _, _, timings in frames],
+            camera_ids=[camera_id for _, _, camera_id, _, _ in frames],
+            motion_gate=motion_gate,
+            resolution=resolution,
+            regions=regions,
+            tracker=tracker,
+            keep_results=False
+        )
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}", exc_info=True)
+        for _, filename, _, _, _ in frames:
+            publish_frame_error(r, filename, e, stage='process')
+        return
+    batch_time = time.time() - start_time
+    processing_time = batch_time / len(frames)
+    
+    for (bucket, filename, _, _, timings), output in zip(frames, outputs):
+        if output is None:
+            publish_frame_error(r, filename, ValueError("Failed to decode image"), stage='process')
+            continue
+        processed_image, _, people_data = output
+        try:
+            # Upload processed image and publish results
+            processed_filename = upload_processed_image(filename, processed_image, timings=timings)
+            publish_frame_result(
+                r, filename, bucket, processed_filename, MINIO_BUCKET_PROCESSED,
+                processing_time, people_data, timings=timings
+            )
+            
+        except Exception as e:
+            logger.error(f"Error processing image: {e}", exc_info=True)
+            publish_frame_error(r, filename, e, stage='upload')
+    
+    logger.info(
+        f"Batch stats: size={len(frames)}/{MODEL_CONFIG['batch_size']} "
+        f"fill_wait={wait_time * 1000:.1f}ms "
+        f"inference={batch_time * 1000:.1f}ms "
+        f"per_frame={processing_time * 1000:.1f}ms "
+        f"throughput={len(frames) / batch_time:.2f} fps"
+    )
+
+def run_pipeline(r, transport, batch_size):
+    """Feed frames from the transport into the staged pipeline"""
+    pipeline = FramePipeline(
+        r, transport, model, batch_size=batch_size, motion_gate=motion_gate,
+        resolution=resolution, regions=regions, tracker=tracker
+    )
+    pipeline.start()
+    for name, stage_queue in pipeline.queues.items():
+        QUEUE_DEPTH.set_function(stage_queue.qsize, queue=name)
+    
+    stats_interval = PIPELINE_CONFIG["stats_interval"]
+    next_stats_time = time.time() + stats_interval
+    
+    while True:
+        try:
+            # Blocks while the pipeline is full, so unread frames stay in Redis
+            for entry_id, data in transport.read(batch_size, timeout=0.1):
+                pipeline.submit(entry_id, data)
+            
+            if time.time() >= next_stats_time:
+                logger.info(f"Pipeline stats: {pipeline.get_stats()}")
+                logger.info(f"Transport stats: {transport.get_stats()}")
+                if motion_gate:
+                    logger.info(f"Motion gate stats: {motion_gate.get_stats()}")
+                if resolution:
+                    logger.info(f"Inference size stats: {resolution.get_stats()}")
+                if regions:
+                    logger.info(f"Region of interest stats: {regions.get_stats()}")
+                if tracker:
+                    logger.info(f"Tracking stats: {tracker.get_stats()}")
+                next_stats_time = time.time() + stats_interval
+                
+        except Exception as e:
+            logger.error(f"Error reading frames: {e}", exc_info=True)
+            time.sleep(1)  # Wait before retrying
+
+def init_worker(index, torch_threads):
+    """Per-process setup run in each forked inference worker"""
+    global model
+    model = prepare_worker_model(model, torch_threads)
+    if tracker:
+        # Keep track ids unique across workers
+        tracker.set_id_namespace(index, WORKER_CONFIG["processes"])
+    warm_up_model(
+        model, batch_size=max(1, MODEL_CONFIG["batch_size"]), sizes=resolution.sizes if resolution else None
+    )
+
+def run_workers(transport, batch_size, max_wait):
+    """Hand frames from the transport to forked inference worker processes"""
+    pool = WorkerPool(
+        transport, _process_batch, batch_size=batch_size, max_wait=max_wait, worker_init=init_worker
+    )
+    pool.start()
+    ready = False
+    
+    stats_interval = WORKER_CONFIG["stats_interval"]
+    next_stats_time = time.time() + stats_interval
+    
+    try:
+        while True:
+            try:
+                for entry_id, data in transport.read(batch_size, timeout=0.1):
+                    pool.submit(entry_id, data)
+                pool.poll()
+                # Ready once every worker has loaded and warmed up its model,
+                # and again after a restarted worker has
+                if pool.all_ready() != ready:
+                    ready = pool.all_ready()
+                    set_ready(ready)
+                
+                if time.time() >= next_stats_time:
+                    logger.info(f"Worker stats: {pool.get_stats()}")
+                    logger.info(f"Transport stats: {transport.get_stats()}")
+                    next_stats_time = time.time() + stats_interval
+                    
+            except Exception as e:
+                logger.error(f"Error dispatching frames: {e}", exc_info=True)
+                time.sleep(1)  # Wait before retrying
+    finally:
+        pool.stop()
 
 def main():
     """Main function to process images from Redis queue"""
     logger.info("Starting AI service")
+    start_metrics_server()
+    
+    batch_size = max(1, MODEL_CONFIG["batch_size"])
+    max_wait = MODEL_CONFIG["batch_max_wait_ms"] / 1000.0
+    logger.info(f"Batching up to {batch_size} frame(s), waiting at most {max_wait * 1000:.0f}ms")
+    # Forked workers warm up their own model: running inference here first
+    # would start torch's OpenMP pool, which does not survive fork
+    use_workers = WORKER_CONFIG["processes"] > 1
+    startup(batch_size, warmup=not use_workers)
     
     try:
         # Initialize Redis
         r = initialize_redis()
         
-        # Subscribe to the frames channel
-        pubsub = r.pubsub()
-        pubsub.subscribe(REDIS_CHANNEL_INPUT)
-        logger.info(f"Subscribed to {REDIS_CHANNEL_INPUT} channel")
+        # Subscribe to the frames channel or stream
+        transport = create_transport(r, REDIS_CHANNEL_INPUT)
+        TRANSPORT_LAG.set_function(lambda: transport.get_stats().get('lag'))
+        if use_workers:
+            if PIPELINE_CONFIG["enabled"]:
+                logger.warning("PIPELINE_ENABLED is ignored when running multiple worker processes")
+            # run_workers reports ready once the workers have warmed up
+            run_workers(transport, batch_size, max_wait)
+            return
+        set_ready()
+        if PIPELINE_CONFIG["enabled"]:
+            run_pipeline(r, transport, batch_size)
+            return
+        
+        stats_interval = REDIS_CONFIG["streams"]["stats_interval"]
+        next_stats_time = time.time() + stats_interval
         
         while True:
             try:
-                message = pubsub.get_message()
-                if message and message['type'] == 'message':
-                    data = message['data'].decode('utf-8')
-                    try:
-                        frame_info = eval(data)  # Parse the message data
-                        
-                        # Extract frame information
-                        bucket = frame_info.get('bucket', MINIO_BUCKET)
-                        filename = frame_info.get('filename')
-                        
-                        if not filename:
-                            logger.error("No filename in message")
-                            continue
-                            
-                        logger.info(f"Processing frame: {filename} from bucket: {bucket}")
-                        
-                        # Get image data from MinIO
-                        image_data = minio_client.get_object(bucket, filename).read()
-                        
-                        # Process image
-                        start_time = time.time()
-                        processed_image, results, people_data = process_image(image_data, model)
-                        processing_time = time.time() - start_time
-                        
-                        # Upload processed image
-                        processed_filename = f"processed_{filename}"
-                        original_url = get_minio_url(bucket, filename)
-                        processed_url = get_minio_url(MINIO_BUCKET_PROCESSED, processed_filename)
-                        minio_client.put_object(
-                            MINIO_BUCKET_PROCESSED,
-                            processed_filename,
-                            processed_image,
-                            processed_image.getbuffer().nbytes,
-                            content_type='image/png'
-                        )
-                        logger.info(f"Uploaded processed image to {MINIO_BUCKET_PROCESSED}: {processed_filename}")
-                        
-                        # Format and publish results
-                        result_data = format_result_data(
-                            filename, bucket, processed_filename, MINIO_BUCKET_PROCESSED,
-                            original_url, processed_url, processing_time, people_data
-                        )
-                        publish_result(r, REDIS_CHANNEL_OUTPUT, result_data)
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing image: {e}", exc_info=True)
-                        # Publish error
-                        error_data = format_error_data(
-                            filename if 'filename' in locals() else None, 
-                            e
-                        )
-                        publish_result(r, REDIS_CHANNEL_OUTPUT, error_data)
+                entries, wait_time = collect_batch(transport, batch_size, max_wait)
+                if entries:
+                    process_batch(r, transport, entries, wait_time)
                 
-                time.sleep(0.1)  # Prevent CPU spinning
+                # Periodically report consumer lag
+                if time.time() >= next_stats_time:
+                    logger.info(f"Transport stats: {transport.get_stats()}")
+                    if motion_gate:
+                        logger.info(f"Motion gate stats: {motion_gate.get_stats()}")
+                    if resolution:
+                        logger.info(f"Inference size stats: {resolution.get_stats()}")
+                    if regions:
+                        logger.info(f"Region of interest stats: {regions.get_stats()}")
+                    if tracker:
+                        logger.info(f"Tracking stats: {tracker.get_stats()}")
+                    next_stats_time = time.time() + stats_interval
                 
             except Exception as e:
                 logger.error(f"Error processing message: {e}", exc_info=True)
@@ -117,6 +386,7 @@ def main():
 def test_process_images():
     """Test function to process all images in frames bucket"""
     logger.info("Starting test: Processing all images in frames bucket")
+    startup()
     
     try:
         # Initialize Redis
@@ -145,16 +415,11 @@ def test_process_images():
                 processing_time = time.time() - start_time
                 
                 # Upload processed image
-                processed_filename = f"test_processed_{filename}"
+                processed_filename = upload_processed_image(
+                    filename, processed_image, MINIO_BUCKET_PROCESSED_TEST, prefix="test_processed_"
+                )
                 original_url = get_minio_url(MINIO_BUCKET, filename)
                 processed_url = get_minio_url(MINIO_BUCKET_PROCESSED_TEST, processed_filename)
-                minio_client.put_object(
-                    MINIO_BUCKET_PROCESSED_TEST,
-                    processed_filename,
-                    processed_image,
-                    processed_image.getbuffer().nbytes,
-                    content_type='image/png'
-                )
                 
                 logger.info(f"Original image: {original_url}")
                 logger.info(f"Processed image: {processed_url}")
@@ -188,10 +453,51 @@ def test_process_images():
     except Exception as e:
         logger.error(f"Test function error: {e}", exc_info=True)
 
+def _parse_time(value):
+    """Parse an ISO 8601 time for the backfill filters, assuming UTC when no zone is given"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def backfill(argv):
+    """Reprocess historical frames into a separate bucket"""
+    parser = argparse.ArgumentParser(prog="main.py backfill", description=backfill.__doc__)
+    parser.add_argument("--source-bucket", default=MINIO_BUCKET)
+    parser.add_argument("--target-bucket", default=MINIO_BUCKET_BACKFILL)
+    parser.add_argument("--prefix", default="", help="Only frames whose name starts with this prefix")
+    parser.add_argument("--since", type=_parse_time, help="Only frames stored at or after this ISO time")
+    parser.add_argument("--until", type=_parse_time, help="Only frames stored before this ISO time")
+    parser.add_argument("--checkpoint", default=None, help="Progress file used to resume interrupted runs")
+    parser.add_argument("--io-workers", type=int, default=None)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=MODEL_CONFIG["batch_size"])
+    parser.add_argument("--limit", type=int, default=None, help="Stop after N frames")
+    parser.add_argument("--no-count", action="store_true", help="Skip the counting pass (no ETA)")
+    parser.add_argument("--results-channel", default=None,
+                        help="Publish results to this channel; never use the live ai_results channel")
+    args = parser.parse_args(argv)
+    
+    if args.results_channel == REDIS_CHANNEL_OUTPUT:
+        parser.error(f"Refusing to publish backfill results to the live {REDIS_CHANNEL_OUTPUT} channel")
+    
+    logger.info("Starting backfill")
+    batch_size = max(1, args.batch_size)
+    startup(batch_size)
+    r = initialize_redis() if args.results_channel else None
+    run_backfill(
+        model, args.source_bucket, args.target_bucket,
+        prefix=args.prefix, since=args.since, until=args.until,
+        checkpoint_path=args.checkpoint,
+        io_workers=args.io_workers, render_workers=args.render_workers,
+        batch_size=batch_size, limit=args.limit, count_first=not args.no_count,
+        redis_client=r, result_channel=args.results_channel
+    )
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         test_process_images()
+    elif len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        backfill(sys.argv[2:])
     else:
         main()
 
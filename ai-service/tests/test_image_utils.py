@@ -0,0 +1,72 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_utils import process_image_batch  # noqa: E402
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class _Keypoints:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Result:
+    def __init__(self, boxes, keypoints):
+        self.boxes = _Boxes(boxes)
+        self.keypoints = _Keypoints(keypoints)
+
+
+class StubModel:
+    """One person per image, recording how many images each call got"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, imgs, **kwargs):
+        self.batch_sizes.append(len(imgs))
+        boxes = np.array([[10, 10, 50, 90, 0.9, 0]], dtype=np.float32)
+        keypoints = np.full((1, 17, 3), 0.9, dtype=np.float32)
+        keypoints[0, :, 0] = 30
+        keypoints[0, :, 1] = 50
+        return [_Result(boxes, keypoints) for _ in imgs]
+
+
+def _jpeg():
+    img = np.random.default_rng(0).integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+def test_corrupt_frame_fails_only_itself():
+    model = StubModel()
+    good = _jpeg()
+
+    outputs = process_image_batch([good, b"garbage", good], model, camera_ids=["a", "b", "c"])
+
+    assert len(outputs) == 3
+    assert outputs[1] is None
+    for output in (outputs[0], outputs[2]):
+        processed_image, _, people_data = output
+        assert processed_image.getvalue()
+        assert len(people_data) == 1
+    assert model.batch_sizes == [2]
+
+
+def test_all_corrupt_batch_skips_the_model():
+    model = StubModel()
+
+    outputs = process_image_batch([b"garbage", b""], model)
+
+    assert outputs == [None, None]
+    assert model.batch_sizes == []
@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.transport_utils import LatestFrameTransport  # noqa: E402
+
+
+class FakeTransport:
+    """Stream-like transport that returns queued entries and records acks"""
+
+    def __init__(self):
+        self.entries = []
+        self.acked = []
+
+    def read(self, count, timeout=0.0):
+        entries, self.entries = self.entries[:count], self.entries[count:]
+        return entries
+
+    def ack(self, entry_ids):
+        self.acked.extend(entry_ids)
+        return len(entry_ids)
+
+    def release(self, entry_ids):
+        pass
+
+    def get_stats(self):
+        return {}
+
+
+def _frame(camera_id):
+    return json.dumps({'camera_id': camera_id}).encode('utf-8')
+
+
+def test_redelivered_in_flight_entry_is_not_handed_out_again():
+    inner = FakeTransport()
+    transport = LatestFrameTransport(inner, max_drain=10)
+
+    inner.entries = [(b'1-0', _frame('cam1'))]
+    assert [entry_id for entry_id, _ in transport.read(1)] == [b'1-0']
+
+    # XAUTOCLAIM returns the entry again while it is still being processed
+    inner.entries = [(b'1-0', _frame('cam1'))]
+    assert transport.read(1) == []
+    assert inner.acked == []
+    assert transport.dropped == {}
+
+    transport.ack([b'1-0'])
+    assert inner.acked == [b'1-0']
+
+
+def test_released_entry_is_processed_when_redelivered():
+    inner = FakeTransport()
+    transport = LatestFrameTransport(inner, max_drain=10)
+
+    inner.entries = [(b'1-0', _frame('cam1'))]
+    transport.read(1)
+    transport.release([b'1-0'])
+
+    inner.entries = [(b'1-0', _frame('cam1'))]
+    assert [entry_id for entry_id, _ in transport.read(1)] == [b'1-0']
+
+
+def test_newer_frame_supersedes_buffered_one():
+    inner = FakeTransport()
+    transport = LatestFrameTransport(inner, max_drain=10)
+
+    inner.entries = [(b'1-0', _frame('cam1')), (b'2-0', _frame('cam1'))]
+    assert [entry_id for entry_id, _ in transport.read(5)] == [b'2-0']
+    assert inner.acked == [b'1-0']
+    assert transport.dropped == {'cam1': 1}
@@ -1,53 +1,258 @@
 # This file makes the utils directory a Python package
-from .image_utils import process_image
+from .image_utils import (
+    process_image,
+    process_image_batch,
+    decode_image,
+    decode_frame,
+    run_inference,
+    annotate_image,
+    annotate_detections,
+    encode_image,
+    get_output_format,
+    OUTPUT_FORMATS
+)
+from .detection_utils import (
+    extract_detections,
+    scale_detections,
+    build_people_data,
+    KEYPOINT_NAMES,
+    JOINT_GROUPS
+)
+from .render_utils import (
+    draw_detections,
+    draw_legend,
+    SKELETON_CONNECTIONS
+)
 from .minio_utils import (
     ensure_bucket_exists, 
+    ensure_buckets_exist,
     get_minio_url, 
+    reset_minio_connections,
     minio_client,
+    url_signer,
     MINIO_BUCKET, 
     MINIO_BUCKET_PROCESSED, 
-    MINIO_BUCKET_PROCESSED_TEST
+    MINIO_BUCKET_PROCESSED_TEST,
+    MINIO_BUCKET_BACKFILL
 )
 from .redis_utils import (
     initialize_redis,
     REDIS_CHANNEL_INPUT,
     REDIS_CHANNEL_OUTPUT
 )
+from .transport_utils import (
+    PubSubTransport,
+    StreamTransport,
+    LatestFrameTransport,
+    create_transport
+)
 from .model_utils import initialize_model
+from .onnx_utils import export_onnx_model, OnnxPoseModel
+from .quantization_utils import (
+    quantize_model,
+    ensure_quantized_model,
+    evaluate_quantized_model,
+    load_calibration_frames
+)
+from .eval_utils import (
+    load_reference_frames,
+    compare_detections,
+    summarize_comparisons
+)
+from .codec_utils import encode_message, decode_message
+from .url_utils import UrlSigner
 from .result_utils import (
     format_result_data,
     format_error_data,
     publish_result
 )
-from .config import MINIO_CONFIG, REDIS_CONFIG, MODEL_CONFIG
+from .frame_utils import (
+    parse_frame_message,
+    fetch_frame,
+    load_frame,
+    get_processed_filename,
+    upload_processed_image,
+    publish_frame_result,
+    publish_frame_error
+)
+from .pipeline_utils import FramePipeline, StageStats
+from .backfill_utils import BackfillProgress, run_backfill
+from .worker_utils import WorkerPool, configure_threads, get_thread_counts, prepare_worker_model
+from .motion_utils import MotionGate
+from .resolution_utils import AdaptiveResolution, jpeg_dimensions, reduced_decode_factor
+from .roi_utils import RegionsOfInterest, load_region_config
+from .tracking_utils import KeyframeTracker, parse_camera_intervals
+from .metrics_utils import (
+    start_metrics_server,
+    stage_timer,
+    record_stage,
+    registry,
+    STAGE_DURATION,
+    FRAMES_PROCESSED,
+    FRAME_ERRORS,
+    FRAMES_DROPPED,
+    QUEUE_DEPTH,
+    TRANSPORT_LAG,
+    STARTUP_DURATION,
+    READY,
+    set_ready,
+    is_ready
+)
+from .startup_utils import startup_phase, record_startup_phase, warm_up_model
+from .config import MINIO_CONFIG, URL_CONFIG, REDIS_CONFIG, MODEL_CONFIG, CODEC_CONFIG, QUANTIZATION_CONFIG, BACKPRESSURE_CONFIG, MOTION_CONFIG, TRACKING_CONFIG, RESOLUTION_CONFIG, ROI_CONFIG, RENDER_CONFIG, OUTPUT_CONFIG, PIPELINE_CONFIG, BACKFILL_CONFIG, WORKER_CONFIG, METRICS_CONFIG
 
 __all__ = [
     # Image processing
     'process_image',
+    'process_image_batch',
+    'decode_image',
+    'decode_frame',
+    'run_inference',
+    'annotate_image',
+    'annotate_detections',
+    'encode_image',
+    'get_output_format',
+    'OUTPUT_FORMATS',
+    
+    # Detection extraction
+    'extract_detections',
+    'scale_detections',
+    'build_people_data',
+    'KEYPOINT_NAMES',
+    'JOINT_GROUPS',
+    
+    # Annotation rendering
+    'draw_detections',
+    'draw_legend',
+    'SKELETON_CONNECTIONS',
     
     # MinIO utilities
     'ensure_bucket_exists',
+    'ensure_buckets_exist',
     'get_minio_url',
+    'reset_minio_connections',
     'minio_client',
+    'url_signer',
     'MINIO_BUCKET',
     'MINIO_BUCKET_PROCESSED',
     'MINIO_BUCKET_PROCESSED_TEST',
+    'MINIO_BUCKET_BACKFILL',
     
     # Redis utilities
     'initialize_redis',
     'REDIS_CHANNEL_INPUT',
     'REDIS_CHANNEL_OUTPUT',
     
+    # Transport utilities
+    'PubSubTransport',
+    'StreamTransport',
+    'LatestFrameTransport',
+    'create_transport',
+    
     # Model utilities
     'initialize_model',
+    'export_onnx_model',
+    'OnnxPoseModel',
+    
+    # Quantization
+    'quantize_model',
+    'ensure_quantized_model',
+    'evaluate_quantized_model',
+    'load_calibration_frames',
+    
+    # Model evaluation
+    'load_reference_frames',
+    'compare_detections',
+    'summarize_comparisons',
+    
+    # Object URLs
+    'UrlSigner',
+    
+    # Message codec
+    'encode_message',
+    'decode_message',
     
     # Result utilities
     'format_result_data',
     'format_error_data',
     'publish_result',
     
+    # Frame utilities
+    'parse_frame_message',
+    'fetch_frame',
+    'load_frame',
+    'get_processed_filename',
+    'upload_processed_image',
+    'publish_frame_result',
+    'publish_frame_error',
+    
+    # Pipeline utilities
+    'FramePipeline',
+    'StageStats',
+    
+    # Backfill
+    'BackfillProgress',
+    'run_backfill',
+    
+    # Worker processes
+    'WorkerPool',
+    'configure_threads',
+    'get_thread_counts',
+    'prepare_worker_model',
+    
+    # Motion gating
+    'MotionGate',
+    
+    # Inference resolution
+    'AdaptiveResolution',
+    'jpeg_dimensions',
+    'reduced_decode_factor',
+    
+    # Regions of interest
+    'RegionsOfInterest',
+    'load_region_config',
+    
+    # Keyframe tracking
+    'KeyframeTracker',
+    'parse_camera_intervals',
+    
+    # Metrics utilities
+    'start_metrics_server',
+    'stage_timer',
+    'record_stage',
+    'registry',
+    'STAGE_DURATION',
+    'FRAMES_PROCESSED',
+    'FRAME_ERRORS',
+    'FRAMES_DROPPED',
+    'QUEUE_DEPTH',
+    'TRANSPORT_LAG',
+    'STARTUP_DURATION',
+    'READY',
+    'set_ready',
+    'is_ready',
+    
+    # Startup
+    'startup_phase',
+    'record_startup_phase',
+    'warm_up_model',
+    
     # Configuration
     'MINIO_CONFIG',
+    'URL_CONFIG',
     'REDIS_CONFIG',
-    'MODEL_CONFIG'
+    'MODEL_CONFIG',
+    'CODEC_CONFIG',
+    'QUANTIZATION_CONFIG',
+    'BACKPRESSURE_CONFIG',
+    'MOTION_CONFIG',
+    'TRACKING_CONFIG',
+    'RESOLUTION_CONFIG',
+    'ROI_CONFIG',
+    'RENDER_CONFIG',
+    'OUTPUT_CONFIG',
+    'PIPELINE_CONFIG',
+    'BACKFILL_CONFIG',
+    'WORKER_CONFIG',
+    'METRICS_CONFIG'
 ]
@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from .config import BACKFILL_CONFIG
+from .minio_utils import minio_client, ensure_bucket_exists
+from .pipeline_utils import FramePipeline
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillProgress:
+    """
+    Completed objects and the resumable checkpoint of a backfill run.
+
+    Objects are listed in key order but finish out of order. The checkpoint
+    is the last key up to which every listed object has finished, so a run
+    resumed with start_after=checkpoint never skips unfinished work (at most
+    a few objects that finished after it are processed again).
+
+    Acts as the transport of the backfill's FramePipeline, which
+    acknowledges every entry, processed or failed, through ack(), and
+    reports failures through fail() first. Failed objects don't hold the
+    checkpoint back; they are saved with it and retried when the run is
+    resumed.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.checkpoint = None
+        self.previously_completed = 0
+        self.completed = 0
+        self.errors = 0
+        self.skipped = 0
+        self.listed = 0
+        self._pending = deque()
+        self._done = set()
+        # Keys that failed and haven't been processed since, saved with the checkpoint
+        self.failed = set()
+        self._failures = set()
+        self._retrying = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Resume from the checkpoint file if it was written for the same parameters"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('params') != self.params:
+            logger.warning(f"Checkpoint {self.path} is for a different backfill, starting from the beginning")
+            return None
+        self.checkpoint = state.get('checkpoint')
+        self.previously_completed = state.get('completed', 0)
+        self.failed = set(state.get('failed', []))
+        logger.info(
+            f"Resuming backfill after {self.checkpoint} ({self.previously_completed} frame(s) already done, "
+            f"{len(self.failed)} failed)"
+        )
+        return self.checkpoint
+
+    def save(self):
+        """Atomically write the checkpoint file"""
+        if not self.path:
+            return
+        with self._lock:
+            state = {
+                'params': self.params,
+                'checkpoint': self.checkpoint,
+                'completed': self.previously_completed + self.completed,
+                'failed': sorted(self.failed),
+                'updated_at': datetime.now().isoformat()
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, key):
+        """Register a listed object that is about to be processed"""
+        with self._lock:
+            self._pending.append(key)
+            self.listed += 1
+
+    def skip(self, key):
+        """Register a listed object that the filters excluded"""
+        with self._lock:
+            self._pending.append(key)
+            self._done.add(key)
+            self.skipped += 1
+            self._advance()
+
+    def retry(self):
+        """
+        Register the failed objects at or before the checkpoint for processing again.
+
+        Failed objects after the checkpoint are listed again anyway.
+
+        Returns:
+            list: Keys to resubmit
+        """
+        with self._lock:
+            if self.checkpoint is None:
+                return []
+            keys = sorted(key for key in self.failed if key <= self.checkpoint)
+            self._retrying.update(keys)
+            self.listed += len(keys)
+        return keys
+
+    def fail(self, key):
+        """Register a failed object, ahead of its ack()"""
+        with self._lock:
+            self._failures.add(key)
+
+    def ack(self, entry_ids):
+        """Mark objects finished and move the checkpoint forward"""
+        with self._lock:
+            for key in entry_ids:
+                if key in self._failures:
+                    self._failures.discard(key)
+                    self.failed.add(key)
+                    self.errors += 1
+                else:
+                    self.failed.discard(key)
+                    self.completed += 1
+                if key in self._retrying:
+                    # Already behind the checkpoint
+                    self._retrying.discard(key)
+                else:
+                    self._done.add(key)
+            self._advance()
+        return len(entry_ids)
+
+    def _advance(self):
+        while self._pending and self._pending[0] in self._done:
+            key = self._pending.popleft()
+            self._done.discard(key)
+            self.checkpoint = key
+
+    def in_flight(self):
+        """Objects submitted but not finished yet"""
+        with self._lock:
+            return self.listed - self.completed - self.errors
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'checkpoint': self.checkpoint,
+                'completed': self.completed + self.errors,
+                'skipped': self.skipped,
+                'in_flight': self.listed - self.completed - self.errors
+            }
+
+
+def _in_time_range(obj, since=None, until=None):
+    """Whether an object's last-modified time falls in [since, until)"""
+    if since is None and until is None:
+        return True
+    last_modified = obj.last_modified
+    if last_modified is None:
+        return False
+    return (since is None or last_modified >= since) and (until is None or last_modified < until)
+
+
+def iter_backfill_objects(bucket, prefix="", start_after=None):
+    """Stream the object listing page by page instead of loading it into memory"""
+    for obj in minio_client.list_objects(bucket, prefix=prefix, recursive=True, start_after=start_after):
+        if not obj.is_dir:
+            yield obj
+
+
+def count_backfill_objects(bucket, prefix="", since=None, until=None, start_after=None):
+    """Count the objects a backfill will process, for the ETA"""
+    return sum(
+        1 for obj in iter_backfill_objects(bucket, prefix, start_after)
+        if _in_time_range(obj, since, until)
+    )
+
+
+def _log_progress(progress, pipeline, total, start_time):
+    """Log throughput, failures and the ETA"""
+    stats = progress.get_stats()
+    failed = sum(stage['errors'] for stage in pipeline.get_stats()['stages'].values())
+    elapsed = time.time() - start_time
+    throughput = stats['completed'] / elapsed if elapsed > 0 else 0.0
+    message = (
+        f"Backfill: {stats['completed']} done ({failed} failed), {stats['skipped']} skipped, "
+        f"{stats['in_flight']} in flight, {throughput:.2f} frames/s"
+    )
+    if total is not None:
+        remaining = max(0, total - stats['completed'])
+        eta = remaining / throughput if throughput > 0 else float('inf')
+        message += f", {stats['completed']}/{total} ({stats['completed'] / total * 100 if total else 100:.1f}%)"
+        if eta != float('inf'):
+            message += f", ETA {timedelta(seconds=int(eta))}"
+    logger.info(message)
+    return dict(stats, failed=failed, throughput_fps=throughput, elapsed=elapsed)
+
+
+def run_backfill(model, source_bucket, target_bucket, prefix="", since=None, until=None,
+                 checkpoint_path=None, io_workers=None, render_workers=None, queue_size=None,
+                 batch_size=1, limit=None, count_first=True, redis_client=None, result_channel=None):
+    """
+    Reprocess historical frames from source_bucket into target_bucket.
+
+    Downloads, inference and uploads overlap in a FramePipeline. Results are
+    not published unless result_channel is given, so a backfill never floods
+    the live ai_results channel.
+
+    Args:
+        model: Loaded pose model
+        source_bucket: Bucket holding the original frames
+        target_bucket: Bucket the processed images are written to
+        prefix: Only reprocess objects whose key starts with prefix
+        since, until: Only reprocess objects last modified in [since, until),
+                      as timezone-aware datetimes
+        checkpoint_path: Progress file; an existing one for the same
+                         parameters is resumed
+        limit: Stop after submitting this many frames
+        count_first: Count matching objects up front so the report has an ETA
+        redis_client, result_channel: Publish results to this channel
+
+    Returns:
+        dict: Final progress report
+    """
+    checkpoint_path = checkpoint_path if checkpoint_path is not None else BACKFILL_CONFIG["checkpoint_path"]
+    params = {
+        'source_bucket': source_bucket,
+        'target_bucket': target_bucket,
+        'prefix': prefix,
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat() if until else None
+    }
+    progress = BackfillProgress(checkpoint_path, params)
+    start_after = progress.load()
+    ensure_bucket_exists(target_bucket)
+
+    total = None
+    if count_first:
+        total = count_backfill_objects(source_bucket, prefix, since, until, start_after)
+        if limit:
+            total = min(total, limit)
+        logger.info(f"Backfilling {total} frame(s) from {source_bucket}/{prefix} into {target_bucket}")
+
+    pipeline = FramePipeline(
+        redis_client, progress, model,
+        io_workers=io_workers or BACKFILL_CONFIG["io_workers"],
+        render_workers=render_workers or BACKFILL_CONFIG["render_workers"],
+        queue_size=queue_size or BACKFILL_CONFIG["queue_size"],
+        batch_size=batch_size,
+        processed_bucket=target_bucket,
+        result_channel=result_channel,
+        on_failure=progress.fail
+    )
+    pipeline.start()
+
+    start_time = time.time()
+    next_checkpoint_time = start_time + BACKFILL_CONFIG["checkpoint_interval"]
+    next_report_time = start_time + BACKFILL_CONFIG["report_interval"]
+
+    def periodic():
+        nonlocal next_checkpoint_time, next_report_time
+        now = time.time()
+        if now >= next_checkpoint_time:
+            progress.save()
+            next_checkpoint_time = now + BACKFILL_CONFIG["checkpoint_interval"]
+        if now >= next_report_time:
+            _log_progress(progress, pipeline, total, start_time)
+            next_report_time = now + BACKFILL_CONFIG["report_interval"]
+
+    retries = progress.retry()
+    if retries:
+        logger.info(f"Retrying {len(retries)} frame(s) that failed before the checkpoint")
+    for key in retries:
+        pipeline.submit(key, {'bucket': source_bucket, 'filename': key})
+
+    submitted = 0
+    for obj in iter_backfill_objects(source_bucket, prefix, start_after):
+        if limit and submitted >= limit:
+            break
+        if not _in_time_range(obj, since, until):
+            progress.skip(obj.object_name)
+            continue
+        progress.add(obj.object_name)
+        pipeline.submit(obj.object_name, {'bucket': source_bucket, 'filename': obj.object_name})
+        submitted += 1
+        periodic()
+
+    # Let the pipeline drain
+    while progress.in_flight() > 0:
+        time.sleep(0.1)
+        periodic()
+
+    progress.save()
+    report = _log_progress(progress, pipeline, total, start_time)
+    logger.info(f"Backfill finished, checkpoint at {progress.checkpoint}")
+    if progress.failed:
+        logger.warning(f"{len(progress.failed)} frame(s) failed and will be retried when the backfill is resumed")
+    return report
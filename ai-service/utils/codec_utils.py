@@ -0,0 +1,125 @@
+"""
+Message codec shared by ai-service and frame-service.
+
+Every Redis payload is a small versioned envelope: a 4-byte header naming
+the codec, followed by the encoded body.
+
+    b"NF1j" + JSON      fast JSON (orjson when installed)
+    b"NF1m" + msgpack   compact binary
+
+Messages without a header are legacy payloads from before the codec: JSON,
+or the str(dict) format that used to be parsed with eval. They are decoded
+with json and ast.literal_eval, never eval.
+
+This module is kept identical in both services; change them together.
+"""
+import ast
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from .config import CODEC_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CODEC_VERSION = 1
+CODEC_MAGIC = b"NF"
+HEADER_SIZE = 4
+JSON_HEADER = CODEC_MAGIC + str(CODEC_VERSION).encode('ascii') + b"j"
+MSGPACK_HEADER = CODEC_MAGIC + str(CODEC_VERSION).encode('ascii') + b"m"
+CODECS = ("json", "msgpack", "legacy")
+
+# Codec used for outgoing messages; decoding always accepts every format
+MESSAGE_CODEC = CODEC_CONFIG["codec"]
+
+
+def _default(value):
+    """Serialize numpy scalars/arrays and other stragglers"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _json_dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def encode_message(data, codec=None):
+    """
+    Encode a message dictionary for Redis.
+
+    Args:
+        data: Message to encode
+        codec: "json", "msgpack" or "legacy" (str(dict), for consumers that
+               haven't been upgraded yet), defaults to MESSAGE_CODEC
+
+    Returns:
+        bytes or str: Payload ready to publish
+    """
+    codec = codec or MESSAGE_CODEC
+    if codec == "msgpack":
+        if msgpack is not None:
+            return MSGPACK_HEADER + msgpack.packb(data, default=_default, use_bin_type=True)
+        logger.warning("msgpack is not installed, encoding as JSON")
+        codec = "json"
+    if codec == "legacy":
+        return str(data)
+    if codec != "json":
+        raise ValueError(f"Unknown message codec: {codec}")
+    return JSON_HEADER + _json_dumps(data)
+
+
+def decode_message(payload):
+    """
+    Decode a Redis payload in any supported format.
+
+    Returns:
+        The decoded message, normally a dictionary
+    """
+    if isinstance(payload, dict):
+        return payload
+    if isinstance(payload, memoryview):
+        payload = payload.tobytes()
+    if isinstance(payload, str):
+        header = payload[:HEADER_SIZE].encode('ascii', 'replace')
+        if header == JSON_HEADER:
+            return _json_loads(payload[HEADER_SIZE:])
+        return _decode_legacy(payload)
+
+    header = payload[:HEADER_SIZE]
+    if header == JSON_HEADER:
+        return _json_loads(payload[HEADER_SIZE:])
+    if header == MSGPACK_HEADER:
+        if msgpack is None:
+            raise ValueError("Received a msgpack message but msgpack is not installed")
+        return msgpack.unpackb(payload[HEADER_SIZE:], raw=False)
+    if header[:len(CODEC_MAGIC)] == CODEC_MAGIC and header[2:3].isdigit():
+        raise ValueError(f"Unsupported message codec header: {header!r}")
+    return _decode_legacy(payload.decode('utf-8'))
+
+
+def _decode_legacy(text):
+    """Decode a header-less JSON or str(dict) payload"""
+    try:
+        return _json_loads(text)
+    except ValueError:
+        return ast.literal_eval(text)
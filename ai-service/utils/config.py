@@ -1,4 +1,5 @@
 import os
+import socket
 
 # MinIO configuration
 MINIO_CONFIG = {
@@ -9,10 +10,26 @@ MINIO_CONFIG = {
     "buckets": {
         "frames": "frames",
         "processed": "yolo-images",
-        "processed_test": "yolo-images-test"
+        "processed_test": "yolo-images-test",
+        "backfill": os.getenv("MINIO_BUCKET_BACKFILL", "yolo-images-backfill")
     }
 }
 
+# Object URL configuration
+URL_CONFIG = {
+    # "presigned" signs every URL; "public" builds plain URLs for public-read buckets
+    "mode": os.getenv("URL_MODE", "presigned").lower(),
+    "expires": int(os.getenv("URL_EXPIRES", "3600")),  # seconds
+    # Presigned URLs are reused within a window, so they are handed out with
+    # at least expires - window seconds left
+    "window": int(os.getenv("URL_SIGNING_WINDOW", "900")),  # seconds
+    "max_entries": int(os.getenv("URL_CACHE_SIZE", "10000")),
+    # Buckets made public-read by ensure_bucket_exists are added at startup
+    "public_buckets": [bucket for bucket in os.getenv("URL_PUBLIC_BUCKETS", "").split(",") if bucket],
+    # Base for public URLs, e.g. a CDN; defaults to the MinIO endpoint
+    "public_base_url": os.getenv("URL_PUBLIC_BASE_URL", "")
+}
+
 # Redis configuration
 REDIS_CONFIG = {
     "host": os.getenv('REDIS_HOST', '34.55.93.180'),
@@ -21,6 +38,17 @@ REDIS_CONFIG = {
     "channels": {
         "input": "ai_channel",
         "output": "ai_results"
+    },
+    # Frame transport: "pubsub" (default) or "streams" for a consumer group
+    # that persists frames and spreads them across ai-service replicas
+    "transport": os.getenv("REDIS_TRANSPORT", "pubsub").lower(),
+    "streams": {
+        "input": os.getenv("REDIS_STREAM_INPUT", "ai_stream"),
+        "group": os.getenv("REDIS_STREAM_GROUP", "ai-service"),
+        "consumer": os.getenv("REDIS_STREAM_CONSUMER", socket.gethostname()),
+        # Entries pending longer than this are reclaimed from dead consumers
+        "claim_idle_ms": int(os.getenv("REDIS_STREAM_CLAIM_IDLE_MS", "60000")),
+        "stats_interval": float(os.getenv("REDIS_STREAM_STATS_INTERVAL", "30"))
     }
 }
 
@@ -28,5 +56,165 @@ REDIS_CONFIG = {
 MODEL_CONFIG = {
     "path": os.getenv("MODEL_PATH", "yolov8n-pose.pt"),
     "device": os.getenv("MODEL_DEVICE", "cpu"),
-    "confidence_threshold": float(os.getenv("CONFIDENCE_THRESHOLD", "0.5"))
-} 
\ No newline at end of file
+    # Inference backend: "torch" (Ultralytics/PyTorch) or "onnx" (onnxruntime CPU)
+    "backend": os.getenv("MODEL_BACKEND", "torch").lower(),
+    "imgsz": int(os.getenv("MODEL_IMGSZ", "640")),
+    "onnx_intra_op_threads": int(os.getenv("ONNX_INTRA_OP_THREADS", "0")),  # 0 = onnxruntime default
+    "onnx_inter_op_threads": int(os.getenv("ONNX_INTER_OP_THREADS", "1")),
+    # INT8 model variant for the onnx backend: "none", "dynamic" or "static"
+    "quantization": os.getenv("MODEL_QUANTIZATION", "none").lower(),
+    "confidence_threshold": float(os.getenv("CONFIDENCE_THRESHOLD", "0.5")),
+    "keypoint_threshold": float(os.getenv("KEYPOINT_THRESHOLD", "0.5")),
+    # Micro-batching: run up to batch_size frames per forward pass, waiting at
+    # most batch_max_wait_ms after the first frame for the batch to fill up
+    "batch_size": int(os.getenv("MODEL_BATCH_SIZE", "1")),
+    "batch_max_wait_ms": float(os.getenv("MODEL_BATCH_MAX_WAIT_MS", "50")),
+    # Dummy forward passes run at startup, before the service reports ready
+    "warmup_runs": int(os.getenv("MODEL_WARMUP_RUNS", "1"))
+} 
+
+# Redis message codec configuration
+CODEC_CONFIG = {
+    # Encoding for published messages: "json", "msgpack" or "legacy" (str(dict));
+    # every format is always accepted when decoding
+    "codec": os.getenv("MESSAGE_CODEC", "json").lower()
+}
+
+# INT8 quantization configuration
+QUANTIZATION_CONFIG = {
+    # Number of frames from the frames bucket used to calibrate static quantization
+    "calibration_frames": int(os.getenv("QUANTIZATION_CALIBRATION_FRAMES", "100")),
+    # Nodes whose name starts with this prefix (the pose head) stay in FP32
+    "exclude_prefix": os.getenv("QUANTIZATION_EXCLUDE_PREFIX", "/model.22/"),
+    # Accuracy gate against the FP32 model
+    "min_recall": float(os.getenv("QUANTIZATION_MIN_RECALL", "0.95")),
+    "min_precision": float(os.getenv("QUANTIZATION_MIN_PRECISION", "0.95")),
+    "max_keypoint_error_px": float(os.getenv("QUANTIZATION_MAX_KEYPOINT_ERROR_PX", "3.0"))
+}
+
+# Backpressure configuration
+BACKPRESSURE_CONFIG = {
+    # Keep only the newest pending frame per camera and drop superseded ones
+    "latest_frame_only": os.getenv("LATEST_FRAME_ONLY", "False").lower() == "true",
+    # Maximum number of entries pulled from Redis per drain call
+    "max_drain": int(os.getenv("BACKPRESSURE_MAX_DRAIN", "256"))
+}
+
+# Motion-gated inference configuration
+MOTION_CONFIG = {
+    # Reuse the previous detections when a camera's view hasn't changed
+    "enabled": os.getenv("MOTION_GATE_ENABLED", "False").lower() == "true",
+    # Width of the grayscale thumbnail used for frame differencing
+    "width": int(os.getenv("MOTION_GATE_WIDTH", "160")),
+    # Minimum per-pixel difference (0-255) for a pixel to count as changed
+    "pixel_threshold": int(os.getenv("MOTION_GATE_PIXEL_THRESHOLD", "25")),
+    # Fraction of changed pixels above which the model runs again
+    "change_threshold": float(os.getenv("MOTION_GATE_CHANGE_THRESHOLD", "0.01")),
+    # Force inference at least every N frames per camera
+    "refresh_interval": int(os.getenv("MOTION_GATE_REFRESH_INTERVAL", "30"))
+}
+
+# Keyframe tracking configuration
+TRACKING_CONFIG = {
+    # Run the model on every interval-th frame per camera and track people
+    # with optical flow in between
+    "enabled": os.getenv("TRACKING_ENABLED", "False").lower() == "true",
+    "interval": int(os.getenv("TRACKING_KEYFRAME_INTERVAL", "5")),
+    # Per-camera intervals, e.g. "cam1=10,cam2=3"
+    "camera_intervals": os.getenv("TRACKING_CAMERA_INTERVALS", ""),
+    # Width of the grayscale image optical flow runs on
+    "width": int(os.getenv("TRACKING_WIDTH", "320")),
+    # Fraction of points that must be tracked, otherwise the frame becomes a keyframe
+    "min_confidence": float(os.getenv("TRACKING_MIN_CONFIDENCE", "0.6")),
+    # Maximum forward-backward flow error in flow image pixels
+    "max_flow_error": float(os.getenv("TRACKING_MAX_FLOW_ERROR", "1.0")),
+    # Minimum IoU for a keyframe detection to keep a track's id
+    "match_iou": float(os.getenv("TRACKING_MATCH_IOU", "0.3"))
+}
+
+# Inference resolution configuration
+RESOLUTION_CONFIG = {
+    # Decode JPEGs at 1/2, 1/4 or 1/8 scale when the frame stays at least as
+    # large as the model input. The processed image is rendered at the
+    # reduced size; published coordinates stay in original-frame pixels
+    "reduced_decode": os.getenv("REDUCED_DECODE", "False").lower() == "true",
+    # Lower the inference size under load and raise it again with headroom
+    "adaptive": os.getenv("ADAPTIVE_IMGSZ", "False").lower() == "true",
+    "sizes": [int(size) for size in os.getenv("ADAPTIVE_IMGSZ_SIZES", "320,480,640").split(",") if size],
+    # Per-frame inference time to stay under
+    "target_ms": float(os.getenv("ADAPTIVE_IMGSZ_TARGET_MS", "100")),
+    # Step up only if the next size is expected to use less than this fraction of the target
+    "headroom": float(os.getenv("ADAPTIVE_IMGSZ_HEADROOM", "0.8")),
+    # Weight of the newest measurement in the moving average
+    "smoothing": float(os.getenv("ADAPTIVE_IMGSZ_SMOOTHING", "0.2")),
+    # Frames measured after a change before the size may change again
+    "min_frames": int(os.getenv("ADAPTIVE_IMGSZ_MIN_FRAMES", "20"))
+}
+
+# Region of interest configuration
+ROI_CONFIG = {
+    # JSON object mapping camera_id to a list of regions, each a rectangle
+    # [x1, y1, x2, y2] or a polygon [[x, y], ...] in fractions of the frame
+    # size; inference only runs inside them. Read from the file if given,
+    # otherwise from ROI_REGIONS
+    "path": os.getenv("ROI_CONFIG_PATH", ""),
+    "regions": os.getenv("ROI_REGIONS", "")
+}
+
+# Annotation rendering configuration
+RENDER_CONFIG = {
+    # Draw joint names next to each joint
+    "joint_labels": os.getenv("RENDER_JOINT_LABELS", "True").lower() == "true"
+}
+
+# Processed image encoding configuration
+OUTPUT_CONFIG = {
+    # One of "jpeg", "webp" or "png"
+    "format": os.getenv("OUTPUT_FORMAT", "png").lower(),
+    # JPEG/WebP quality (0-100)
+    "quality": int(os.getenv("OUTPUT_QUALITY", "85")),
+    # PNG compression level (0-9), higher is smaller but slower
+    "png_compression": int(os.getenv("OUTPUT_PNG_COMPRESSION", "3"))
+}
+
+# Pipelined worker configuration
+PIPELINE_CONFIG = {
+    # Run fetch / infer / render / upload as overlapping stages
+    "enabled": os.getenv("PIPELINE_ENABLED", "False").lower() == "true",
+    "io_workers": int(os.getenv("PIPELINE_IO_WORKERS", "4")),
+    "render_workers": int(os.getenv("PIPELINE_RENDER_WORKERS", "2")),
+    # Maximum number of frames waiting between two stages
+    "queue_size": int(os.getenv("PIPELINE_QUEUE_SIZE", "8")),
+    "stats_interval": float(os.getenv("PIPELINE_STATS_INTERVAL", "30"))
+}
+
+# Bulk reprocessing (backfill) configuration
+BACKFILL_CONFIG = {
+    "io_workers": int(os.getenv("BACKFILL_IO_WORKERS", "8")),
+    "render_workers": int(os.getenv("BACKFILL_RENDER_WORKERS", "2")),
+    "queue_size": int(os.getenv("BACKFILL_QUEUE_SIZE", "32")),
+    # Progress is saved here so an interrupted run resumes where it stopped
+    "checkpoint_path": os.getenv("BACKFILL_CHECKPOINT", "backfill_checkpoint.json"),
+    "checkpoint_interval": float(os.getenv("BACKFILL_CHECKPOINT_INTERVAL", "10")),
+    "report_interval": float(os.getenv("BACKFILL_REPORT_INTERVAL", "10"))
+}
+
+# Multi-process worker pool configuration
+WORKER_CONFIG = {
+    # Number of forked inference processes; 1 runs everything in the main process
+    "processes": int(os.getenv("WORKER_PROCESSES", "1")),
+    # Threads per process for torch and OpenCV; 0 splits the cores evenly for torch
+    "torch_threads": int(os.getenv("WORKER_TORCH_THREADS", "0")),
+    "cv2_threads": int(os.getenv("WORKER_CV2_THREADS", "1")),
+    # Maximum number of frames waiting for each worker
+    "queue_size": int(os.getenv("WORKER_QUEUE_SIZE", "4")),
+    "restart_delay": float(os.getenv("WORKER_RESTART_DELAY", "1")),
+    "stats_interval": float(os.getenv("WORKER_STATS_INTERVAL", "30"))
+}
+
+# Metrics endpoint configuration
+METRICS_CONFIG = {
+    "enabled": os.getenv("METRICS_ENABLED", "True").lower() == "true",
+    "host": os.getenv("METRICS_HOST", "0.0.0.0"),
+    "port": int(os.getenv("METRICS_PORT", "9100"))
+}
@@ -0,0 +1,153 @@
+import logging
+import numpy as np
+from .config import MODEL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# COCO keypoint order produced by the YOLO pose model
+KEYPOINT_NAMES = [
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle"
+]
+
+JOINT_GROUPS = {
+    "head": ["nose", "left_eye", "right_eye", "left_ear", "right_ear"],
+    "upper_body": ["left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_wrist", "right_wrist"],
+    "lower_body": ["left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle"]
+}
+
+PERSON_CLASS_ID = 0
+
+# Precomputed lookup tables
+KEYPOINT_INDEX = {name: idx for idx, name in enumerate(KEYPOINT_NAMES)}
+GROUP_JOINT_INDICES = [
+    (group, [(KEYPOINT_INDEX[joint], joint) for joint in joints])
+    for group, joints in JOINT_GROUPS.items()
+]
+BOX_KEYS = ("x1", "y1", "x2", "y2")
+
+
+def to_numpy(data):
+    """Convert a torch tensor or array-like to a numpy array"""
+    if hasattr(data, 'cpu'):
+        data = data.cpu()
+    if hasattr(data, 'numpy'):
+        return data.numpy()
+    return np.asarray(data)
+
+
+def empty_detections():
+    """Detections for a frame without any person"""
+    return (
+        np.empty((0, 4), dtype=np.float32),
+        np.empty((0,), dtype=np.float32),
+        np.empty((0, len(KEYPOINT_NAMES), 3), dtype=np.float32)
+    )
+
+
+def extract_detections(results, confidence_threshold=None):
+    """
+    Move person detections out of Ultralytics results in bulk.
+
+    Boxes and keypoints are copied to numpy once and filtered by class and
+    confidence with a single mask.
+
+    Args:
+        results: YOLO results for one image
+        confidence_threshold: Minimum person confidence, defaults to MODEL_CONFIG
+
+    Returns:
+        tuple: (boxes, confidences, keypoints) as (N, 4), (N,) and (N, 17, 3) arrays
+    """
+    if confidence_threshold is None:
+        confidence_threshold = MODEL_CONFIG["confidence_threshold"]
+
+    if len(results) == 0 or getattr(results[0], 'boxes', None) is None or len(results[0].boxes) == 0:
+        return empty_detections()
+
+    box_data = to_numpy(results[0].boxes.data)
+    mask = (box_data[:, 5].astype(np.int32) == PERSON_CLASS_ID) & (box_data[:, 4] > confidence_threshold)
+    boxes = box_data[mask, :4]
+    confidences = box_data[mask, 4]
+
+    if getattr(results[0], 'keypoints', None) is not None:
+        keypoints = to_numpy(results[0].keypoints.data)[mask]
+    else:
+        keypoints = np.zeros((len(boxes), len(KEYPOINT_NAMES), 3), dtype=np.float32)
+
+    return boxes, confidences, keypoints
+
+
+def scale_detections(detections, scale):
+    """
+    Map detections from a downscaled image back to original-frame pixels.
+
+    Args:
+        detections: (boxes, confidences, keypoints) arrays
+        scale: (x, y) factor from decoded to original pixels, or None
+
+    Returns:
+        tuple: New (boxes, confidences, keypoints) arrays
+    """
+    if scale is None or tuple(scale) == (1.0, 1.0):
+        return detections
+    boxes, confidences, keypoints = detections
+    scale_x, scale_y = scale
+    boxes = boxes * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+    keypoints = keypoints.copy()
+    keypoints[:, :, 0] *= scale_x
+    keypoints[:, :, 1] *= scale_y
+    return boxes, confidences, keypoints
+
+
+def build_people_data(boxes, confidences, keypoints, keypoint_threshold=None, track_ids=None):
+    """
+    Turn detection arrays into the per-person dictionaries published in results.
+
+    Args:
+        boxes: (N, 4) array of x1, y1, x2, y2
+        confidences: (N,) array of person confidences
+        keypoints: (N, 17, 3) array of x, y, confidence per joint
+        keypoint_threshold: Minimum joint confidence, defaults to MODEL_CONFIG
+        track_ids: Optional stable id per person, added as "track_id"
+
+    Returns:
+        list: One dictionary per person with joint groups, bounding box and confidence
+    """
+    if keypoint_threshold is None:
+        keypoint_threshold = MODEL_CONFIG["keypoint_threshold"]
+
+    # Convert to Python floats in bulk instead of per element
+    box_list = np.asarray(boxes, dtype=np.float64).tolist()
+    confidence_list = np.asarray(confidences, dtype=np.float64).tolist()
+    keypoint_list = np.asarray(keypoints, dtype=np.float64).tolist()
+    visible_list = (np.asarray(keypoints)[:, :, 2] > keypoint_threshold).tolist() if len(keypoints) else []
+
+    people_data = []
+    for box, confidence, person_keypoints, visible in zip(box_list, confidence_list, keypoint_list, visible_list):
+        person_data = {}
+        for group_name, joints in GROUP_JOINT_INDICES:
+            group_data = {
+                joint_name: {
+                    "x": person_keypoints[joint_idx][0],
+                    "y": person_keypoints[joint_idx][1],
+                    "confidence": person_keypoints[joint_idx][2]
+                }
+                for joint_idx, joint_name in joints
+                if visible[joint_idx]
+            }
+            # Only add groups with at least one detected joint
+            if group_data:
+                person_data[group_name] = group_data
+
+        person_data["bounding_box"] = dict(zip(BOX_KEYS, box))
+        person_data["confidence"] = confidence
+        people_data.append(person_data)
+
+    if track_ids is not None:
+        for person_data, track_id in zip(people_data, track_ids):
+            person_data["track_id"] = track_id
+
+    return people_data
@@ -0,0 +1,175 @@
+import logging
+import os
+import time
+import cv2
+import numpy as np
+from .detection_utils import extract_detections
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def load_reference_frames(paths, limit=None):
+    """
+    Load decoded frames from image files and directories.
+
+    Returns:
+        list: (name, BGR image) tuples in a stable order
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+
+    frames = []
+    for file in files[:limit] if limit else files:
+        img = cv2.imread(file, cv2.IMREAD_COLOR)
+        if img is None:
+            logger.warning(f"Could not read {file}, skipping")
+            continue
+        frames.append((os.path.basename(file), img))
+    return frames
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """
+    Greedily match candidate detections to reference detections by IoU.
+
+    Returns:
+        list: (reference_index, candidate_index, iou) tuples
+    """
+    iou = box_iou(reference[0], candidate[0])
+    matches = []
+    while iou.size and iou.max() >= iou_threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        matches.append((int(i), int(j), float(iou[i, j])))
+        iou[i, :] = -1
+        iou[:, j] = -1
+    return matches
+
+
+def compare_detections(reference, candidate, iou_threshold=0.5, keypoint_threshold=0.5):
+    """
+    Measure how closely candidate detections agree with reference detections.
+
+    Args:
+        reference: (boxes, confidences, keypoints) from the reference model
+        candidate: (boxes, confidences, keypoints) from the model under test
+        iou_threshold: Minimum IoU for two boxes to be the same person
+        keypoint_threshold: Joints are compared when visible in both models
+
+    Returns:
+        dict: Per-frame agreement statistics
+    """
+    ref_boxes, ref_conf, ref_kpts = reference
+    cand_boxes, cand_conf, cand_kpts = candidate
+    matches = match_detections(reference, candidate, iou_threshold)
+
+    box_errors, conf_errors, keypoint_errors, ious = [], [], [], []
+    keypoint_visibility_agree = 0
+    keypoint_total = 0
+    for i, j, iou in matches:
+        ious.append(iou)
+        box_errors.append(np.abs(ref_boxes[i] - cand_boxes[j]).mean())
+        conf_errors.append(abs(float(ref_conf[i]) - float(cand_conf[j])))
+        ref_visible = ref_kpts[i, :, 2] > keypoint_threshold
+        cand_visible = cand_kpts[j, :, 2] > keypoint_threshold
+        keypoint_visibility_agree += int(np.count_nonzero(ref_visible == cand_visible))
+        keypoint_total += len(ref_visible)
+        both = ref_visible & cand_visible
+        if both.any():
+            keypoint_errors.extend(
+                np.linalg.norm(ref_kpts[i, both, :2] - cand_kpts[j, both, :2], axis=1).tolist()
+            )
+
+    return {
+        'reference_count': len(ref_boxes),
+        'candidate_count': len(cand_boxes),
+        'matched': len(matches),
+        'ious': ious,
+        'box_errors': box_errors,
+        'confidence_errors': conf_errors,
+        'keypoint_errors': keypoint_errors,
+        'keypoint_visibility_agree': keypoint_visibility_agree,
+        'keypoint_total': keypoint_total
+    }
+
+
+def summarize_comparisons(comparisons):
+    """Aggregate per-frame comparisons into overall agreement figures"""
+    reference_count = sum(c['reference_count'] for c in comparisons)
+    candidate_count = sum(c['candidate_count'] for c in comparisons)
+    matched = sum(c['matched'] for c in comparisons)
+
+    def mean_of(key):
+        values = [value for c in comparisons for value in c[key]]
+        return float(np.mean(values)) if values else 0.0
+
+    keypoint_errors = [value for c in comparisons for value in c['keypoint_errors']]
+    keypoint_total = sum(c['keypoint_total'] for c in comparisons)
+    return {
+        'frames': len(comparisons),
+        'reference_detections': reference_count,
+        'candidate_detections': candidate_count,
+        'recall': matched / reference_count if reference_count else 1.0,
+        'precision': matched / candidate_count if candidate_count else 1.0,
+        'mean_iou': mean_of('ious'),
+        'mean_box_error_px': mean_of('box_errors'),
+        'mean_confidence_error': mean_of('confidence_errors'),
+        'mean_keypoint_error_px': float(np.mean(keypoint_errors)) if keypoint_errors else 0.0,
+        'p95_keypoint_error_px': float(np.percentile(keypoint_errors, 95)) if keypoint_errors else 0.0,
+        'keypoint_visibility_agreement': (
+            sum(c['keypoint_visibility_agree'] for c in comparisons) / keypoint_total if keypoint_total else 1.0
+        )
+    }
+
+
+def time_model(model, frames, warmup=2, batch_size=1):
+    """
+    Run a model over frames and collect detections and per-frame latency.
+
+    Returns:
+        tuple: (detections per frame, latencies per call in seconds, frames per second)
+    """
+    imgs = [img for _, img in frames]
+    for img in imgs[:warmup]:
+        model([img])
+
+    detections, latencies = [], []
+    start_time = time.perf_counter()
+    for i in range(0, len(imgs), batch_size):
+        batch = imgs[i:i + batch_size]
+        call_start = time.perf_counter()
+        batch_results = model(batch)
+        latencies.append(time.perf_counter() - call_start)
+        detections.extend(extract_detections([result]) for result in batch_results)
+    elapsed = time.perf_counter() - start_time
+    return detections, latencies, len(imgs) / elapsed if elapsed else 0.0
+
+
+def latency_summary(latencies):
+    """Mean and percentile latency in milliseconds"""
+    values = np.array(latencies) * 1000
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95))
+    }
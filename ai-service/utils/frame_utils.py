@@ -0,0 +1,119 @@
+import base64
+import logging
+import os
+from .image_utils import get_output_format
+from .minio_utils import (
+    get_minio_url,
+    minio_client,
+    MINIO_BUCKET,
+    MINIO_BUCKET_PROCESSED
+)
+from .codec_utils import decode_message
+from .result_utils import format_result_data, format_error_data, publish_result
+from .redis_utils import REDIS_CHANNEL_OUTPUT
+from .metrics_utils import registry, Counter, stage_timer, FRAMES_PROCESSED, FRAME_ERRORS
+
+logger = logging.getLogger(__name__)
+
+FRAME_SOURCES = registry.register(Counter(
+    "ai_frame_source_total", "Where raw frame bytes were read from: inline, redis or minio"
+))
+
+def parse_frame_message(data):
+    """
+    Parse an ai_channel frame message.
+
+    Returns:
+        dict: Frame information with at least 'bucket' and 'filename'
+    """
+    frame_info = decode_message(data)
+    frame_info.setdefault('bucket', MINIO_BUCKET)
+    if not frame_info.get('filename'):
+        raise ValueError("No filename in message")
+    return frame_info
+
+def fetch_frame(bucket, filename, timings=None):
+    """Download the raw frame bytes from MinIO"""
+    logger.info(f"Processing frame: {filename} from bucket: {bucket}")
+    with stage_timer('download', timings):
+        return minio_client.get_object(bucket, filename).read()
+
+def load_frame(frame_info, timings=None, redis_client=None):
+    """
+    Get the raw frame bytes for a parsed frame message.
+
+    frame-service can send the JPEG inline ('image_b64') or stash it under a
+    short-lived Redis key ('frame_key') and persist it to MinIO in the
+    background. Either way the MinIO round-trip is skipped; messages without
+    a payload, and keys that have already expired, are read from MinIO.
+    """
+    payload = frame_info.get('image_b64')
+    if payload:
+        with stage_timer('download', timings):
+            image_data = base64.b64decode(payload)
+        FRAME_SOURCES.inc(source='inline')
+        return image_data
+
+    frame_key = frame_info.get('frame_key')
+    if frame_key and redis_client is not None:
+        with stage_timer('download', timings):
+            image_data = redis_client.get(frame_key)
+        if image_data:
+            FRAME_SOURCES.inc(source='redis')
+            return image_data
+        logger.warning(f"Frame key {frame_key} has expired, falling back to MinIO")
+
+    image_data = fetch_frame(frame_info['bucket'], frame_info['filename'], timings)
+    FRAME_SOURCES.inc(source='minio')
+    return image_data
+
+def get_processed_filename(filename, prefix="processed_", output_format=None):
+    """Name of the processed object, with the extension of the output format"""
+    _, extension, _ = get_output_format(output_format)
+    return f"{prefix}{os.path.splitext(filename)[0]}{extension}"
+
+def upload_processed_image(filename, processed_image, processed_bucket=MINIO_BUCKET_PROCESSED,
+                           prefix="processed_", output_format=None, timings=None):
+    """
+    Upload an annotated image to MinIO.
+
+    Returns:
+        str: Name of the uploaded object
+    """
+    _, _, content_type = get_output_format(output_format)
+    processed_filename = get_processed_filename(filename, prefix, output_format)
+    with stage_timer('upload', timings):
+        minio_client.put_object(
+            processed_bucket,
+            processed_filename,
+            processed_image,
+            processed_image.getbuffer().nbytes,
+            content_type=content_type
+        )
+    logger.info(f"Uploaded processed image to {processed_bucket}: {processed_filename}")
+    return processed_filename
+
+def publish_frame_result(redis_client, filename, bucket, processed_filename, processed_bucket,
+                         processing_time, people_data, channel=REDIS_CHANNEL_OUTPUT, timings=None):
+    """
+    Format and publish the result message for a processed frame.
+
+    The stage durations collected in timings so far are included in the
+    message; the publish itself is only recorded in the metrics.
+    """
+    original_url = get_minio_url(bucket, filename)
+    processed_url = get_minio_url(processed_bucket, processed_filename)
+    result_data = format_result_data(
+        filename, bucket, processed_filename, processed_bucket,
+        original_url, processed_url, processing_time, people_data,
+        stage_times=dict(timings) if timings else None
+    )
+    with stage_timer('publish', timings):
+        publish_result(redis_client, channel, result_data)
+    FRAMES_PROCESSED.inc()
+    return result_data
+
+def publish_frame_error(redis_client, filename, error, stage, channel=REDIS_CHANNEL_OUTPUT, **kwargs):
+    """Count a failed frame and publish its error message"""
+    FRAME_ERRORS.inc(stage=stage)
+    return publish_result(redis_client, channel, format_error_data(filename, error, **kwargs))
@@ -1,206 +1,362 @@
 import logging
+import time
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw
 import io
+from .config import MODEL_CONFIG, OUTPUT_CONFIG, RESOLUTION_CONFIG
+from .detection_utils import extract_detections, build_people_data, scale_detections
+from .resolution_utils import (
+    jpeg_dimensions,
+    reduced_decode_factor,
+    decode_target_size,
+    REDUCED_DECODE_FLAGS,
+    REDUCED_DECODES
+)
+from .render_utils import draw_detections, draw_legend
+from .metrics_utils import stage_timer, record_stage
 
 logger = logging.getLogger(__name__)
 
-def process_image(image_data, model):
+# Supported output formats: (file extension, content type)
+OUTPUT_FORMATS = {
+    "jpeg": (".jpg", "image/jpeg"),
+    "webp": (".webp", "image/webp"),
+    "png": (".png", "image/png")
+}
+
+def get_output_format(fmt=None):
+    """
+    Resolve an output format name.
+    
+    Returns:
+        tuple: (format, extension, content_type)
+    """
+    fmt = (fmt or OUTPUT_CONFIG["format"]).lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    extension, content_type = OUTPUT_FORMATS[fmt]
+    return fmt, extension, content_type
+
+def encode_image(img, fmt=None, quality=None):
+    """
+    Encode a BGR image with OpenCV.
+    
+    Args:
+        img: BGR image
+        fmt: "jpeg", "webp" or "png", defaults to OUTPUT_CONFIG
+        quality: JPEG/WebP quality or PNG compression level, defaults to OUTPUT_CONFIG
+        
+    Returns:
+        io.BytesIO: Encoded image
+    """
+    fmt, extension, _ = get_output_format(fmt)
+    if fmt == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality if quality is not None else OUTPUT_CONFIG["quality"]]
+    elif fmt == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, quality if quality is not None else OUTPUT_CONFIG["quality"]]
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION,
+                  quality if quality is not None else OUTPUT_CONFIG["png_compression"]]
+    
+    success, encoded = cv2.imencode(extension, img, params)
+    if not success:
+        raise ValueError(f"Failed to encode image as {fmt}")
+    return io.BytesIO(encoded.tobytes())
+
+def decode_image(image_data):
+    """Decode binary image data into a BGR numpy array, or None when it isn't an image"""
+    if not image_data:
+        return None
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def decode_frame(image_data, reduced=None, target_size=None):
+    """
+    Decode a frame, downscaling JPEGs in the DCT domain when the full
+    resolution would only be thrown away by the model's resize.
+    
+    Args:
+        image_data: Binary image data
+        reduced: Allow reduced decoding, defaults to RESOLUTION_CONFIG
+        target_size: Smallest longer side to decode to, defaults to the
+                     largest size the model runs at
+        
+    Returns:
+        tuple: (BGR image, scale) where scale is the (x, y) factor from
+               decoded to original pixels, or None at full resolution
+    """
+    if reduced is None:
+        reduced = RESOLUTION_CONFIG["reduced_decode"]
+    dimensions = jpeg_dimensions(image_data) if reduced else None
+    if dimensions is None:
+        return decode_image(image_data), None
+    
+    width, height = dimensions
+    factor = reduced_decode_factor(width, height, target_size or decode_target_size())
+    if factor == 1:
+        return decode_image(image_data), None
+    
+    img = cv2.imdecode(np.frombuffer(image_data, np.uint8), REDUCED_DECODE_FLAGS[factor])
+    if img is None:
+        return None, None
+    REDUCED_DECODES.inc(factor=str(factor))
+    # EXIF orientation may have rotated the decoded image
+    if (img.shape[1] > img.shape[0]) != (width > height) and img.shape[0] != img.shape[1]:
+        width, height = height, width
+    return img, (width / img.shape[1], height / img.shape[0])
+
+def process_image(image_data, model, timings=None, resolution=None):
     """
     Process an image with the YOLO model to detect people and their keypoints.
     
     Args:
         image_data: Binary image data
         model: YOLO model instance
+        timings: Optional dict that receives per-stage durations in seconds
+        resolution: Optional AdaptiveResolution picking the inference size
         
     Returns:
-        tuple: (processed_image, results, people_data)
+        tuple: (processed_image, results, people_data), with people_data in
+               original-frame pixels
     """
     logger.info("\n" + "="*50)
     logger.info(f"Processing image")
     logger.info("="*50 + "\n")
             
     # Decode image
-    nparr = np.frombuffer(image_data, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    with stage_timer('decode', timings):
+        img, scale = decode_frame(image_data)
             
     # Run detection
-    results = model(img)
-            
-    # Convert to PIL image for drawing
-    img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img_pil)
-            
-    # Initialize people_data list to store all detected persons
-    people_data = []
-    
-    # Define colors for different joint groups
-    color_map = {
-        "head": (255, 0, 0),       # Red for head
-        "upper_body": (0, 255, 0), # Green for upper body
-        "lower_body": (0, 0, 255)  # Blue for lower body
-    }
-    
-    # Check if results contain detections
-    if len(results) > 0 and hasattr(results[0], 'boxes') and len(results[0].boxes) > 0:
-        # Filter persons with confidence > 0.5
-        persons = [(i, box) for i, box in enumerate(results[0].boxes.data) 
-                    if int(box[5]) == 0 and box[4] > 0.5]
+    start_time = time.perf_counter()
+    results = model(img, **inference_kwargs(resolution))
+    inference_time = time.perf_counter() - start_time
+    record_stage('inference', inference_time, timings)
+    if resolution is not None:
+        resolution.update(inference_time)
+    
+    processed_image, people_data = annotate_image(img, results, timings, scale)
+    return processed_image, results, people_data
+
+def inference_kwargs(resolution=None):
+    """Keyword arguments for a model call at the adaptive inference size"""
+    return {'imgsz': resolution.imgsz} if resolution is not None else {}
+
+def run_inference(imgs, model, timings=None, camera_ids=None, motion_gate=None, resolution=None,
+                  regions=None, tracker=None, keep_results=True):
+    """
+    Run one batched forward pass over decoded images and extract detections.
+    
+    With a motion gate, frames whose camera view hasn't changed since the
+    last inference reuse that camera's cached detections and are left out
+    of the forward pass. A keyframe tracker takes the motion gate's place:
+    only keyframes go through the model and people are tracked between
+    them. With regions of interest, a camera's frames go through the model
+    as one crop per region instead of whole.
+    
+    Args:
+        imgs: List of decoded BGR images
+        model: YOLO model instance
+        timings: Optional list with one dict per image that receives per-stage
+                 durations in seconds; the batch inference time is split evenly
+        camera_ids: Camera id per image, required for motion gating, tracking
+                    and regions of interest
+        motion_gate: Optional MotionGate instance
+        resolution: Optional AdaptiveResolution picking the inference size
+        regions: Optional RegionsOfInterest
+        tracker: Optional KeyframeTracker
+        keep_results: Return the model's result objects; without them the
+                      results, and the tensors and frame references they
+                      hold, are released as soon as detections are extracted
         
-        logger.info(f"Found {len(persons)} person(s) with confidence > 0.5\n")
+    Returns:
+        list: One (results, detections, track_ids) tuple per image, where
+              results is empty for frames that skipped inference or when
+              keep_results is off, and has one entry per crop for frames cut
+              into regions, and track_ids is None without a tracker.
+              Detections are in the coordinates of the decoded images
+    """
+    if timings is None:
+        timings = [None] * len(imgs)
+    
+    # Frames answered without inference: (detections, track_ids)
+    reused = [None] * len(imgs)
+    # Motion thumbnail or tracker state handed back after inference
+    gate_states = [None] * len(imgs)
+    if camera_ids is not None and tracker is not None:
+        for i, (img, camera_id) in enumerate(zip(imgs, camera_ids)):
+            with stage_timer('track', timings[i]):
+                needs_inference, state, detections, track_ids = tracker.check(camera_id, img)
+            if needs_inference:
+                gate_states[i] = state
+            else:
+                reused[i] = (detections, track_ids)
+    elif camera_ids is not None and motion_gate is not None:
+        for i, (img, camera_id) in enumerate(zip(imgs, camera_ids)):
+            with stage_timer('motion', timings[i]):
+                needs_inference, thumbnail = motion_gate.check(camera_id, img)
+            if needs_inference:
+                gate_states[i] = thumbnail
+            else:
+                reused[i] = (motion_gate.cached_detections(camera_id), None)
+    
+    # Run detection on every frame that needs it in one batch, cut down to
+    # the camera's regions of interest when it has any
+    model_inputs = []
+    frame_crops = []
+    for i, img in enumerate(imgs):
+        crops = None
+        if reused[i] is None and regions and camera_ids is not None:
+            with stage_timer('roi', timings[i]):
+                crops = regions.crop(camera_ids[i], img)
+        frame_crops.append(crops)
+        if reused[i] is None:
+            model_inputs.extend([crop.image for crop in crops] if crops is not None else [img])
+    
+    inferred = sum(1 for frame in reused if frame is None)
+    batch_results = []
+    inference_time = 0.0
+    if model_inputs:
+        start_time = time.perf_counter()
+        batch_results = model(model_inputs, **inference_kwargs(resolution))
+        inference_time = (time.perf_counter() - start_time) / inferred
+        if resolution is not None:
+            resolution.update(inference_time, inferred)
+    
+    outputs = []
+    batch_iter = iter(batch_results)
+    for i in range(len(imgs)):
+        if reused[i] is not None:
+            outputs.append(([],) + reused[i])
+            continue
         
-        for person_idx, result in persons:
-            x1, y1, x2, y2, conf, class_id = result
-            logger.info(f"Person {person_idx + 1}")
-            logger.info(f"Confidence: {conf:.2f}")
-            logger.info(f"Bounding Box: ({x1:.1f}, {y1:.1f}) to ({x2:.1f}, {y2:.1f})\n")
-            
-            # Draw bounding box
-            draw.rectangle([x1, y1, x2, y2], outline='red', width=2)
-            
-            # Check if keypoints are available
-            if hasattr(results[0], 'keypoints') and results[0].keypoints is not None:
-                keypoints = results[0].keypoints.data[person_idx]
-                
-                # Define joint groups
-                joint_groups = {
-                    "head": ["nose", "left_eye", "right_eye", "left_ear", "right_ear"],
-                    "upper_body": ["left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_wrist", "right_wrist"],
-                    "lower_body": ["left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle"]
-                }
-                
-                keypoint_names = [
-                    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
-                    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-                    "left_wrist", "right_wrist", "left_hip", "right_hip",
-                    "left_knee", "right_knee", "left_ankle", "right_ankle"
-                ]
-                
-                # Log and draw keypoints with different colors based on body part
-                for group_name, joints in joint_groups.items():
-                    color = color_map[group_name]
-                    
-                    # Initialize group data
-                    group_data = {}
-                    
-                    for joint_name in joints:
-                        joint_idx = keypoint_names.index(joint_name)
-                        
-                        # Get keypoint coordinates and confidence
-                        x, y, joint_conf = keypoints[joint_idx]
-                        
-                        # Only process if joint is detected with sufficient confidence
-                        if joint_conf > 0.5:
-                            logger.info(f"  {joint_name}: ({x:.1f}, {y:.1f}) conf: {joint_conf:.2f}")
-                            
-                            # Draw circle for the joint
-                            draw.ellipse([x-5, y-5, x+5, y+5], fill=color)
-                            
-                            # Add text label
-                            draw.text((x+7, y-7), joint_name.replace('_', ' '), fill=color)
-                            
-                            # Store joint data
-                            group_data[joint_name] = {
-                                "x": float(x),
-                                "y": float(y),
-                                "confidence": float(joint_conf)
-                            }
-                    
-                    # Add group data to person data if any joints were detected
-                    if group_data:
-                        if len(people_data) <= person_idx:
-                            people_data.append({})
-                        people_data[person_idx][group_name] = group_data
-                
-                # Draw skeleton lines to connect joints
-                skeleton_connections = [
-                    # Head
-                    ("nose", "left_eye"), ("nose", "right_eye"),
-                    ("left_eye", "left_ear"), ("right_eye", "right_ear"),
-                    # Upper body
-                    ("left_shoulder", "right_shoulder"), 
-                    ("left_shoulder", "left_elbow"), ("right_shoulder", "right_elbow"),
-                    ("left_elbow", "left_wrist"), ("right_elbow", "right_wrist"),
-                    # Torso
-                    ("left_shoulder", "left_hip"), ("right_shoulder", "right_hip"),
-                    # Lower body
-                    ("left_hip", "right_hip"),
-                    ("left_hip", "left_knee"), ("right_hip", "right_knee"),
-                    ("left_knee", "left_ankle"), ("right_knee", "right_ankle")
-                ]
-                
-                for start_joint, end_joint in skeleton_connections:
-                    start_idx = keypoint_names.index(start_joint)
-                    end_idx = keypoint_names.index(end_joint)
-                    
-                    start_x, start_y, start_conf = keypoints[start_idx]
-                    end_x, end_y, end_conf = keypoints[end_idx]
-                    
-                    # Only draw if both joints are detected with sufficient confidence
-                    if start_conf > 0.5 and end_conf > 0.5:
-                        # Determine line color based on the body part
-                        if start_joint in joint_groups["head"] and end_joint in joint_groups["head"]:
-                            line_color = color_map["head"]
-                        elif start_joint in joint_groups["upper_body"] and end_joint in joint_groups["upper_body"]:
-                            line_color = color_map["upper_body"]
-                        elif start_joint in joint_groups["lower_body"] and end_joint in joint_groups["lower_body"]:
-                            line_color = color_map["lower_body"]
-                        else:
-                            # For connections between different body parts (e.g., shoulder to hip)
-                            line_color = (255, 255, 0)  # Yellow
-                        
-                        draw.line([start_x, start_y, end_x, end_y], fill=line_color, width=2)
-                
-                # Add person metadata
-                if len(people_data) <= person_idx:
-                    people_data.append({})
-                
-                people_data[person_idx]["bounding_box"] = {
-                    "x1": float(x1),
-                    "y1": float(y1),
-                    "x2": float(x2),
-                    "y2": float(y2)
-                }
-                people_data[person_idx]["confidence"] = float(conf)
-    
-    # Add a legend
-    legend_x = 20
-    legend_y = 20
-    legend_spacing = 25
-    
-    # Semi-transparent background for legend
-    draw.rectangle(
-        [legend_x - 10, legend_y - 10, legend_x + 150, legend_y + (len(color_map) * legend_spacing) + 10],
-        fill=(255, 255, 255, 180)
+        record_stage('inference', inference_time, timings[i])
+        crops = frame_crops[i]
+        if crops is None:
+            results = [next(batch_iter)]
+            with stage_timer('extract', timings[i]):
+                detections = extract_detections(results)
+        else:
+            results = [next(batch_iter) for _ in crops]
+            with stage_timer('extract', timings[i]):
+                detections = regions.merge(crops, [extract_detections([result]) for result in results])
+        if not keep_results:
+            results = []
+        track_ids = None
+        if gate_states[i] is not None:
+            if tracker is not None:
+                track_ids = tracker.update(camera_ids[i], gate_states[i], detections)
+            else:
+                motion_gate.update(camera_ids[i], gate_states[i], detections, inference_time)
+        outputs.append((results, detections, track_ids))
+    return outputs
+
+def process_image_batch(images_data, model, timings=None, camera_ids=None, motion_gate=None,
+                        resolution=None, regions=None, tracker=None, keep_results=True):
+    """
+    Process several images with a single batched forward pass of the YOLO model.
+    
+    Args:
+        images_data: List of binary image data
+        model: YOLO model instance
+        timings: Optional list with one dict per image that receives per-stage
+                 durations in seconds; the batch inference time is split evenly
+        camera_ids: Camera id per image, required for motion gating
+        motion_gate: Optional MotionGate instance
+        resolution: Optional AdaptiveResolution picking the inference size
+        regions: Optional RegionsOfInterest restricting inference per camera
+        tracker: Optional KeyframeTracker running the model on keyframes only
+        keep_results: Return the model's result objects, otherwise results
+                      is an empty list and they are released before drawing
+        
+    Returns:
+        list: One (processed_image, results, people_data) tuple per input image,
+              in the same order as images_data, or None for images that
+              could not be decoded
+    """
+    logger.info(f"Processing batch of {len(images_data)} image(s)")
+    if timings is None:
+        timings = [None] * len(images_data)
+    
+    # Decode all images up front so the model sees the whole batch at once;
+    # frames that fail to decode are left out instead of failing the batch
+    decoded = []
+    imgs = []
+    scales = []
+    for i, (image_data, frame_timings) in enumerate(zip(images_data, timings)):
+        with stage_timer('decode', frame_timings):
+            img, scale = decode_frame(image_data)
+        if img is None:
+            logger.warning(f"Could not decode image {i} of the batch")
+            continue
+        decoded.append(i)
+        imgs.append(img)
+        scales.append(scale)
+    
+    outputs = [None] * len(images_data)
+    if not imgs:
+        return outputs
+    
+    inference_outputs = run_inference(
+        imgs, model, [timings[i] for i in decoded],
+        [camera_ids[i] for i in decoded] if camera_ids is not None else None,
+        motion_gate, resolution, regions, tracker, keep_results
     )
     
-    # Add legend title
-    draw.text((legend_x, legend_y), "Joint Groups:", fill=(0, 0, 0))
-    legend_y += 25
+    # Split the batched results back into per-frame outputs
+    for i, img, scale, (results, detections, track_ids) in zip(decoded, imgs, scales, inference_outputs):
+        processed_image, people_data = annotate_detections(img, detections, timings[i], scale, track_ids)
+        outputs[i] = (processed_image, results, people_data)
+    return outputs
+
+def annotate_image(img, results, timings=None, scale=None):
+    """
+    Draw detections onto an image and extract per-person keypoint data.
     
-    # Add color codes
-    for i, (group, color) in enumerate(color_map.items()):
-        y_pos = legend_y + (i * legend_spacing)
+    Args:
+        img: Decoded BGR image, annotated in place
+        results: YOLO results for this image
+        timings: Optional dict that receives per-stage durations in seconds
+        scale: (x, y) factor from img to original-frame pixels for people_data
         
-        # Draw color box
-        draw.rectangle(
-            [legend_x + 10, y_pos, legend_x + 20, y_pos + 10], 
-            fill=color, 
-            outline=(0, 0, 0)
-        )
+    Returns:
+        tuple: (processed_image, people_data)
+    """
+    # Pull detections out of the result tensors in bulk
+    with stage_timer('extract', timings):
+        detections = extract_detections(results)
+    return annotate_detections(img, detections, timings, scale)
+
+def annotate_detections(img, detections, timings=None, scale=None, track_ids=None):
+    """
+    Draw extracted detections onto an image and build the per-person data.
+    
+    Args:
+        img: Decoded BGR image, annotated in place
+        detections: (boxes, confidences, keypoints) arrays in img coordinates
+        timings: Optional dict that receives per-stage durations in seconds
+        scale: (x, y) factor from img to original-frame pixels for people_data,
+               when img was decoded at a reduced size
+        track_ids: Optional track id per detection, published with each person
         
-        # Draw label
-        draw.text(
-            (legend_x + 30, y_pos - 2), 
-            group.replace("_", " ").title(), 
-            fill=(0, 0, 0)
-        )
-    
-    # Save the processed image to a byte array
-    img_byte_arr = io.BytesIO()
-    img_pil.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    
-    # Return both the processed image and the results
-    return img_byte_arr, results, people_data 
\ No newline at end of file
+    Returns:
+        tuple: (processed_image, people_data)
+    """
+    boxes, confidences, keypoints = detections
+    with stage_timer('build', timings):
+        people_data = build_people_data(*scale_detections(detections, scale), track_ids=track_ids)
+    logger.info(f"Found {len(people_data)} person(s) with confidence > {MODEL_CONFIG['confidence_threshold']}")
+    
+    # Draw boxes, joints and skeleton straight onto the decoded buffer
+    with stage_timer('draw', timings):
+        draw_detections(img, boxes, keypoints, MODEL_CONFIG["keypoint_threshold"])
+        draw_legend(img)
+    
+    # Encode the processed image in the configured output format
+    with stage_timer('encode', timings):
+        img_byte_arr = encode_image(img)
+    
+    # Return the processed image and the extracted people data
+    return img_byte_arr, people_data
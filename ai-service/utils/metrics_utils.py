@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import METRICS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from sub-millisecond drawing to slow uploads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    """Render a label tuple as a Prometheus label set"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Increment the counter for a label set"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """Get the current value for a label set"""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        """Render in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge that is either set directly or read from a callback at scrape time"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        """Set the gauge for a label set"""
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def set_function(self, callback, **labels):
+        """Read the gauge for a label set from callback() at scrape time"""
+        with self._lock:
+            self._callbacks[tuple(sorted(labels.items()))] = callback
+
+    def render(self):
+        """Render in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+        for key, callback in callbacks.items():
+            try:
+                values[key] = callback()
+            except Exception as e:
+                logger.debug(f"Error reading gauge {self.name}: {e}")
+        for key, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation for a label set"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        """Render in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Add a metric to the registry"""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render all metrics in Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.register(Histogram(
+    "ai_stage_duration_seconds", "Time spent per frame in each processing stage"
+))
+FRAMES_PROCESSED = registry.register(Counter(
+    "ai_frames_processed_total", "Frames processed and published successfully"
+))
+FRAME_ERRORS = registry.register(Counter(
+    "ai_frame_errors_total", "Frames that failed, by stage"
+))
+FRAMES_DROPPED = registry.register(Counter(
+    "ai_frames_dropped_total", "Frames dropped without processing"
+))
+QUEUE_DEPTH = registry.register(Gauge(
+    "ai_queue_depth", "Frames waiting in each internal queue"
+))
+TRANSPORT_LAG = registry.register(Gauge(
+    "ai_transport_lag", "Input entries not yet delivered to the consumer group"
+))
+STARTUP_DURATION = registry.register(Gauge(
+    "ai_startup_phase_seconds", "Time spent in each startup phase"
+))
+READY = registry.register(Gauge(
+    "ai_ready", "1 once the model is loaded and warmed up and frames are being consumed"
+))
+READY.set(0)
+
+_ready = threading.Event()
+
+
+def set_ready(ready=True):
+    """Flip the readiness signal served on /ready"""
+    if ready:
+        _ready.set()
+    else:
+        _ready.clear()
+    READY.set(1 if ready else 0)
+
+
+def is_ready():
+    """Whether the service has finished starting up"""
+    return _ready.is_set()
+
+
+def record_stage(stage, duration, timings=None):
+    """Record a stage duration in the histogram and in the per-frame timings"""
+    STAGE_DURATION.observe(duration, stage=stage)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + duration
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Time a block of code as one processing stage"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start_time, timings)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the registry on /metrics and the readiness signal on /ready"""
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/ready':
+            ready = is_ready()
+            body = b"ready\n" if ready else b"starting\n"
+            self.send_response(200 if ready else 503)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent, keep them out of the service log
+        pass
+
+
+def start_metrics_server(port=None, host=None):
+    """Start the /metrics and /ready HTTP endpoints on a daemon thread"""
+    if not METRICS_CONFIG["enabled"]:
+        return None
+    port = port or METRICS_CONFIG["port"]
+    host = host or METRICS_CONFIG["host"]
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics and readiness on /ready")
+        return server
+    except Exception as e:
+        logger.error(f"Error starting metrics server: {e}", exc_info=True)
+        return None
@@ -1,8 +1,9 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from minio import Minio
-from datetime import timedelta
 import json
 from .config import MINIO_CONFIG
+from .url_utils import UrlSigner
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,7 @@ MINIO_SECURE = MINIO_CONFIG["secure"]
 MINIO_BUCKET = MINIO_CONFIG["buckets"]["frames"]
 MINIO_BUCKET_PROCESSED = MINIO_CONFIG["buckets"]["processed"]
 MINIO_BUCKET_PROCESSED_TEST = MINIO_CONFIG["buckets"]["processed_test"]
+MINIO_BUCKET_BACKFILL = MINIO_CONFIG["buckets"]["backfill"]
 
 # Initialize MinIO client
 minio_client = Minio(
@@ -23,8 +25,20 @@ minio_client = Minio(
     secure=MINIO_SECURE
 )
 
+# Cached presigned / public object URLs
+url_signer = UrlSigner(minio_client, MINIO_ENDPOINT, MINIO_SECURE)
+
+def reset_minio_connections():
+    """Drop pooled connections inherited from a parent process after fork"""
+    minio_client._http.clear()
+
+# Buckets already checked by this process
+_ready_buckets = set()
+
 def ensure_bucket_exists(bucket_name):
-    """Create bucket if it doesn't exist and set public read access"""
+    """Create bucket if it doesn't exist and set public read access, once per process"""
+    if bucket_name in _ready_buckets:
+        return True
     try:
         if not minio_client.bucket_exists(bucket_name):
             minio_client.make_bucket(bucket_name)
@@ -43,18 +57,28 @@ def ensure_bucket_exists(bucket_name):
             ]
         }
         minio_client.set_bucket_policy(bucket_name, json.dumps(policy))
+        url_signer.mark_public(bucket_name)
         logger.info(f"Set public read policy for bucket: {bucket_name}")
+        _ready_buckets.add(bucket_name)
+        return True
     except Exception as e:
         logger.error(f"Error setting up bucket {bucket_name}: {e}")
+        return False
+
+def ensure_buckets_exist(bucket_names):
+    """
+    Run ensure_bucket_exists for several buckets concurrently.
+
+    Returns:
+        dict: Bucket name to whether it is ready
+    """
+    bucket_names = list(dict.fromkeys(bucket_names))
+    with ThreadPoolExecutor(max_workers=max(1, len(bucket_names))) as executor:
+        return dict(zip(bucket_names, executor.map(ensure_bucket_exists, bucket_names)))
 
 def get_minio_url(bucket, filename):
     """Generate a URL for a MinIO object"""
     try:
-        url = minio_client.presigned_get_object(
-            bucket_name=bucket,
-            object_name=filename,
-            expires=timedelta(hours=1)
-        )
-        return url
+        return url_signer.get_url(bucket, filename)
     except Exception as e:
         return f"https://{MINIO_ENDPOINT}/{bucket}/{filename}" 
\ No newline at end of file
@@ -1,16 +1,35 @@
 import os
 import logging
-from ultralytics import YOLO
 from .config import MODEL_CONFIG
+from .onnx_utils import export_onnx_model, OnnxPoseModel
+from .quantization_utils import ensure_quantized_model
 
 logger = logging.getLogger(__name__)
 
-def initialize_model(model_path=None, device=None):
-    """Initialize the YOLO model"""
+def initialize_model(model_path=None, device=None, backend=None, quantization=None):
+    """Initialize the pose model on the configured backend"""
     try:
         # Use provided parameters or defaults from config
         model_path = model_path or MODEL_CONFIG["path"]
         device = device or MODEL_CONFIG["device"]
+        backend = backend or MODEL_CONFIG["backend"]
+        quantization = quantization or MODEL_CONFIG["quantization"]
+        
+        if quantization != "none" and backend != "onnx":
+            logger.warning(f"{quantization} INT8 quantization runs on onnxruntime, switching backend to onnx")
+            backend = "onnx"
+        
+        if backend == "onnx":
+            onnx_path = model_path if model_path.endswith(".onnx") else export_onnx_model(model_path)
+            if quantization != "none":
+                onnx_path = ensure_quantized_model(onnx_path, quantization)
+            logger.info(f"Loading ONNX model from {onnx_path}")
+            model = OnnxPoseModel(onnx_path)
+            logger.info("ONNX model loaded successfully")
+            return model
+        
+        # Imported here so the ONNX backend never pays for importing torch
+        from ultralytics import YOLO
         
         logger.info(f"Loading YOLO model from {model_path} on {device}")
         model = YOLO(model_path).to(device)
@@ -18,4 +37,4 @@ def initialize_model(model_path=None, device=None):
         return model
     except Exception as e:
         logger.error(f"Error loading YOLO model: {e}", exc_info=True)
-        raise 
\ No newline at end of file
+        raise
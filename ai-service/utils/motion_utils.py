@@ -0,0 +1,122 @@
+import logging
+import threading
+import cv2
+import numpy as np
+from .config import MOTION_CONFIG
+from .metrics_utils import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+MOTION_DECISIONS = registry.register(Counter(
+    "ai_motion_gate_frames_total", "Frames seen by the motion gate, by camera and decision"
+))
+INFERENCE_SECONDS_SAVED = registry.register(Counter(
+    "ai_inference_seconds_saved_total", "Estimated inference time saved by skipping unchanged frames"
+))
+
+
+class _CameraState:
+    """Motion gate state for a single camera"""
+
+    def __init__(self):
+        self.reference = None
+        self.detections = None
+        self.frames_since_refresh = 0
+        self.inferred = 0
+        self.skipped = 0
+
+
+class MotionGate:
+    """
+    Per-camera change detector that decides whether a frame needs inference.
+
+    Each frame is downscaled to a small blurred grayscale image and compared
+    with the frame the cached detections came from. When the fraction of
+    changed pixels stays below change_threshold the cached detections are
+    reused and the model is skipped. A refresh is forced every
+    refresh_interval frames so slow changes are never missed for long.
+    """
+
+    def __init__(self, width=None, pixel_threshold=None, change_threshold=None, refresh_interval=None):
+        self.width = width or MOTION_CONFIG["width"]
+        self.pixel_threshold = pixel_threshold or MOTION_CONFIG["pixel_threshold"]
+        self.change_threshold = change_threshold if change_threshold is not None else MOTION_CONFIG["change_threshold"]
+        self.refresh_interval = refresh_interval or MOTION_CONFIG["refresh_interval"]
+        self.cameras = {}
+        self.inference_time = 0.0
+        self.inference_count = 0
+        self._lock = threading.Lock()
+
+    def _thumbnail(self, img):
+        """Small blurred grayscale version of the frame used for differencing"""
+        height = max(1, int(img.shape[0] * self.width / img.shape[1]))
+        small = cv2.resize(img, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, camera_id, img):
+        """
+        Decide whether a frame needs inference.
+
+        Returns:
+            tuple: (needs_inference, thumbnail); pass the thumbnail to update()
+                   after inference so it becomes the new reference
+        """
+        thumbnail = self._thumbnail(img)
+        with self._lock:
+            state = self.cameras.setdefault(camera_id, _CameraState())
+            if (state.detections is None
+                    or state.reference is None
+                    or state.reference.shape != thumbnail.shape
+                    or state.frames_since_refresh + 1 >= self.refresh_interval):
+                return True, thumbnail
+
+            diff = cv2.absdiff(state.reference, thumbnail)
+            changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+            if changed >= self.change_threshold:
+                return True, thumbnail
+
+            state.frames_since_refresh += 1
+            state.skipped += 1
+        MOTION_DECISIONS.inc(camera_id=camera_id, decision='skipped')
+        if self.inference_count:
+            INFERENCE_SECONDS_SAVED.inc(self.inference_time / self.inference_count)
+        return False, thumbnail
+
+    def update(self, camera_id, thumbnail, detections, inference_time=None):
+        """Store fresh detections for a camera after running the model"""
+        with self._lock:
+            state = self.cameras.setdefault(camera_id, _CameraState())
+            state.reference = thumbnail
+            state.detections = detections
+            state.frames_since_refresh = 0
+            state.inferred += 1
+            if inference_time is not None:
+                self.inference_time += inference_time
+                self.inference_count += 1
+        MOTION_DECISIONS.inc(camera_id=camera_id, decision='inferred')
+
+    def cached_detections(self, camera_id):
+        """Detections of the last inferred frame for a camera"""
+        with self._lock:
+            return self.cameras[camera_id].detections
+
+    def get_stats(self):
+        """Get skip rate per camera and the estimated inference time saved"""
+        with self._lock:
+            avg_inference = self.inference_time / self.inference_count if self.inference_count else 0.0
+            cameras = {
+                str(camera_id): {
+                    'inferred': state.inferred,
+                    'skipped': state.skipped,
+                    'skip_rate': state.skipped / max(1, state.inferred + state.skipped)
+                }
+                for camera_id, state in self.cameras.items()
+            }
+        total_skipped = sum(camera['skipped'] for camera in cameras.values())
+        total_frames = total_skipped + sum(camera['inferred'] for camera in cameras.values())
+        return {
+            'skip_rate': total_skipped / max(1, total_frames),
+            'inference_seconds_saved': total_skipped * avg_inference,
+            'cameras': cameras
+        }
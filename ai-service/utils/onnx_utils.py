@@ -0,0 +1,264 @@
+import logging
+import os
+import cv2
+import numpy as np
+from .config import MODEL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+NUM_KEYPOINTS = 17
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def export_onnx_model(model_path=None, imgsz=None, force=False):
+    """
+    Export a YOLO .pt model to ONNX once and cache it next to the .pt file.
+
+    Returns:
+        str: Path of the ONNX model
+    """
+    model_path = model_path or MODEL_CONFIG["path"]
+    imgsz = imgsz or MODEL_CONFIG["imgsz"]
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if os.path.exists(onnx_path) and not force:
+        return onnx_path
+
+    from ultralytics import YOLO
+
+    logger.info(f"Exporting {model_path} to ONNX (imgsz={imgsz})")
+    exported_path = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True)
+    if os.path.abspath(exported_path) != os.path.abspath(onnx_path):
+        os.replace(exported_path, onnx_path)
+    logger.info(f"Exported ONNX model to {onnx_path}")
+    return onnx_path
+
+
+def letterbox(img, imgsz):
+    """
+    Resize keeping the aspect ratio and pad to a square model input.
+
+    Returns:
+        tuple: (letterboxed image, gain, (pad_x, pad_y))
+    """
+    height, width = img.shape[:2]
+    gain = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+    pad_x = (imgsz - new_width) / 2
+    pad_y = (imgsz - new_height) / 2
+    if (new_width, new_height) != (width, height):
+        img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return img, gain, (left, top)
+
+
+def preprocess_batch(imgs, imgsz, buffers=None):
+    """
+    Letterbox BGR HWC uint8 images and stack them into an RGB CHW float batch.
+
+    Args:
+        imgs: BGR images
+        imgsz: Square model input size
+        buffers: Optional PreprocessBuffers to fill instead of allocating a
+                 new batch; the batch is then overwritten by the next call
+
+    Returns:
+        tuple: (batch array, per-image (gain, pad, original shape) transforms)
+    """
+    if buffers is not None:
+        return buffers.preprocess(imgs, imgsz)
+
+    batch = []
+    transforms = []
+    for img in imgs:
+        letterboxed, gain, pad = letterbox(img, imgsz)
+        batch.append(letterboxed[:, :, ::-1].transpose(2, 0, 1))
+        transforms.append((gain, pad, img.shape[:2]))
+    blob = np.ascontiguousarray(np.stack(batch), dtype=np.float32)
+    blob /= 255.0
+    return blob, transforms
+
+
+class PreprocessBuffers:
+    """
+    Letterbox canvas and model input batch reused from call to call.
+
+    Frames are resized straight into a padded canvas per input size and
+    converted into a float batch per input size that only grows with the
+    batch size, so steady-state inference doesn't allocate the resized,
+    padded, stacked and float copies of every frame again.
+    """
+
+    def __init__(self):
+        self._canvases = {}
+        self._blobs = {}
+
+    def preprocess(self, imgs, imgsz):
+        """Same output as preprocess_batch, as a view of the reused batch"""
+        blob = self._blobs.get(imgsz)
+        if blob is None or len(blob) < len(imgs):
+            blob = self._blobs[imgsz] = np.empty((len(imgs), 3, imgsz, imgsz), dtype=np.float32)
+        canvas = self._canvases.get(imgsz)
+        if canvas is None:
+            canvas = self._canvases[imgsz] = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+
+        transforms = []
+        for i, img in enumerate(imgs):
+            gain, pad = self._letterbox_into(canvas, img, imgsz)
+            transforms.append((gain, pad, img.shape[:2]))
+            blob[i] = canvas[:, :, ::-1].transpose(2, 0, 1)
+        blob = blob[:len(imgs)]
+        blob /= 255.0
+        return blob, transforms
+
+    @staticmethod
+    def _letterbox_into(canvas, img, imgsz):
+        """letterbox() writing into a preallocated square canvas"""
+        height, width = img.shape[:2]
+        gain = min(imgsz / height, imgsz / width)
+        new_width, new_height = int(round(width * gain)), int(round(height * gain))
+        top = int(round((imgsz - new_height) / 2 - 0.1))
+        left = int(round((imgsz - new_width) / 2 - 0.1))
+
+        canvas[:top] = LETTERBOX_COLOR
+        canvas[top + new_height:] = LETTERBOX_COLOR
+        canvas[top:top + new_height, :left] = LETTERBOX_COLOR
+        canvas[top:top + new_height, left + new_width:] = LETTERBOX_COLOR
+        target = canvas[top:top + new_height, left:left + new_width]
+        if (new_width, new_height) != (width, height):
+            resized = cv2.resize(img, (new_width, new_height), dst=target, interpolation=cv2.INTER_LINEAR)
+            if not np.shares_memory(resized, canvas):
+                target[...] = resized
+        else:
+            target[...] = img
+        return gain, (left, top)
+
+
+class PoseBoxes:
+    """Detected boxes as an (N, 6) array of x1, y1, x2, y2, confidence, class"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class PoseKeypoints:
+    """Detected keypoints as an (N, 17, 3) array of x, y, confidence"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+class PoseResult:
+    """Minimal stand-in for an Ultralytics Results object"""
+
+    def __init__(self, boxes, keypoints, orig_shape):
+        self.boxes = PoseBoxes(boxes)
+        self.keypoints = PoseKeypoints(keypoints)
+        self.orig_shape = orig_shape
+
+
+class OnnxPoseModel:
+    """
+    YOLOv8 pose model running on onnxruntime's CPU execution provider.
+
+    Calling the model with one image or a list of BGR images returns a list
+    of PoseResult objects with the same boxes.data / keypoints.data layout
+    as Ultralytics results, so the rest of the pipeline doesn't need to know
+    which backend produced them.
+    """
+
+    def __init__(self, onnx_path, imgsz=None, conf=0.25, iou=0.7,
+                 intra_op_threads=None, inter_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads if intra_op_threads is not None \
+            else MODEL_CONFIG["onnx_intra_op_threads"]
+        options.inter_op_num_threads = inter_op_threads if inter_op_threads is not None \
+            else MODEL_CONFIG["onnx_inter_op_threads"]
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Batch dimension is symbolic for dynamic exports
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.imgsz = imgsz or MODEL_CONFIG["imgsz"]
+        # Spatial dimensions are symbolic too, so any input size can run
+        self.dynamic_shape = not isinstance(model_input.shape[2], int)
+        if not self.dynamic_shape:
+            self.imgsz = model_input.shape[2]
+        self.conf = conf
+        self.iou = iou
+        self.onnx_path = onnx_path
+        # Input buffers reused across calls; the model runs on one thread at a time
+        self.buffers = PreprocessBuffers()
+        logger.info(
+            f"Loaded ONNX model {onnx_path} (imgsz={self.imgsz}, dynamic batch={self.dynamic_batch}, "
+            f"threads={options.intra_op_num_threads}/{options.inter_op_num_threads})"
+        )
+
+    def _preprocess(self, imgs, imgsz=None):
+        """Letterbox and stack images into a model input batch"""
+        return preprocess_batch(imgs, imgsz or self.imgsz, self.buffers)
+
+    def _postprocess(self, prediction, transform):
+        """Filter, run NMS and map one image's raw output back to original coordinates"""
+        gain, (pad_x, pad_y), orig_shape = transform
+        # (56, anchors) -> (anchors, 56): cx, cy, w, h, score, 17 * (x, y, conf)
+        prediction = prediction.T
+        prediction = prediction[prediction[:, 4] > self.conf]
+        if len(prediction) == 0:
+            return PoseResult(
+                np.empty((0, 6), dtype=np.float32),
+                np.empty((0, NUM_KEYPOINTS, 3), dtype=np.float32),
+                orig_shape
+            )
+
+        cx, cy, w, h = prediction[:, 0], prediction[:, 1], prediction[:, 2], prediction[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        scores = prediction[:, 4]
+        keep = cv2.dnn.NMSBoxes(
+            np.stack([boxes[:, 0], boxes[:, 1], w, h], axis=1).tolist(),
+            scores.tolist(), self.conf, self.iou
+        )
+        keep = np.array(keep, dtype=np.int64).reshape(-1)
+        keep = keep[np.argsort(-scores[keep])]
+
+        boxes = boxes[keep]
+        keypoints = prediction[keep, 5:].reshape(-1, NUM_KEYPOINTS, 3).copy()
+
+        # Undo the letterbox
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / gain, 0, orig_shape[1])
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / gain, 0, orig_shape[0])
+        keypoints[:, :, 0] = (keypoints[:, :, 0] - pad_x) / gain
+        keypoints[:, :, 1] = (keypoints[:, :, 1] - pad_y) / gain
+
+        data = np.concatenate(
+            [boxes, scores[keep, None], np.zeros((len(keep), 1), dtype=np.float32)], axis=1
+        ).astype(np.float32)
+        return PoseResult(data, keypoints.astype(np.float32), orig_shape)
+
+    def __call__(self, imgs, **kwargs):
+        if isinstance(imgs, np.ndarray):
+            imgs = [imgs]
+        if not imgs:
+            return []
+
+        # Per-call imgsz, like Ultralytics, on models exported with dynamic shapes
+        imgsz = kwargs.get('imgsz') if self.dynamic_shape else None
+        blob, transforms = self._preprocess(imgs, imgsz)
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate(
+                [self.session.run(None, {self.input_name: blob[i:i + 1]})[0] for i in range(len(blob))]
+            )
+        return [self._postprocess(prediction, transform) for prediction, transform in zip(outputs, transforms)]
@@ -0,0 +1,266 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+from .config import PIPELINE_CONFIG
+from .image_utils import decode_frame, run_inference, annotate_detections
+from .frame_utils import (
+    parse_frame_message,
+    load_frame,
+    upload_processed_image,
+    publish_frame_result,
+    publish_frame_error
+)
+from .metrics_utils import stage_timer, FRAMES_PROCESSED, FRAME_ERRORS
+from .minio_utils import MINIO_BUCKET_PROCESSED
+from .redis_utils import REDIS_CHANNEL_OUTPUT
+
+logger = logging.getLogger(__name__)
+
+# Stages counted in a frame's processing_time, matching the serial loop
+PROCESSING_STAGES = ('decode', 'motion', 'track', 'roi', 'inference', 'extract', 'build', 'draw', 'encode')
+
+
+class StageStats:
+    """Thread-safe timing statistics for a single pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, duration, error=False):
+        """Record one stage execution"""
+        with self._lock:
+            self.count += 1
+            self.total_time += duration
+            self.max_time = max(self.max_time, duration)
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        """Get the current statistics as a dictionary"""
+        with self._lock:
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'avg_ms': (self.total_time / self.count * 1000) if self.count else 0.0,
+                'max_ms': self.max_time * 1000
+            }
+
+
+class ShardedQueue:
+    """Bounded queues, one per worker, reported as a single stage queue"""
+
+    def __init__(self, shards, maxsize):
+        self.shards = [queue.Queue(maxsize=maxsize) for _ in range(shards)]
+
+    def qsize(self):
+        return sum(shard.qsize() for shard in self.shards)
+
+
+class FramePipeline:
+    """
+    Staged frame worker connected by bounded queues.
+
+    Stages:
+        fetch:  download and decode frames (I/O thread pool)
+        infer:  batched model forward pass (single thread, owns the model)
+        render: draw annotations and encode the output image (render workers)
+        upload: upload the processed image, publish and acknowledge (I/O thread pool)
+
+    Because every stage runs on its own threads, inference of frame N
+    overlaps the upload of frame N-1 and the download of frame N+1. Full
+    queues block the previous stage, so memory stays bounded when a stage
+    falls behind.
+
+    Each camera's frames go through the same fetch worker, so they reach
+    the infer stage in arrival order, which the motion gate and keyframe
+    tracker rely on.
+    """
+
+    def __init__(self, redis_client, transport, model, io_workers=None, render_workers=None,
+                 queue_size=None, batch_size=1, motion_gate=None, processed_bucket=None,
+                 result_channel=REDIS_CHANNEL_OUTPUT, resolution=None, regions=None, tracker=None,
+                 on_failure=None):
+        self.redis_client = redis_client
+        self.transport = transport
+        # Called with the entry id of every failed frame before it is acknowledged
+        self.on_failure = on_failure
+        self.processed_bucket = processed_bucket or MINIO_BUCKET_PROCESSED
+        # None uploads processed images without publishing results
+        self.result_channel = result_channel
+        self.model = model
+        self.motion_gate = motion_gate
+        self.resolution = resolution
+        self.regions = regions
+        self.tracker = tracker
+        self.io_workers = io_workers or PIPELINE_CONFIG["io_workers"]
+        self.render_workers = render_workers or PIPELINE_CONFIG["render_workers"]
+        self.batch_size = max(1, batch_size)
+        queue_size = queue_size or PIPELINE_CONFIG["queue_size"]
+
+        self.queues = {
+            # One queue per fetch worker, keyed by camera
+            'fetch': ShardedQueue(self.io_workers, max(1, queue_size // self.io_workers)),
+            'infer': queue.Queue(maxsize=queue_size),
+            'render': queue.Queue(maxsize=queue_size),
+            'upload': queue.Queue(maxsize=queue_size)
+        }
+        self.stats = {name: StageStats(name) for name in self.queues}
+        self._threads = []
+        self._next_fetch_worker = 0
+
+    def start(self):
+        """Start all stage threads"""
+        workers = [
+            ('fetch', self._fetch_worker, self.io_workers),
+            ('infer', self._infer_worker, 1),
+            ('render', self._render_worker, self.render_workers),
+            ('upload', self._upload_worker, self.io_workers)
+        ]
+        for name, target, count in workers:
+            for i in range(count):
+                # Fetch workers each read their own queue
+                args = (self.queues['fetch'].shards[i],) if name == 'fetch' else ()
+                thread = threading.Thread(target=target, args=args, name=f"pipeline-{name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(
+            f"Started frame pipeline: {self.io_workers} I/O worker(s) per I/O stage, "
+            f"{self.render_workers} render worker(s), batch size {self.batch_size}"
+        )
+
+    def submit(self, entry_id, data):
+        """Queue a transport entry for processing, blocking while the pipeline is full"""
+        self.queues['fetch'].shards[self._route(data)].put((entry_id, data))
+
+    def _route(self, data):
+        """Fetch worker for an entry, the same one for every frame of a camera"""
+        try:
+            camera_id = parse_frame_message(data).get('camera_id')
+        except Exception:
+            camera_id = None
+        if camera_id is None:
+            self._next_fetch_worker = (self._next_fetch_worker + 1) % self.io_workers
+            return self._next_fetch_worker
+        return zlib.crc32(str(camera_id).encode('utf-8')) % self.io_workers
+
+    def get_stats(self):
+        """Get queue depths and per-stage timings"""
+        return {
+            'queue_depths': {name: q.qsize() for name, q in self.queues.items()},
+            'stages': {name: stats.snapshot() for name, stats in self.stats.items()}
+        }
+
+    def _fail(self, entry_id, filename, error, stage):
+        """Publish an error for a frame and acknowledge it"""
+        logger.error(f"Error processing image {filename}: {error}", exc_info=True)
+        if self.result_channel:
+            publish_frame_error(self.redis_client, filename, error, stage=stage, channel=self.result_channel)
+        else:
+            FRAME_ERRORS.inc(stage=stage)
+        if self.on_failure:
+            self.on_failure(entry_id)
+        self.transport.ack([entry_id])
+
+    def _fetch_worker(self, fetch_queue):
+        """Download and decode frames"""
+        while True:
+            entry_id, data = fetch_queue.get()
+            filename = None
+            timings = {}
+            start_time = time.time()
+            try:
+                frame_info = parse_frame_message(data)
+                bucket = frame_info['bucket']
+                filename = frame_info['filename']
+                camera_id = frame_info.get('camera_id')
+                image_data = load_frame(frame_info, timings, self.redis_client)
+                with stage_timer('decode', timings):
+                    img, scale = decode_frame(image_data)
+                if img is None:
+                    raise ValueError("Failed to decode image")
+                self.stats['fetch'].record(time.time() - start_time)
+                self.queues['infer'].put((entry_id, bucket, filename, camera_id, img, scale, timings))
+            except Exception as e:
+                self.stats['fetch'].record(time.time() - start_time, error=True)
+                self._fail(entry_id, filename, e, 'download')
+
+    def _infer_worker(self):
+        """Run batched inference over whatever frames are ready"""
+        while True:
+            frames = [self.queues['infer'].get()]
+            while len(frames) < self.batch_size:
+                try:
+                    frames.append(self.queues['infer'].get_nowait())
+                except queue.Empty:
+                    break
+
+            start_time = time.time()
+            try:
+                outputs = run_inference(
+                    [img for _, _, _, _, img, _, _ in frames], self.model,
+                    timings=[timings for _, _, _, _, _, _, timings in frames],
+                    camera_ids=[camera_id for _, _, _, camera_id, _, _, _ in frames],
+                    motion_gate=self.motion_gate,
+                    resolution=self.resolution,
+                    regions=self.regions,
+                    tracker=self.tracker,
+                    keep_results=False
+                )
+            except Exception as e:
+                self.stats['infer'].record(time.time() - start_time, error=True)
+                for entry_id, _, filename, _, _, _, _ in frames:
+                    self._fail(entry_id, filename, e, 'inference')
+                continue
+            self.stats['infer'].record(time.time() - start_time)
+
+            for frame, (_, detections, track_ids) in zip(frames, outputs):
+                entry_id, bucket, filename, _, img, scale, timings = frame
+                self.queues['render'].put((entry_id, bucket, filename, img, scale, detections, track_ids, timings))
+
+    def _render_worker(self):
+        """Draw annotations and encode the output image"""
+        while True:
+            entry_id, bucket, filename, img, scale, detections, track_ids, timings = self.queues['render'].get()
+            start_time = time.time()
+            try:
+                processed_image, people_data = annotate_detections(img, detections, timings, scale, track_ids)
+                self.stats['render'].record(time.time() - start_time)
+                self.queues['upload'].put((entry_id, bucket, filename, processed_image, people_data, timings))
+            except Exception as e:
+                self.stats['render'].record(time.time() - start_time, error=True)
+                self._fail(entry_id, filename, e, 'render')
+
+    def _upload_worker(self):
+        """Upload the processed image, publish the result and acknowledge the entry"""
+        while True:
+            entry_id, bucket, filename, processed_image, people_data, timings = \
+                self.queues['upload'].get()
+            start_time = time.time()
+            try:
+                processed_filename = upload_processed_image(
+                    filename, processed_image, self.processed_bucket, timings=timings
+                )
+                # Processing time covers decode, inference and rendering like the serial loop
+                processing_time = sum(
+                    timings.get(stage, 0.0) for stage in PROCESSING_STAGES
+                )
+                if self.result_channel:
+                    publish_frame_result(
+                        self.redis_client, filename, bucket, processed_filename,
+                        self.processed_bucket, processing_time, people_data,
+                        channel=self.result_channel, timings=timings
+                    )
+                else:
+                    FRAMES_PROCESSED.inc()
+                self.stats['upload'].record(time.time() - start_time)
+                self.transport.ack([entry_id])
+            except Exception as e:
+                self.stats['upload'].record(time.time() - start_time, error=True)
+                self._fail(entry_id, filename, e, 'upload')
@@ -0,0 +1,175 @@
+import logging
+import os
+import cv2
+import numpy as np
+from .config import MODEL_CONFIG, QUANTIZATION_CONFIG
+from .onnx_utils import preprocess_batch
+from .eval_utils import (
+    compare_detections,
+    summarize_comparisons,
+    time_model,
+    latency_summary
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("dynamic", "static")
+
+
+def get_quantized_model_path(onnx_path, mode):
+    """Path of the INT8 variant of an ONNX model, cached next to it"""
+    return f"{os.path.splitext(onnx_path)[0]}.int8-{mode}.onnx"
+
+
+def load_calibration_frames(bucket=None, limit=None, prefix=""):
+    """
+    Download and decode calibration frames from MinIO.
+
+    Returns:
+        list: (name, BGR image) tuples
+    """
+    from .minio_utils import minio_client, MINIO_BUCKET
+
+    bucket = bucket or MINIO_BUCKET
+    limit = limit or QUANTIZATION_CONFIG["calibration_frames"]
+    frames = []
+    for obj in minio_client.list_objects(bucket, prefix=prefix, recursive=True):
+        if len(frames) >= limit:
+            break
+        response = minio_client.get_object(bucket, obj.object_name)
+        try:
+            img = cv2.imdecode(np.frombuffer(response.read(), np.uint8), cv2.IMREAD_COLOR)
+        finally:
+            response.close()
+            response.release_conn()
+        if img is not None:
+            frames.append((obj.object_name, img))
+    logger.info(f"Loaded {len(frames)} calibration frame(s) from bucket {bucket}")
+    return frames
+
+
+def _calibration_reader(input_name, imgs, imgsz):
+    """Feed letterboxed frames to onnxruntime's static quantization calibrator"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FrameCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(imgs)
+
+        def get_next(self):
+            img = next(self._frames, None)
+            if img is None:
+                return None
+            blob, _ = preprocess_batch([img], imgsz)
+            return {input_name: blob}
+
+    return FrameCalibrationReader()
+
+
+def quantize_model(onnx_path, mode="dynamic", calibration_frames=None, output_path=None, imgsz=None):
+    """
+    Produce an INT8 variant of an ONNX pose model.
+
+    Args:
+        onnx_path: FP32 ONNX model
+        mode: "dynamic" (weights only, no calibration) or "static" (weights and
+              activations, calibrated on calibration_frames)
+        calibration_frames: (name, BGR image) tuples, required for static mode
+        output_path: Where to write the model, defaults to get_quantized_model_path
+        imgsz: Model input size used for calibration
+
+    Returns:
+        str: Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    import onnx
+
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unsupported quantization mode: {mode}")
+    output_path = output_path or get_quantized_model_path(onnx_path, mode)
+    imgsz = imgsz or MODEL_CONFIG["imgsz"]
+
+    # Keep the pose head in FP32: quantizing the box/keypoint decoding costs
+    # a lot of accuracy for very little speed
+    graph = onnx.load(onnx_path).graph
+    exclude_prefix = QUANTIZATION_CONFIG["exclude_prefix"]
+    nodes_to_exclude = [node.name for node in graph.node if exclude_prefix and node.name.startswith(exclude_prefix)]
+
+    logger.info(f"Quantizing {onnx_path} ({mode}), keeping {len(nodes_to_exclude)} head node(s) in FP32")
+    if mode == "dynamic":
+        quantize_dynamic(
+            onnx_path, output_path,
+            weight_type=QuantType.QUInt8,
+            nodes_to_exclude=nodes_to_exclude
+        )
+    else:
+        if not calibration_frames:
+            raise ValueError("Static quantization needs calibration frames")
+        reader = _calibration_reader(graph.input[0].name, [img for _, img in calibration_frames], imgsz)
+        quantize_static(
+            onnx_path, output_path, reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            nodes_to_exclude=nodes_to_exclude
+        )
+    logger.info(f"Wrote quantized model to {output_path}")
+    return output_path
+
+
+def ensure_quantized_model(onnx_path, mode=None):
+    """Return the cached INT8 model for onnx_path, producing it on first use"""
+    mode = mode or MODEL_CONFIG["quantization"]
+    quantized_path = get_quantized_model_path(onnx_path, mode)
+    if os.path.exists(quantized_path):
+        return quantized_path
+    calibration_frames = load_calibration_frames() if mode == "static" else None
+    return quantize_model(onnx_path, mode, calibration_frames, quantized_path)
+
+
+def evaluate_quantized_model(reference_model, quantized_model, frames, min_recall=None,
+                             max_keypoint_error=None, batch_size=1, min_precision=None):
+    """
+    Run the reference and quantized models over the same frames and gate on agreement.
+
+    Returns:
+        tuple: (report dict, passed)
+    """
+    min_recall = min_recall if min_recall is not None else QUANTIZATION_CONFIG["min_recall"]
+    min_precision = min_precision if min_precision is not None else QUANTIZATION_CONFIG["min_precision"]
+    max_keypoint_error = max_keypoint_error if max_keypoint_error is not None \
+        else QUANTIZATION_CONFIG["max_keypoint_error_px"]
+
+    reference_detections, reference_latencies, reference_fps = time_model(
+        reference_model, frames, batch_size=batch_size
+    )
+    quantized_detections, quantized_latencies, quantized_fps = time_model(
+        quantized_model, frames, batch_size=batch_size
+    )
+    agreement = summarize_comparisons([
+        compare_detections(reference, candidate)
+        for reference, candidate in zip(reference_detections, quantized_detections)
+    ])
+
+    failures = []
+    if agreement['recall'] < min_recall:
+        failures.append(f"recall {agreement['recall']:.3f} < {min_recall}")
+    if agreement['precision'] < min_precision:
+        failures.append(f"precision {agreement['precision']:.3f} < {min_precision}")
+    if agreement['mean_keypoint_error_px'] > max_keypoint_error:
+        failures.append(f"mean keypoint error {agreement['mean_keypoint_error_px']:.2f}px > {max_keypoint_error}px")
+
+    report = {
+        'reference': dict(latency_summary(reference_latencies), throughput_fps=reference_fps),
+        'quantized': dict(latency_summary(quantized_latencies), throughput_fps=quantized_fps),
+        'speedup': quantized_fps / reference_fps if reference_fps else 0.0,
+        'agreement': agreement,
+        'gate': {
+            'min_recall': min_recall,
+            'min_precision': min_precision,
+            'max_keypoint_error_px': max_keypoint_error,
+            'failures': failures
+        }
+    }
+    return report, not failures
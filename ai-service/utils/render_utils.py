@@ -0,0 +1,154 @@
+import logging
+from functools import lru_cache
+import cv2
+import numpy as np
+from .config import RENDER_CONFIG
+from .detection_utils import KEYPOINT_NAMES, JOINT_GROUPS, KEYPOINT_INDEX
+
+logger = logging.getLogger(__name__)
+
+SKELETON_CONNECTIONS = [
+    # Head
+    ("nose", "left_eye"), ("nose", "right_eye"),
+    ("left_eye", "left_ear"), ("right_eye", "right_ear"),
+    # Upper body
+    ("left_shoulder", "right_shoulder"),
+    ("left_shoulder", "left_elbow"), ("right_shoulder", "right_elbow"),
+    ("left_elbow", "left_wrist"), ("right_elbow", "right_wrist"),
+    # Torso
+    ("left_shoulder", "left_hip"), ("right_shoulder", "right_hip"),
+    # Lower body
+    ("left_hip", "right_hip"),
+    ("left_hip", "left_knee"), ("right_hip", "right_knee"),
+    ("left_knee", "left_ankle"), ("right_knee", "right_ankle")
+]
+
+# Colors are BGR since we draw straight onto the OpenCV buffer
+GROUP_COLORS = {
+    "head": (0, 0, 255),        # Red for head
+    "upper_body": (0, 255, 0),  # Green for upper body
+    "lower_body": (255, 0, 0)   # Blue for lower body
+}
+CROSS_GROUP_COLOR = (0, 255, 255)  # Yellow for connections between groups
+BOX_COLOR = (0, 0, 255)            # Red bounding boxes
+
+# Precomputed lookup tables
+KEYPOINT_GROUP = {
+    KEYPOINT_INDEX[joint]: group
+    for group, joints in JOINT_GROUPS.items()
+    for joint in joints
+}
+KEYPOINT_LABELS = [name.replace('_', ' ') for name in KEYPOINT_NAMES]
+KEYPOINT_COLORS = [GROUP_COLORS[KEYPOINT_GROUP[idx]] for idx in range(len(KEYPOINT_NAMES))]
+SKELETON_START = np.array([KEYPOINT_INDEX[start] for start, _ in SKELETON_CONNECTIONS])
+SKELETON_END = np.array([KEYPOINT_INDEX[end] for _, end in SKELETON_CONNECTIONS])
+
+
+def _connection_color(start_idx, end_idx):
+    """Color of a skeleton line, yellow when it joins two different groups"""
+    start_group = KEYPOINT_GROUP[start_idx]
+    if start_group == KEYPOINT_GROUP[end_idx]:
+        return GROUP_COLORS[start_group]
+    return CROSS_GROUP_COLOR
+
+
+# Skeleton connections bucketed by line color so each color is a single draw call
+SKELETON_COLOR_GROUPS = {}
+for _i, (_start, _end) in enumerate(zip(SKELETON_START, SKELETON_END)):
+    SKELETON_COLOR_GROUPS.setdefault(_connection_color(_start, _end), []).append(_i)
+SKELETON_COLOR_GROUPS = {
+    color: np.array(indices) for color, indices in SKELETON_COLOR_GROUPS.items()
+}
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LEGEND_ORIGIN = (10, 10)
+LEGEND_ALPHA = 180 / 255.0
+
+
+@lru_cache(maxsize=1)
+def get_legend_overlay():
+    """Render the joint group legend once and reuse it for every frame"""
+    legend_spacing = 25
+    width = 160
+    height = 45 + len(GROUP_COLORS) * legend_spacing
+    legend = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Legend title
+    cv2.putText(legend, "Joint Groups:", (10, 20), FONT, 0.45, (0, 0, 0), 1, cv2.LINE_AA)
+
+    # Color codes
+    for i, (group, color) in enumerate(GROUP_COLORS.items()):
+        y_pos = 35 + i * legend_spacing
+        cv2.rectangle(legend, (20, y_pos), (30, y_pos + 10), color, -1)
+        cv2.rectangle(legend, (20, y_pos), (30, y_pos + 10), (0, 0, 0), 1)
+        cv2.putText(
+            legend, group.replace("_", " ").title(), (40, y_pos + 10),
+            FONT, 0.4, (0, 0, 0), 1, cv2.LINE_AA
+        )
+
+    legend.setflags(write=False)
+    return legend
+
+
+def draw_legend(img):
+    """Blend the cached legend overlay into the top-left corner of the image"""
+    legend = get_legend_overlay()
+    x0, y0 = LEGEND_ORIGIN
+    height = min(legend.shape[0], img.shape[0] - y0)
+    width = min(legend.shape[1], img.shape[1] - x0)
+    if height <= 0 or width <= 0:
+        return img
+
+    roi = img[y0:y0 + height, x0:x0 + width]
+    cv2.addWeighted(roi, 1 - LEGEND_ALPHA, legend[:height, :width], LEGEND_ALPHA, 0, dst=roi)
+    return img
+
+
+def draw_detections(img, boxes, keypoints=None, joint_threshold=0.5, draw_labels=None):
+    """
+    Draw bounding boxes, joints and skeleton lines in place on a BGR image.
+
+    Args:
+        img: Decoded BGR image, modified in place
+        boxes: (N, 4) array of x1, y1, x2, y2 per person
+        keypoints: Optional (N, 17, 3) array of x, y, confidence per joint
+        joint_threshold: Minimum joint confidence to draw a joint
+        draw_labels: Draw joint names next to joints, defaults to RENDER_CONFIG
+
+    Returns:
+        numpy.ndarray: The annotated image
+    """
+    if draw_labels is None:
+        draw_labels = RENDER_CONFIG["joint_labels"]
+
+    for x1, y1, x2, y2 in np.asarray(boxes, dtype=np.int32).reshape(-1, 4):
+        cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), BOX_COLOR, 2)
+
+    if keypoints is None or len(keypoints) == 0:
+        return img
+
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    points = keypoints[:, :, :2].astype(np.int32)
+    visible = keypoints[:, :, 2] > joint_threshold
+
+    # Skeleton: one polylines call per color for all people at once
+    line_visible = visible[:, SKELETON_START] & visible[:, SKELETON_END]
+    for color, indices in SKELETON_COLOR_GROUPS.items():
+        mask = line_visible[:, indices]
+        if not mask.any():
+            continue
+        segments = np.stack(
+            [points[:, SKELETON_START[indices]], points[:, SKELETON_END[indices]]], axis=2
+        )[mask]
+        cv2.polylines(img, list(segments), False, color, 2)
+
+    # Joints and labels
+    person_ids, joint_ids = np.nonzero(visible)
+    for person_idx, joint_idx in zip(person_ids.tolist(), joint_ids.tolist()):
+        x, y = points[person_idx, joint_idx]
+        color = KEYPOINT_COLORS[joint_idx]
+        cv2.circle(img, (int(x), int(y)), 5, color, -1)
+        if draw_labels:
+            cv2.putText(img, KEYPOINT_LABELS[joint_idx], (int(x) + 7, int(y) - 7), FONT, 0.35, color, 1)
+
+    return img
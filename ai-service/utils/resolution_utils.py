@@ -0,0 +1,157 @@
+import logging
+import threading
+import cv2
+from .config import MODEL_CONFIG, RESOLUTION_CONFIG
+from .metrics_utils import Counter, Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_IMGSZ = registry.register(Gauge(
+    "ai_inference_imgsz", "Image size the model currently runs at"
+))
+REDUCED_DECODES = registry.register(Counter(
+    "ai_reduced_decodes_total", "Frames decoded at a reduced JPEG scale, by scale factor"
+))
+
+# JPEG scale factor -> OpenCV decode flag
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Start-of-frame markers that carry the image size (not DHT, JPG or DAC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_dimensions(data):
+    """
+    Read the image size from a JPEG's frame header without decoding it.
+
+    Returns:
+        tuple: (width, height), or None when data is not a parseable JPEG
+    """
+    view = memoryview(data)
+    size = len(view)
+    if size < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 <= size:
+        if view[i] != 0xFF:
+            return None
+        marker = view[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Markers without a length field
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height = (view[i + 5] << 8) | view[i + 6]
+            width = (view[i + 7] << 8) | view[i + 8]
+            return (width, height) if width and height else None
+        i += 2 + ((view[i + 2] << 8) | view[i + 3])
+    return None
+
+
+def decode_target_size():
+    """Largest size the model may run at, which reduced decoding must not go below"""
+    if RESOLUTION_CONFIG["adaptive"]:
+        return max([MODEL_CONFIG["imgsz"]] + RESOLUTION_CONFIG["sizes"])
+    return MODEL_CONFIG["imgsz"]
+
+
+def reduced_decode_factor(width, height, target_size):
+    """
+    Largest JPEG scale factor (1, 2, 4 or 8) that keeps the longer side of
+    the decoded frame at or above target_size.
+
+    The model letterboxes the longer side to its input size anyway, so any
+    resolution above that is decoded only to be thrown away.
+    """
+    longest = max(width, height)
+    for factor in (8, 4, 2):
+        if longest // factor >= target_size:
+            return factor
+    return 1
+
+
+class AdaptiveResolution:
+    """
+    Chooses the inference image size from a ladder of sizes so the
+    per-frame inference time stays near a target.
+
+    Inference time is tracked as an exponential moving average. The size
+    steps down when the average exceeds the target, and steps up when the
+    average scaled by the pixel ratio of the next size would still leave
+    headroom below the target. After every change the average is rescaled
+    to the new size and at least min_frames frames are measured before the
+    next change, so the size doesn't oscillate.
+    """
+
+    def __init__(self, sizes=None, target_ms=None, headroom=None, smoothing=None, min_frames=None):
+        self.sizes = sorted(set(sizes or RESOLUTION_CONFIG["sizes"]))
+        self.target = (target_ms or RESOLUTION_CONFIG["target_ms"]) / 1000.0
+        self.headroom = headroom or RESOLUTION_CONFIG["headroom"]
+        self.smoothing = smoothing or RESOLUTION_CONFIG["smoothing"]
+        self.min_frames = min_frames if min_frames is not None else RESOLUTION_CONFIG["min_frames"]
+        # Start at full quality and back off under load
+        self.index = len(self.sizes) - 1
+        self.average = None
+        self.frames_since_change = 0
+        self.changes = 0
+        self._lock = threading.Lock()
+        INFERENCE_IMGSZ.set(self.imgsz)
+
+    @property
+    def imgsz(self):
+        return self.sizes[self.index]
+
+    def update(self, frame_time, frames=1):
+        """
+        Record the per-frame inference time of a batch and adjust the size.
+
+        Returns:
+            int: Image size for the next batch
+        """
+        with self._lock:
+            if self.average is None:
+                self.average = frame_time
+            else:
+                self.average += self.smoothing * (frame_time - self.average)
+            self.frames_since_change += frames
+            if self.frames_since_change < self.min_frames:
+                return self.imgsz
+
+            if self.average > self.target and self.index > 0:
+                self._step(-1)
+            elif self.index < len(self.sizes) - 1:
+                ratio = (self.sizes[self.index + 1] / self.imgsz) ** 2
+                if self.average * ratio < self.target * self.headroom:
+                    self._step(1)
+            return self.imgsz
+
+    def _step(self, direction):
+        old_size = self.imgsz
+        self.index += direction
+        # Inference cost scales roughly with the pixel count
+        self.average *= (self.imgsz / old_size) ** 2
+        self.frames_since_change = 0
+        self.changes += 1
+        INFERENCE_IMGSZ.set(self.imgsz)
+        logger.info(
+            f"Inference size {old_size} -> {self.imgsz} "
+            f"(average {self.average * 1000:.1f}ms per frame, target {self.target * 1000:.0f}ms)"
+        )
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'imgsz': self.imgsz,
+                'average_ms': (self.average or 0.0) * 1000,
+                'target_ms': self.target * 1000,
+                'changes': self.changes
+            }
@@ -1,13 +1,15 @@
 import logging
 import time
 from datetime import datetime
+from .codec_utils import encode_message
 
 logger = logging.getLogger(__name__)
 
 def format_result_data(filename, bucket, processed_filename, processed_bucket, 
-                      original_url, processed_url, processing_time, people_data):
+                      original_url, processed_url, processing_time, people_data,
+                      stage_times=None):
     """Format the result data for publishing to Redis"""
-    return {
+    data = {
         'original_filename': filename,
         'original_bucket': bucket,
         'processed_filename': processed_filename,
@@ -22,6 +24,10 @@ def format_result_data(filename, bucket, processed_filename, processed_bucket,
             'people': people_data
         }
     }
+    if stage_times:
+        # Per-stage durations in seconds, e.g. download, decode, inference
+        data['stage_times'] = stage_times
+    return data
 
 def format_error_data(filename, error, **kwargs):
     """Format error data for publishing to Redis"""
@@ -38,7 +44,7 @@ def format_error_data(filename, error, **kwargs):
 def publish_result(redis_client, channel, data):
     """Publish result to Redis channel"""
     try:
-        redis_client.publish(channel, str(data))
+        redis_client.publish(channel, encode_message(data))
         logger.info(f"Published result to {channel}")
         return True
     except Exception as e:
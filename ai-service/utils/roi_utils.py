@@ -0,0 +1,231 @@
+import json
+import logging
+import math
+import threading
+import cv2
+import numpy as np
+from .config import ROI_CONFIG
+from .detection_utils import empty_detections
+from .eval_utils import box_iou
+from .metrics_utils import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+ROI_PIXELS = registry.register(Counter(
+    "ai_roi_pixels_total", "Frame pixels of cameras with regions of interest, by camera and whether they were inferred"
+))
+
+# Masked-out pixels get the model's letterbox padding color
+MASK_COLOR = (114, 114, 114)
+
+# Detections from overlapping regions with a higher IoU are the same person
+DUPLICATE_IOU = 0.6
+
+
+def parse_region(spec):
+    """
+    Parse one region into a polygon in fractions of the frame size.
+
+    Accepts a rectangle [x1, y1, x2, y2], a polygon [[x, y], ...] or either
+    wrapped as {"rect": [...]} / {"polygon": [...]}.
+
+    Returns:
+        tuple: ((N, 2) float32 polygon, whether it is an axis-aligned rectangle)
+    """
+    if isinstance(spec, dict):
+        if "rect" in spec:
+            spec = spec["rect"]
+        elif "polygon" in spec:
+            spec = spec["polygon"]
+        else:
+            raise ValueError(f"Region needs a 'rect' or 'polygon': {spec}")
+
+    if len(spec) == 4 and all(isinstance(value, (int, float)) for value in spec):
+        x1, y1, x2, y2 = spec
+        polygon, is_rect = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)], True
+    else:
+        polygon, is_rect = spec, False
+
+    polygon = np.array(polygon, dtype=np.float32).reshape(-1, 2)
+    if len(polygon) < 3 or polygon.min() < 0 or polygon.max() > 1:
+        raise ValueError(f"Region must have at least 3 points in fractions of the frame (0-1): {spec}")
+    return polygon, is_rect
+
+
+def load_region_config(path=None, regions=None):
+    """
+    Read the per-camera region definitions from a JSON file or string.
+
+    Returns:
+        dict: camera_id -> list of region specs
+    """
+    path = path if path is not None else ROI_CONFIG["path"]
+    regions = regions if regions is not None else ROI_CONFIG["regions"]
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    if regions:
+        return json.loads(regions)
+    return {}
+
+
+class RegionCrop:
+    """One region cut out of a frame, with the offset back to frame pixels"""
+
+    def __init__(self, image, offset):
+        self.image = image
+        self.offset = offset
+
+    def to_frame(self, detections):
+        """Move detections from crop to frame coordinates"""
+        boxes, confidences, keypoints = detections
+        if len(boxes) == 0:
+            return detections
+        x, y = self.offset
+        boxes = boxes + np.array([x, y, x, y], dtype=np.float32)
+        keypoints = keypoints.copy()
+        keypoints[:, :, 0] += x
+        keypoints[:, :, 1] += y
+        return boxes, confidences, keypoints
+
+
+class _CameraRegions:
+    """Regions of interest of a single camera"""
+
+    def __init__(self, specs):
+        self.regions = [parse_region(spec) for spec in specs]
+        # Pixel rectangles and polygon masks per frame shape
+        self._layouts = {}
+        self.frames = 0
+        self.frame_pixels = 0
+        self.inferred_pixels = 0
+
+    def layout(self, shape):
+        """(x1, y1, x2, y2, mask or None) per region for frames of this shape"""
+        layout = self._layouts.get(shape)
+        if layout is not None:
+            return layout
+
+        height, width = shape[:2]
+        layout = []
+        for polygon, is_rect in self.regions:
+            points = polygon * np.array([width, height], dtype=np.float32)
+            x1, y1 = (max(0, math.floor(value)) for value in points.min(axis=0))
+            x2, y2 = min(width, math.ceil(points[:, 0].max())), min(height, math.ceil(points[:, 1].max()))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            mask = None
+            if not is_rect:
+                mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+                cv2.fillPoly(mask, [np.round(points - (x1, y1)).astype(np.int32)], 255)
+                mask = mask == 0
+            layout.append((x1, y1, x2, y2, mask))
+        self._layouts[shape] = layout
+        return layout
+
+
+class RegionsOfInterest:
+    """
+    Per-camera regions of interest that inference is restricted to.
+
+    Each region is cut out of the frame as its bounding rectangle; pixels
+    of polygon regions that fall outside the polygon are filled with the
+    padding color. The crops go through the model instead of the full
+    frame and their detections are moved back to frame coordinates, with
+    duplicates from overlapping regions merged. Cameras without regions
+    run on the full frame.
+
+    Region coordinates are fractions of the frame width and height, so the
+    same definition holds at any decode resolution.
+    """
+
+    def __init__(self, config=None):
+        config = load_region_config() if config is None else config
+        self.cameras = {str(camera_id): _CameraRegions(specs) for camera_id, specs in config.items() if specs}
+        self._lock = threading.Lock()
+        if self.cameras:
+            logger.info(
+                "Regions of interest: " + ", ".join(
+                    f"{camera_id}={len(regions.regions)}" for camera_id, regions in self.cameras.items()
+                )
+            )
+
+    def __bool__(self):
+        return bool(self.cameras)
+
+    def crop(self, camera_id, img):
+        """
+        Cut a frame into its camera's regions.
+
+        Returns:
+            list: RegionCrop per region, or None when the camera has no regions
+        """
+        regions = self.cameras.get(str(camera_id)) if camera_id is not None else None
+        if regions is None:
+            return None
+
+        crops = []
+        inferred_pixels = 0
+        for x1, y1, x2, y2, mask in regions.layout(img.shape):
+            crop = img[y1:y2, x1:x2]
+            if mask is not None:
+                crop = crop.copy()
+                crop[mask] = MASK_COLOR
+            crops.append(RegionCrop(crop, (x1, y1)))
+            inferred_pixels += (x2 - x1) * (y2 - y1)
+
+        frame_pixels = img.shape[0] * img.shape[1]
+        with self._lock:
+            regions.frames += 1
+            regions.frame_pixels += frame_pixels
+            regions.inferred_pixels += inferred_pixels
+        ROI_PIXELS.inc(inferred_pixels, camera_id=str(camera_id), region='inferred')
+        ROI_PIXELS.inc(frame_pixels - inferred_pixels, camera_id=str(camera_id), region='skipped')
+        return crops
+
+    @staticmethod
+    def merge(crops, crop_detections):
+        """
+        Combine the detections of a frame's crops in frame coordinates.
+
+        Args:
+            crops: RegionCrop list from crop()
+            crop_detections: (boxes, confidences, keypoints) per crop
+
+        Returns:
+            tuple: (boxes, confidences, keypoints) for the whole frame
+        """
+        parts = [crop.to_frame(detections) for crop, detections in zip(crops, crop_detections)]
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return empty_detections()
+        if len(parts) == 1:
+            return parts[0]
+
+        boxes = np.concatenate([part[0] for part in parts])
+        confidences = np.concatenate([part[1] for part in parts])
+        keypoints = np.concatenate([part[2] for part in parts])
+
+        # Greedily keep the most confident detection among overlapping ones
+        order = np.argsort(-confidences)
+        iou = box_iou(boxes[order], boxes[order])
+        keep = []
+        for i in range(len(order)):
+            if all(iou[i, j] < DUPLICATE_IOU for j in keep):
+                keep.append(i)
+        keep = order[keep]
+        return boxes[keep], confidences[keep], keypoints[keep]
+
+    def get_stats(self):
+        """Share of frame pixels skipped per camera"""
+        with self._lock:
+            return {
+                camera_id: {
+                    'frames': regions.frames,
+                    'pixels_saved': regions.frame_pixels - regions.inferred_pixels,
+                    'saved_fraction': (
+                        1 - regions.inferred_pixels / regions.frame_pixels if regions.frame_pixels else 0.0
+                    )
+                }
+                for camera_id, regions in self.cameras.items()
+            }
@@ -0,0 +1,46 @@
+import logging
+import time
+from contextlib import contextmanager
+import numpy as np
+from .config import MODEL_CONFIG
+from .metrics_utils import STARTUP_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def record_startup_phase(phase, duration, durations=None):
+    """Report how long a startup phase took"""
+    STARTUP_DURATION.set(duration, phase=phase)
+    if durations is not None:
+        durations[phase] = duration
+    logger.info(f"Startup phase {phase} took {duration * 1000:.0f}ms")
+
+
+@contextmanager
+def startup_phase(phase, durations=None):
+    """Time a block of code as one startup phase"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup_phase(phase, time.perf_counter() - start_time, durations)
+
+
+def warm_up_model(model, runs=None, batch_size=1, imgsz=None, sizes=None):
+    """
+    Run dummy forward passes so the first real frame doesn't pay for lazy
+    initialization (allocator growth, kernel selection, predictor setup).
+
+    Uses the largest batch the service will run, so buffers are sized for it.
+    With adaptive resolution, every inference size in sizes is warmed up too.
+    """
+    runs = MODEL_CONFIG["warmup_runs"] if runs is None else runs
+    imgsz = imgsz or MODEL_CONFIG["imgsz"]
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        if sizes:
+            for size in sizes:
+                model([dummy] * max(1, batch_size), imgsz=size)
+        else:
+            model([dummy] * max(1, batch_size))
+    return runs
@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+import cv2
+import numpy as np
+from .config import MODEL_CONFIG, TRACKING_CONFIG
+from .eval_utils import box_iou
+from .metrics_utils import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+TRACKING_DECISIONS = registry.register(Counter(
+    "ai_tracking_frames_total", "Frames seen by the keyframe tracker, by camera and decision"
+))
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+# Box points tracked in addition to the visible joints, as fractions of the box
+BOX_GRID = np.array([(x, y) for y in (0.25, 0.5, 0.75) for x in (0.3, 0.5, 0.7)], dtype=np.float32)
+
+
+def parse_camera_intervals(value):
+    """Parse "cam1=10,cam2=3" into a camera_id -> keyframe interval dict"""
+    intervals = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        camera_id, _, interval = item.partition("=")
+        intervals[camera_id.strip()] = max(1, int(interval))
+    return intervals
+
+
+class _Track:
+    """Keyframe tracker state for a single camera"""
+
+    def __init__(self):
+        self.gray = None
+        self.detections = None
+        self.ids = []
+        self.frames_since_keyframe = 0
+        self.keyframes = 0
+        self.tracked = 0
+        self.lost = 0
+
+
+class KeyframeTracker:
+    """
+    Runs the model only on keyframes and tracks people in between.
+
+    Every interval-th frame of a camera is a keyframe and goes through the
+    model. On the frames in between, boxes and keypoints of the last frame
+    are moved with pyramidal Lucas-Kanade optical flow on a small grayscale
+    copy of the frame: each visible joint follows its own flow, the box
+    and any joint that could not be tracked follow the median motion of
+    the person. Points that fail the forward-backward check are dropped;
+    when too few points of a person survive, or too few overall, the
+    tracker gives up and the frame becomes a keyframe after all.
+
+    On keyframes new detections are matched to the tracked boxes by IoU so
+    people keep their track id from one keyframe to the next. Track ids are
+    unique per tracker; trackers in separate worker processes split the id
+    space with set_id_namespace.
+    """
+
+    def __init__(self, interval=None, camera_intervals=None, width=None, min_confidence=None,
+                 max_flow_error=None, match_iou=None):
+        self.interval = max(1, interval or TRACKING_CONFIG["interval"])
+        if camera_intervals is None:
+            camera_intervals = parse_camera_intervals(TRACKING_CONFIG["camera_intervals"])
+        self.camera_intervals = {str(camera_id): interval for camera_id, interval in camera_intervals.items()}
+        self.width = width or TRACKING_CONFIG["width"]
+        self.min_confidence = min_confidence if min_confidence is not None else TRACKING_CONFIG["min_confidence"]
+        self.max_flow_error = max_flow_error or TRACKING_CONFIG["max_flow_error"]
+        self.match_iou = match_iou or TRACKING_CONFIG["match_iou"]
+        self.cameras = {}
+        self.next_id = 1
+        self.id_step = 1
+        self._lock = threading.Lock()
+
+    def set_interval(self, camera_id, interval):
+        """Change a camera's keyframe interval at runtime"""
+        with self._lock:
+            self.camera_intervals[str(camera_id)] = max(1, int(interval))
+
+    def set_id_namespace(self, index, count, start=None):
+        """
+        Hand out track ids (start + k) * count + index + 1 so the trackers
+        of count worker processes never share an id.
+
+        start defaults to the current time in milliseconds, so a restarted
+        worker never repeats the ids it published before its restart unless
+        it created more than one track per millisecond.
+        """
+        if start is None:
+            start = int(time.time() * 1000)
+        with self._lock:
+            self.id_step = max(1, count)
+            self.next_id = start * self.id_step + index + 1
+
+    def get_interval(self, camera_id):
+        return self.camera_intervals.get(str(camera_id), self.interval)
+
+    def _gray(self, img):
+        """Small grayscale copy of the frame used for optical flow"""
+        scale = min(1.0, self.width / img.shape[1])
+        if scale < 1.0:
+            img = cv2.resize(img, (self.width, max(1, int(img.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), scale
+
+    def check(self, camera_id, img):
+        """
+        Track the camera's people into a new frame, or ask for a keyframe.
+
+        Returns:
+            tuple: (needs_inference, state, detections, ids) where state goes
+                   to update() after inference, and detections / ids are the
+                   tracked people when no inference is needed
+        """
+        gray, scale = self._gray(img)
+        with self._lock:
+            track = self.cameras.setdefault(str(camera_id), _Track())
+            interval = self.get_interval(camera_id)
+            due = (track.detections is None
+                   or track.gray is None
+                   or track.gray.shape != gray.shape
+                   or track.frames_since_keyframe + 1 >= interval)
+            previous_gray, previous_detections = track.gray, track.detections
+
+        if due:
+            TRACKING_DECISIONS.inc(camera_id=str(camera_id), decision='keyframe')
+            return True, (gray, scale), None, None
+
+        detections, confidence = self._propagate(previous_gray, gray, scale, previous_detections)
+        if detections is None or confidence < self.min_confidence:
+            with self._lock:
+                track.lost += 1
+            TRACKING_DECISIONS.inc(camera_id=str(camera_id), decision='lost')
+            return True, (gray, scale), None, None
+
+        with self._lock:
+            track.gray = gray
+            track.detections = detections
+            track.frames_since_keyframe += 1
+            track.tracked += 1
+            ids = list(track.ids)
+        TRACKING_DECISIONS.inc(camera_id=str(camera_id), decision='tracked')
+        return False, None, detections, ids
+
+    def _propagate(self, previous_gray, gray, scale, detections):
+        """
+        Move detections from the previous frame into this one with optical flow.
+
+        Returns:
+            tuple: (moved detections or None if a person was lost, fraction of points tracked)
+        """
+        boxes, confidences, keypoints = detections
+        if len(boxes) == 0:
+            return detections, 1.0
+
+        # Visible joints plus a grid inside every box, in flow image pixels
+        visible = keypoints[:, :, 2] > MODEL_CONFIG["keypoint_threshold"]
+        width = (boxes[:, 2] - boxes[:, 0])[:, None]
+        height = (boxes[:, 3] - boxes[:, 1])[:, None]
+        grid = np.stack([
+            boxes[:, 0, None] + BOX_GRID[None, :, 0] * width,
+            boxes[:, 1, None] + BOX_GRID[None, :, 1] * height
+        ], axis=2)
+        points = np.concatenate([keypoints[:, :, :2], grid], axis=1) * scale
+        person_count, point_count = points.shape[:2]
+
+        flat = points.reshape(-1, 1, 2).astype(np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(previous_gray, gray, flat, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, previous_gray, moved, None, **LK_PARAMS)
+        error = np.linalg.norm(flat - back, axis=2).reshape(person_count, point_count)
+        good = ((status.reshape(person_count, point_count) == 1)
+                & (back_status.reshape(person_count, point_count) == 1)
+                & (error < self.max_flow_error))
+        # Invisible joints were never real points to track
+        good[:, :keypoints.shape[1]] &= visible
+        trackable = np.concatenate([visible, np.ones((person_count, len(BOX_GRID)), dtype=bool)], axis=1)
+
+        flow = (moved.reshape(person_count, point_count, 2) - points) / scale
+        new_boxes = boxes.copy()
+        new_keypoints = keypoints.copy()
+        for person in range(person_count):
+            if np.count_nonzero(good[person]) < 3:
+                return None, 0.0
+            shift = np.median(flow[person][good[person]], axis=0)
+            new_boxes[person] += np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+            joint_good = good[person, :keypoints.shape[1]]
+            new_keypoints[person, :, :2] += shift
+            new_keypoints[person, joint_good, :2] = (keypoints[person, joint_good, :2]
+                                                     + flow[person, :keypoints.shape[1]][joint_good])
+
+        confidence = np.count_nonzero(good) / max(1, np.count_nonzero(trackable))
+        return (new_boxes, confidences, new_keypoints), confidence
+
+    def update(self, camera_id, state, detections):
+        """
+        Store a keyframe's detections and match them to existing tracks.
+
+        Returns:
+            list: Track id per detection
+        """
+        gray, _ = state
+        boxes = detections[0]
+        with self._lock:
+            track = self.cameras.setdefault(str(camera_id), _Track())
+            ids = [None] * len(boxes)
+            if track.detections is not None and len(track.ids) and len(boxes):
+                iou = box_iou(track.detections[0], boxes)
+                while iou.size and iou.max() >= self.match_iou:
+                    i, j = np.unravel_index(np.argmax(iou), iou.shape)
+                    ids[j] = track.ids[i]
+                    iou[i, :] = -1
+                    iou[:, j] = -1
+            for j in range(len(ids)):
+                if ids[j] is None:
+                    ids[j] = self.next_id
+                    self.next_id += self.id_step
+
+            track.gray = gray
+            track.detections = detections
+            track.ids = ids
+            track.frames_since_keyframe = 0
+            track.keyframes += 1
+            return list(ids)
+
+    def get_stats(self):
+        """Inference calls saved and tracking losses per camera"""
+        with self._lock:
+            cameras = {
+                camera_id: {
+                    'interval': self.get_interval(camera_id),
+                    'keyframes': track.keyframes,
+                    'tracked': track.tracked,
+                    'lost': track.lost,
+                    'inference_saved': track.tracked / max(1, track.keyframes + track.tracked)
+                }
+                for camera_id, track in self.cameras.items()
+            }
+        total_tracked = sum(camera['tracked'] for camera in cameras.values())
+        total_frames = total_tracked + sum(camera['keyframes'] for camera in cameras.values())
+        return {
+            'inference_calls_saved': total_tracked,
+            'inference_saved': total_tracked / max(1, total_frames),
+            'cameras': cameras
+        }
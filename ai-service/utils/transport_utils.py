@@ -0,0 +1,298 @@
+import logging
+import time
+from collections import OrderedDict
+import redis
+from .config import REDIS_CONFIG, BACKPRESSURE_CONFIG
+from .codec_utils import decode_message
+from .metrics_utils import FRAMES_DROPPED
+
+logger = logging.getLogger(__name__)
+
+# Extract configuration
+REDIS_TRANSPORT = REDIS_CONFIG["transport"]
+REDIS_STREAM_INPUT = REDIS_CONFIG["streams"]["input"]
+REDIS_STREAM_GROUP = REDIS_CONFIG["streams"]["group"]
+REDIS_STREAM_CONSUMER = REDIS_CONFIG["streams"]["consumer"]
+REDIS_STREAM_CLAIM_IDLE_MS = REDIS_CONFIG["streams"]["claim_idle_ms"]
+
+
+class PubSubTransport:
+    """Frame transport reading from a plain Redis pub/sub channel"""
+
+    def __init__(self, redis_client, channel):
+        self.channel = channel
+        self.pubsub = redis_client.pubsub()
+        self.pubsub.subscribe(channel)
+        logger.info(f"Subscribed to {channel} channel")
+
+    def read(self, count, timeout=0.0):
+        """
+        Read up to count pending messages.
+
+        Waits at most timeout seconds for the first message.
+
+        Returns:
+            list: (entry_id, payload) tuples with the raw message bytes.
+                  Pub/sub has no entry ids, so entry_id is always None.
+        """
+        entries = []
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        while message:
+            if message['type'] == 'message':
+                entries.append((None, message['data']))
+                if len(entries) >= count:
+                    break
+            message = self.pubsub.get_message(ignore_subscribe_messages=True)
+        return entries
+
+    def ack(self, entry_ids):
+        """Pub/sub messages need no acknowledgement"""
+        return 0
+
+    def release(self, entry_ids):
+        """Lost pub/sub messages are never redelivered"""
+
+    def get_stats(self):
+        """Get transport statistics"""
+        return {'transport': 'pubsub', 'channel': self.channel}
+
+
+class StreamTransport:
+    """Frame transport reading from a Redis stream through a consumer group"""
+
+    def __init__(self, redis_client, stream=None, group=None, consumer=None, claim_idle_ms=None):
+        self.redis_client = redis_client
+        self.stream = stream or REDIS_STREAM_INPUT
+        self.group = group or REDIS_STREAM_GROUP
+        self.consumer = consumer or REDIS_STREAM_CONSUMER
+        self.claim_idle_ms = claim_idle_ms or REDIS_STREAM_CLAIM_IDLE_MS
+        self.claimed_count = 0
+        self._claim_cursor = '0-0'
+        self._next_claim_time = 0.0
+        self._ensure_group()
+
+    def _ensure_group(self):
+        """Create the consumer group (and the stream) if it doesn't exist"""
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+            logger.info(f"Created consumer group {self.group} on stream {self.stream}")
+        except redis.exceptions.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        logger.info(f"Reading stream {self.stream} as {self.group}/{self.consumer}")
+
+    def _claim_stale(self, count):
+        """Take over entries left pending by consumers that stopped acknowledging"""
+        result = self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id=self._claim_cursor,
+            count=count
+        )
+        # Redis 7 returns a third element with deleted ids, Redis 6.2 doesn't
+        self._claim_cursor, claimed = result[0], result[1]
+        if self._claim_cursor in (b'0-0', '0-0'):
+            # Scanned the whole pending list, wait a full idle period
+            self._next_claim_time = time.time() + self.claim_idle_ms / 1000.0
+        entries = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        if entries:
+            self.claimed_count += len(entries)
+            logger.warning(f"Reclaimed {len(entries)} stale entries from {self.stream}")
+        return entries
+
+    def read(self, count, timeout=0.0):
+        """
+        Read up to count entries, reclaiming stale pending entries first.
+
+        Waits at most timeout seconds for new entries.
+
+        Returns:
+            list: (entry_id, payload) tuples with the raw message bytes
+        """
+        entries = []
+        if time.time() >= self._next_claim_time:
+            entries = self._claim_stale(count)
+
+        if len(entries) < count:
+            response = self.redis_client.xreadgroup(
+                self.group, self.consumer, {self.stream: '>'},
+                count=count - len(entries),
+                block=int(timeout * 1000) if timeout > 0 and not entries else None
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+
+        return [
+            (entry_id, fields.get(b'data', b''))
+            for entry_id, fields in entries
+        ]
+
+    def ack(self, entry_ids):
+        """Acknowledge processed entries so they leave the pending list"""
+        entry_ids = [entry_id for entry_id in entry_ids if entry_id is not None]
+        if not entry_ids:
+            return 0
+        return self.redis_client.xack(self.stream, self.group, *entry_ids)
+
+    def release(self, entry_ids):
+        """Unacknowledged entries stay pending and are reclaimed once idle"""
+
+    def get_stats(self):
+        """Get consumer group statistics including lag and pending entries"""
+        stats = {
+            'transport': 'streams',
+            'stream': self.stream,
+            'group': self.group,
+            'consumer': self.consumer,
+            'claimed': self.claimed_count
+        }
+        for group_info in self.redis_client.xinfo_groups(self.stream):
+            name = group_info.get('name')
+            if name in (self.group, self.group.encode('utf-8')):
+                # 'lag' is only reported by Redis 7+
+                stats['lag'] = group_info.get('lag')
+                stats['pending'] = group_info.get('pending')
+                stats['consumers'] = group_info.get('consumers')
+        return stats
+
+
+def _stream_order(entry_id):
+    """(milliseconds, sequence) of a stream entry id, None for pub/sub entries"""
+    if entry_id is None:
+        return None
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode('ascii')
+    milliseconds, _, sequence = str(entry_id).partition('-')
+    try:
+        return int(milliseconds), int(sequence or 0)
+    except ValueError:
+        return None
+
+
+class LatestFrameTransport:
+    """
+    Load-shedding wrapper that keeps only the newest pending frame per camera.
+
+    Every read drains everything the wrapped transport has pending into a
+    per-camera buffer. A frame that arrives while an older frame from the
+    same camera is still buffered replaces it, and the older frame is
+    acknowledged and counted as dropped without ever being downloaded.
+    Cameras are served oldest-waiting first, so end-to-end latency stays
+    bounded under overload instead of growing with the backlog.
+
+    Stream entries reclaimed by the wrapped transport can arrive after newer
+    frames and may already be buffered or in flight here. Frames are
+    ordered by entry id, and redelivered copies of entries that are
+    buffered or handed out but not acknowledged yet are ignored, so no
+    entry is processed twice. Entries lost with a crashed worker must be
+    handed back through release().
+    """
+
+    def __init__(self, transport, max_drain=None):
+        self.transport = transport
+        self.max_drain = max_drain or BACKPRESSURE_CONFIG["max_drain"]
+        self.pending = OrderedDict()
+        self.dropped = {}
+        # Stream entry ids handed out by read() and not acknowledged yet
+        self.in_flight = set()
+
+    @staticmethod
+    def _camera_key(entry_id, data):
+        """Buffer key for an entry; frames without a camera id are never dropped"""
+        try:
+            camera_id = decode_message(data).get('camera_id')
+        except Exception:
+            camera_id = None
+        if camera_id is None:
+            return ('entry', entry_id if entry_id is not None else id(data))
+        return str(camera_id)
+
+    def _add(self, entry_id, data):
+        """Buffer an entry, dropping the frame it supersedes"""
+        if entry_id is not None and entry_id in self.in_flight:
+            # Reclaimed while still being processed
+            return
+        key = self._camera_key(entry_id, data)
+        previous = self.pending.get(key)
+        if previous is None:
+            self.pending[key] = (entry_id, data)
+            return
+        if entry_id is not None and previous[0] == entry_id:
+            # Reclaimed while still buffered
+            return
+        order, previous_order = _stream_order(entry_id), _stream_order(previous[0])
+        if order is not None and previous_order is not None and order < previous_order:
+            # A reclaimed entry older than the buffered frame
+            self._drop(key, entry_id)
+            return
+        del self.pending[key]
+        self._drop(key, previous[0])
+        self.pending[key] = (entry_id, data)
+
+    def _drop(self, key, entry_id):
+        """Acknowledge a superseded entry and count it as dropped"""
+        self.transport.ack([entry_id])
+        self.dropped[key] = self.dropped.get(key, 0) + 1
+        FRAMES_DROPPED.inc(camera_id=key, reason='superseded')
+        logger.debug(f"Dropped superseded frame for camera {key}")
+
+    def read(self, count, timeout=0.0):
+        """
+        Read up to count entries, at most one per camera.
+
+        Waits at most timeout seconds for new entries when nothing is buffered.
+
+        Returns:
+            list: (entry_id, data) tuples
+        """
+        wait = 0.0 if self.pending else timeout
+        while True:
+            entries = self.transport.read(self.max_drain, timeout=wait)
+            for entry_id, data in entries:
+                self._add(entry_id, data)
+            if len(entries) < self.max_drain:
+                break
+            wait = 0.0
+
+        entries = []
+        while self.pending and len(entries) < count:
+            _, entry = self.pending.popitem(last=False)
+            if entry[0] is not None:
+                self.in_flight.add(entry[0])
+            entries.append(entry)
+        return entries
+
+    def ack(self, entry_ids):
+        """Acknowledge processed entries on the wrapped transport"""
+        self.in_flight.difference_update(entry_ids)
+        return self.transport.ack(entry_ids)
+
+    def release(self, entry_ids):
+        """Forget handed-out entries that will never be acknowledged, so their redelivery is processed"""
+        self.in_flight.difference_update(entry_ids)
+
+    def get_stats(self):
+        """Get the wrapped transport statistics plus drops per camera"""
+        stats = self.transport.get_stats()
+        stats['buffered'] = len(self.pending)
+        stats['dropped'] = {str(key): count for key, count in self.dropped.items()}
+        return stats
+
+
+def create_transport(redis_client, channel, transport=None, latest_frame_only=None):
+    """Create the configured frame transport"""
+    transport = transport or REDIS_TRANSPORT
+    if latest_frame_only is None:
+        latest_frame_only = BACKPRESSURE_CONFIG["latest_frame_only"]
+
+    if transport == 'streams':
+        frame_transport = StreamTransport(redis_client)
+    else:
+        if transport != 'pubsub':
+            logger.warning(f"Unknown transport {transport}, falling back to pubsub")
+        frame_transport = PubSubTransport(redis_client, channel)
+
+    if latest_frame_only:
+        logger.info("Load shedding enabled: keeping only the newest frame per camera")
+        return LatestFrameTransport(frame_transport)
+    return frame_transport
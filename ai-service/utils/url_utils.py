@@ -0,0 +1,108 @@
+"""
+Object URL signing shared by ai-service and frame-service.
+
+Presigned URLs are signed for fixed time windows: every URL requested in
+the same window uses the window start as its signing date, so it is
+computed once, cached and handed out again until the window ends. A URL
+handed out near the end of its window still has at least
+expires - window seconds of validity left.
+
+Buckets known to be public-read can be served with plain, unsigned URLs
+instead, which skips HMAC signing altogether.
+
+This module is kept identical in both services; change them together.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+from .config import URL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class UrlSigner:
+    """TTL-aware cache of presigned GET URLs with a public-URL mode"""
+
+    def __init__(self, client, endpoint, secure=True, mode=None, expires=None, window=None,
+                 max_entries=None, public_buckets=None, public_base_url=None):
+        self.client = client
+        self.mode = mode or URL_CONFIG["mode"]
+        self.expires = expires or URL_CONFIG["expires"]
+        self.window = window or URL_CONFIG["window"]
+        if self.window >= self.expires:
+            raise ValueError("URL signing window must be shorter than the URL lifetime")
+        self.max_entries = max_entries or URL_CONFIG["max_entries"]
+        self.public_buckets = set(public_buckets if public_buckets is not None else URL_CONFIG["public_buckets"])
+        self.base_url = (public_base_url or URL_CONFIG["public_base_url"]
+                         or f"{'https' if secure else 'http'}://{endpoint}").rstrip('/')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.public = 0
+
+    def mark_public(self, bucket):
+        """Record that a bucket allows anonymous reads"""
+        self.public_buckets.add(bucket)
+
+    def public_url(self, bucket, object_name):
+        """Plain URL of an object in a public-read bucket"""
+        return f"{self.base_url}/{bucket}/{quote(object_name)}"
+
+    def get_url(self, bucket, object_name, expires=None):
+        """
+        URL for reading an object.
+
+        Args:
+            bucket: Bucket name
+            object_name: Object key
+            expires: Lifetime of a newly signed URL in seconds, defaults to URL_CONFIG
+
+        Returns:
+            str: Public URL in public mode for public buckets, otherwise a
+                 presigned URL valid for at least expires - window seconds
+        """
+        if self.mode == "public" and bucket in self.public_buckets:
+            self.public += 1
+            return self.public_url(bucket, object_name)
+
+        expires = expires or self.expires
+        if expires <= self.window:
+            # Too short-lived to share across a window
+            return self.client.presigned_get_object(bucket, object_name, expires=timedelta(seconds=expires))
+
+        window_index = int(time.time() // self.window)
+        key = (bucket, object_name, expires, window_index)
+        with self._lock:
+            url = self._cache.get(key)
+            if url is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return url
+
+        # Sign outside the lock; a concurrent miss for the same key just
+        # computes the same URL twice
+        request_date = datetime.fromtimestamp(window_index * self.window, tz=timezone.utc)
+        url = self.client.presigned_get_object(
+            bucket, object_name, expires=timedelta(seconds=expires), request_date=request_date
+        )
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = url
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return url
+
+    def get_stats(self):
+        """Cache hits, misses and public URLs served"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'cached': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'public': self.public
+            }
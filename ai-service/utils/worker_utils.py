@@ -0,0 +1,267 @@
+import gc
+import logging
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+import cv2
+from .config import WORKER_CONFIG
+from .frame_utils import parse_frame_message
+from .metrics_utils import registry, Counter, Gauge, QUEUE_DEPTH
+from .minio_utils import reset_minio_connections
+from .redis_utils import initialize_redis
+
+logger = logging.getLogger(__name__)
+
+WORKER_FRAMES = registry.register(Counter(
+    "ai_worker_frames_total", "Frames handled by each inference worker process"
+))
+WORKER_RESTARTS = registry.register(Counter(
+    "ai_worker_restarts_total", "Inference worker processes restarted after exiting"
+))
+WORKER_THROUGHPUT = registry.register(Gauge(
+    "ai_worker_throughput_fps", "Frames per second handled by each worker over the last stats interval"
+))
+
+
+def get_thread_counts(processes, torch_threads=None, cv2_threads=None):
+    """
+    Work out per-process torch and OpenCV thread counts.
+
+    Returns:
+        tuple: (torch_threads, cv2_threads)
+    """
+    torch_threads = torch_threads if torch_threads is not None else WORKER_CONFIG["torch_threads"]
+    cv2_threads = cv2_threads if cv2_threads is not None else WORKER_CONFIG["cv2_threads"]
+    if torch_threads <= 0:
+        torch_threads = max(1, (os.cpu_count() or 1) // max(1, processes))
+    return torch_threads, cv2_threads
+
+
+def configure_threads(torch_threads, cv2_threads):
+    """Pin torch intra-op and OpenCV thread pools for the current process"""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    cv2.setNumThreads(cv2_threads)
+    logger.info(f"Process {os.getpid()} using {torch_threads} torch / {cv2_threads} OpenCV thread(s)")
+
+
+def prepare_worker_model(model, torch_threads):
+    """Give ONNX models a session of their own sized for a worker process"""
+    from .onnx_utils import OnnxPoseModel
+
+    if isinstance(model, OnnxPoseModel):
+        # onnxruntime sessions don't survive fork, and their thread pools
+        # are sized at creation time
+        return OnnxPoseModel(model.onnx_path, model.imgsz, model.conf, model.iou,
+                             intra_op_threads=torch_threads)
+    return model
+
+
+def _worker_main(index, task_queue, result_queue, process_entries, worker_init,
+                 batch_size, max_wait, torch_threads, cv2_threads):
+    """Entry point of a forked worker process"""
+    configure_threads(torch_threads, cv2_threads)
+    reset_minio_connections()
+    if worker_init:
+        worker_init(index, torch_threads)
+    r = initialize_redis()
+    logger.info(f"Worker {index} (pid {os.getpid()}) ready")
+    # No entry ids: tells the supervisor this worker has loaded and warmed up
+    result_queue.put((index, None, 0.0))
+
+    while True:
+        entries = [task_queue.get()]
+        deadline = time.time() + max_wait
+        while len(entries) < batch_size:
+            try:
+                entries.append(task_queue.get(timeout=max(0.0, deadline - time.time())))
+            except queue.Empty:
+                break
+
+        start_time = time.time()
+        try:
+            process_entries(r, entries)
+        except Exception as e:
+            logger.error(f"Worker {index} failed on a batch: {e}", exc_info=True)
+        result_queue.put((index, [entry_id for entry_id, _ in entries], time.time() - start_time))
+
+
+class WorkerPool:
+    """
+    Supervisor that fans frames out to forked inference worker processes.
+
+    The model is loaded once in the supervisor before forking, so workers
+    share its weights copy-on-write instead of each holding a private copy.
+    The supervisor owns the input transport: it reads entries, hands them to
+    workers over per-worker queues and acknowledges them once the worker
+    reports the batch done. Frames from the same camera always go to the
+    same worker so per-camera state such as the motion gate keeps working.
+    Workers that exit are restarted; their in-flight stream entries are
+    released to the transport, stay pending and are reclaimed.
+
+    process_entries(redis_client, entries) is called in the worker with a
+    list of (entry_id, data) tuples and must publish a result or error for
+    each of them. worker_init(index, torch_threads), if given, runs once in
+    every worker after forking, e.g. to swap in a per-worker ONNX session
+    with prepare_worker_model; a worker reports ready (see all_ready) once
+    it has returned.
+    """
+
+    def __init__(self, transport, process_entries, processes=None, batch_size=1, max_wait=0.0,
+                 queue_size=None, torch_threads=None, cv2_threads=None, worker_init=None):
+        self.transport = transport
+        self.process_entries = process_entries
+        self.worker_init = worker_init
+        self.processes = max(1, processes or WORKER_CONFIG["processes"])
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.queue_size = queue_size or WORKER_CONFIG["queue_size"]
+        self.torch_threads, self.cv2_threads = get_thread_counts(self.processes, torch_threads, cv2_threads)
+        self.restart_delay = WORKER_CONFIG["restart_delay"]
+        # Fork so workers inherit the loaded model instead of re-loading it
+        self._context = multiprocessing.get_context('fork')
+        self.result_queue = self._context.Queue()
+        self.workers = [None] * self.processes
+        self.task_queues = [None] * self.processes
+        self.frames = [0] * self.processes
+        self.busy_time = [0.0] * self.processes
+        self.restarts = [0] * self.processes
+        self.ready = [False] * self.processes
+        # Entry ids handed to each worker and not reported done yet
+        self.in_flight = [set() for _ in range(self.processes)]
+        self._interval_frames = [0] * self.processes
+        self._interval_start = time.time()
+        self._next_worker = 0
+
+    def start(self):
+        """Fork all worker processes"""
+        # Move everything allocated so far out of the garbage collector's
+        # reach, so collections in the workers don't write to (and copy) the
+        # pages holding the shared model
+        gc.collect()
+        gc.freeze()
+        for index in range(self.processes):
+            self._start_worker(index)
+            QUEUE_DEPTH.set_function(lambda index=index: self._queue_depth(index), queue=f"worker-{index}")
+        logger.info(
+            f"Started {self.processes} worker process(es) with {self.torch_threads} torch / "
+            f"{self.cv2_threads} OpenCV thread(s) each, batch size {self.batch_size}"
+        )
+
+    def _start_worker(self, index):
+        """Fork (or re-fork) one worker with a fresh task queue"""
+        # A worker killed mid-get can leave its queue's lock held, never reuse it
+        self.task_queues[index] = self._context.Queue(maxsize=self.queue_size)
+        self.ready[index] = False
+        process = self._context.Process(
+            target=_worker_main,
+            name=f"ai-worker-{index}",
+            args=(index, self.task_queues[index], self.result_queue, self.process_entries,
+                  self.worker_init, self.batch_size, self.max_wait,
+                  self.torch_threads, self.cv2_threads),
+            daemon=True
+        )
+        process.start()
+        self.workers[index] = process
+
+    def _queue_depth(self, index):
+        try:
+            return self.task_queues[index].qsize()
+        except NotImplementedError:
+            return None
+
+    def _route(self, data):
+        """Pick the worker for an entry, keeping each camera on one worker"""
+        try:
+            camera_id = parse_frame_message(data).get('camera_id')
+        except Exception:
+            camera_id = None
+        if camera_id is None:
+            self._next_worker = (self._next_worker + 1) % self.processes
+            return self._next_worker
+        return zlib.crc32(str(camera_id).encode('utf-8')) % self.processes
+
+    def submit(self, entry_id, data):
+        """Hand an entry to its worker, blocking while that worker's queue is full"""
+        index = self._route(data)
+        while True:
+            try:
+                self.task_queues[index].put((entry_id, data), timeout=0.5)
+                if entry_id is not None:
+                    self.in_flight[index].add(entry_id)
+                return
+            except queue.Full:
+                # Keep acknowledging and supervising while we wait
+                self.poll()
+
+    def poll(self):
+        """Acknowledge finished batches and restart workers that exited"""
+        while True:
+            try:
+                index, entry_ids, busy_time = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry_ids is None:
+                logger.info(f"Worker {index} finished initializing")
+                self.ready[index] = True
+                continue
+            self.in_flight[index].difference_update(entry_ids)
+            self.transport.ack(entry_ids)
+            self.frames[index] += len(entry_ids)
+            self._interval_frames[index] += len(entry_ids)
+            self.busy_time[index] += busy_time
+            WORKER_FRAMES.inc(len(entry_ids), worker=index)
+
+        for index, process in enumerate(self.workers):
+            if process.is_alive():
+                continue
+            logger.error(f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+            self.restarts[index] += 1
+            WORKER_RESTARTS.inc(worker=index)
+            self.transport.release(list(self.in_flight[index]))
+            self.in_flight[index].clear()
+            time.sleep(self.restart_delay)
+            self._start_worker(index)
+
+    def all_ready(self):
+        """Whether every worker has finished worker_init since it was (re)started"""
+        return all(self.ready)
+
+    def get_stats(self):
+        """Get per-worker throughput since the last call, totals and restarts"""
+        now = time.time()
+        elapsed = now - self._interval_start
+        workers = {}
+        for index, process in enumerate(self.workers):
+            throughput = self._interval_frames[index] / elapsed if elapsed > 0 else 0.0
+            WORKER_THROUGHPUT.set(throughput, worker=index)
+            workers[index] = {
+                'pid': process.pid,
+                'frames': self.frames[index],
+                'throughput_fps': round(throughput, 2),
+                'busy_ms_per_frame': round(self.busy_time[index] / self.frames[index] * 1000, 1)
+                if self.frames[index] else 0.0,
+                'queued': self._queue_depth(index),
+                'ready': self.ready[index],
+                'restarts': self.restarts[index]
+            }
+        self._interval_frames = [0] * self.processes
+        self._interval_start = now
+        return {
+            'throughput_fps': round(sum(w['throughput_fps'] for w in workers.values()), 2),
+            'workers': workers
+        }
+
+    def stop(self):
+        """Terminate all worker processes"""
+        for process in self.workers:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.workers:
+            if process is not None:
+                process.join(timeout=5)
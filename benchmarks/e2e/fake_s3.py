@@ -0,0 +1,182 @@
+"""
+Local stand-in for the parts of the S3 API the services use.
+
+Supports bucket HEAD/PUT (including ?policy and ?location), object PUT/GET/HEAD
+and ListObjectsV2. Objects live in memory and request signatures are not
+checked, so any access key works. Presigned URLs resolve like plain GETs.
+
+Usage:
+    python benchmarks/e2e/fake_s3.py [--port 9000]
+"""
+import argparse
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape
+
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class ObjectStore:
+    """Thread-safe in-memory buckets of (data, content type, last modified, etag)"""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.requests = {}
+
+    def count(self, operation):
+        with self.lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path).lstrip('/')
+        bucket, _, key = path.partition('/')
+        return bucket, key, parse_qs(parts.query, keep_blank_values=True)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=b"", content_type="application/xml", headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, code, resource):
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code>'
+            f'<Message>{code}</Message><Resource>/{escape(resource)}</Resource><RequestId>fake</RequestId></Error>'
+        ).encode('utf-8')
+        self._send(status, body)
+
+    def do_HEAD(self):
+        bucket, key, _ = self._route()
+        with self.store.lock:
+            objects = self.store.buckets.get(bucket)
+            entry = objects.get(key) if objects is not None and key else None
+        if objects is None or (key and entry is None):
+            self._send(404)
+            return
+        if not key:
+            self._send(200)
+            return
+        data, content_type, last_modified, etag = entry
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', f'"{etag}"')
+        self.send_header('Last-Modified', last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        self.end_headers()
+
+    def do_PUT(self):
+        bucket, key, query = self._route()
+        body = self._read_body()
+        if not key:
+            # make_bucket, or set_bucket_policy which is accepted and ignored
+            with self.store.lock:
+                if 'policy' not in query:
+                    self.store.buckets.setdefault(bucket, {})
+            self._send(204 if 'policy' in query else 200)
+            return
+
+        etag = hashlib.md5(body).hexdigest()
+        with self.store.lock:
+            objects = self.store.buckets.get(bucket)
+            if objects is not None:
+                content_type = self.headers.get('Content-Type', 'application/octet-stream')
+                objects[key] = (body, content_type, datetime.now(timezone.utc), etag)
+        if objects is None:
+            self._error(404, "NoSuchBucket", bucket)
+            return
+        self.store.count('put')
+        self._send(200, headers={'ETag': f'"{etag}"'})
+
+    def do_GET(self):
+        bucket, key, query = self._route()
+        if not key and 'location' in query:
+            self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><LocationConstraint xmlns="{S3_NAMESPACE}"/>'
+                       .encode('utf-8'))
+            return
+        with self.store.lock:
+            objects = self.store.buckets.get(bucket)
+            if objects is None:
+                missing = ("NoSuchBucket", bucket)
+            elif key and key not in objects:
+                missing = ("NoSuchKey", f"{bucket}/{key}")
+            else:
+                missing = None
+                entry = objects.get(key) if key else None
+                listing = None if key else sorted(objects.items())
+        if missing:
+            self._error(404, *missing)
+            return
+        if key:
+            self.store.count('get')
+            data, content_type, last_modified, etag = entry
+            self._send(200, data, content_type, {'ETag': f'"{etag}"'})
+            return
+        self.store.count('list')
+        self._send(200, self._list_objects(bucket, listing, query))
+
+    def _list_objects(self, bucket, listing, query):
+        """ListObjectsV2 response"""
+        prefix = query.get('prefix', [''])[0]
+        start_after = query.get('continuation-token', query.get('start-after', ['']))[0]
+        max_keys = int(query.get('max-keys', ['1000'])[0])
+        matching = [(key, entry) for key, entry in listing if key.startswith(prefix) and key > start_after]
+        page, truncated = matching[:max_keys], len(matching) > max_keys
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key>"
+            f"<LastModified>{last_modified.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]}Z</LastModified>"
+            f"<ETag>&quot;{etag}&quot;</ETag><Size>{len(data)}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+            for key, (data, _, last_modified, etag) in page
+        )
+        next_token = f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>" if truncated else ""
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{S3_NAMESPACE}">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>"
+            f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+            f"{contents}{next_token}</ListBucketResult>"
+        ).encode('utf-8')
+
+
+def start_fake_s3(host="127.0.0.1", port=0):
+    """
+    Serve a fresh in-memory object store on a daemon thread.
+
+    Returns:
+        tuple: (server, store); server.server_address has the bound port
+    """
+    store = ObjectStore()
+    handler = type("BoundS3Handler", (S3Handler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-s3", daemon=True).start()
+    return server, store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    server, _ = start_fake_s3(args.host, args.port)
+    print(f"Fake S3 listening on {args.host}:{server.server_address[1]}")
+    threading.Event().wait()
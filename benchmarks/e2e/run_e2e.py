@@ -0,0 +1,594 @@
+"""
+End-to-end benchmark of the frame path across frame-service and ai-service.
+
+Starts a local redis-server, an S3 stand-in (fake_s3.py, or an existing
+MinIO with --s3-endpoint) and both services against them. It then publishes
+synthetic multi-camera Aktar frames on sync_frame at a fixed rate and
+timestamps every frame at each hop:
+
+    ingest     sync_frame publish -> message on ai_channel (frame-service, MinIO upload)
+    inference  ai_channel -> result on ai_results (ai-service)
+    broadcast  ai_results -> WebSocket message from frame-service
+    total      sync_frame publish -> WebSocket message
+
+The report has throughput, p50/p95/p99 per hop, ai-service stage times and
+CPU / RSS per process. It is written as JSON so runs can be compared across
+commits. Service settings (MODEL_BACKEND, FRAME_PAYLOAD, ...) are taken from
+the environment.
+
+Usage:
+    python benchmarks/e2e/run_e2e.py [--cameras 4] [--fps 5] [--width 1280] [--height 720]
+        [--duration 60] [--images dir/] [--redis-port N] [--s3-endpoint host:port]
+        [--output e2e.json]
+    python benchmarks/e2e/run_e2e.py compare base.json candidate.json
+
+Requires redis-server on PATH (or --redis-port of a running server) and the
+Python dependencies of both services. CPU / RSS sampling reads /proc (Linux).
+"""
+import argparse
+import ast
+import asyncio
+import base64
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+import redis
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HOPS = ("ingest", "inference", "broadcast", "total")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision():
+    """Commit and dirty flag of the tree under test"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "-uno"], cwd=REPO_ROOT, text=True))
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def decode_payload(payload):
+    """Decode a Redis message in any of the services' codec formats (see utils/codec_utils.py)"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    header, body = payload[:4], payload[4:]
+    if header == b"NF1j":
+        return orjson.loads(body) if orjson else json.loads(body)
+    if header == b"NF1m":
+        return msgpack.unpackb(body, raw=False)
+    text = payload.decode('utf-8')
+    try:
+        return json.loads(text)
+    except ValueError:
+        return ast.literal_eval(text)
+
+
+def wait_until(check, timeout, interval=0.5, what="condition"):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(interval)
+    raise TimeoutError(f"Timed out after {timeout}s waiting for {what}")
+
+
+def http_ok(url):
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return response.status == 200
+
+
+class ManagedProcess:
+    """Subprocess with its output captured to a log file"""
+
+    def __init__(self, name, cmd, cwd, env, log_dir):
+        self.name = name
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def check_alive(self):
+        if self.process.poll() is not None:
+            raise RuntimeError(f"{self.name} exited with code {self.process.returncode}, see {self.log_path}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of each process tree from /proc once per interval"""
+
+    def __init__(self, processes, interval=1.0):
+        self.processes = processes
+        self.interval = interval
+        self.samples = {name: [] for name in processes}
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    @staticmethod
+    def _tree(pid):
+        pids, stack = [], [pid]
+        while stack:
+            current = stack.pop()
+            pids.append(current)
+            try:
+                for tid in os.listdir(f"/proc/{current}/task"):
+                    with open(f"/proc/{current}/task/{tid}/children") as f:
+                        stack.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+    def _usage(self, pid):
+        """(cpu seconds, rss bytes) of a process tree"""
+        cpu, rss = 0.0, 0
+        for member in self._tree(pid):
+            try:
+                with open(f"/proc/{member}/stat") as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+                with open(f"/proc/{member}/statm") as f:
+                    resident = int(f.read().split()[1])
+            except (OSError, IndexError):
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+            rss += resident * self._page_size
+        return cpu, rss
+
+    def _run(self):
+        previous = {name: (self._usage(pid), time.time()) for name, pid in self.processes.items()}
+        while not self._stop.wait(self.interval):
+            for name, pid in self.processes.items():
+                (cpu, rss), now = self._usage(pid), time.time()
+                (previous_cpu, _), previous_time = previous[name]
+                cpu_percent = max(0.0, cpu - previous_cpu) / (now - previous_time) * 100
+                self.samples[name].append((cpu_percent, rss))
+                previous[name] = ((cpu, rss), now)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        summary = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            cpu = np.array([sample[0] for sample in samples])
+            rss = np.array([sample[1] for sample in samples]) / (1024 * 1024)
+            summary[name] = {
+                'cpu_percent_mean': float(cpu.mean()),
+                'cpu_percent_max': float(cpu.max()),
+                'rss_mb_mean': float(rss.mean()),
+                'rss_mb_max': float(rss.max())
+            }
+        return summary
+
+
+def synthetic_frames(camera, width, height, count=30):
+    """A short loop of frames with a moving figure-sized shape on a noisy background"""
+    rng = np.random.default_rng(camera)
+    background = rng.integers(40, 200, (height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 5)
+    frames = []
+    for i in range(count):
+        img = background.copy()
+        x = int((i / count) * (width - width // 8))
+        cv2.rectangle(img, (x, height // 3), (x + width // 16, height // 3 + height // 3), (30, 30, 160), -1)
+        cv2.circle(img, (x + width // 32, height // 3 - height // 20), height // 20, (60, 120, 200), -1)
+        frames.append(img)
+    return frames
+
+
+def image_frames(paths, width, height):
+    frames = []
+    for name in sorted(os.listdir(paths)):
+        img = cv2.imread(os.path.join(paths, name), cv2.IMREAD_COLOR)
+        if img is not None:
+            frames.append(cv2.resize(img, (width, height)))
+    if not frames:
+        raise ValueError(f"No readable images in {paths}")
+    return frames
+
+
+class Recorder:
+    """Thread-safe per-frame hop timestamps keyed by frame filename"""
+
+    def __init__(self):
+        self.times = {}
+        self.stage_times = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def mark(self, filename, hop, timestamp=None):
+        with self._lock:
+            self.times.setdefault(filename, {}).setdefault(hop, timestamp or time.time())
+
+    def result(self, data, timestamp):
+        filename = data.get('original_filename') or data.get('filename')
+        if data.get('status') == 'error':
+            with self._lock:
+                self.errors += 1
+            return
+        self.mark(filename, 'result', timestamp)
+        with self._lock:
+            self.stage_times[filename] = data.get('stage_times') or {}
+
+
+def drive(redis_client, recorder, frames_by_camera, fps, duration, quality, stop):
+    """Publish Aktar frames for every camera fps times per second"""
+    encoded = {
+        camera: [base64.b64encode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1]).decode('ascii')
+                 for img in frames]
+        for camera, frames in frames_by_camera.items()
+    }
+    start_time = time.time()
+    tick = 0
+    while not stop.is_set() and time.time() - start_time < duration:
+        for camera, payloads in encoded.items():
+            timestamp = datetime.now(timezone.utc).isoformat()
+            filename = f"{camera}_{timestamp.replace(':', '-').replace('.', '-')}.jpg"
+            message = json.dumps({'timestamp': timestamp, 'camera_id': camera}) + "--AKTAR--" + payloads[tick % len(payloads)]
+            recorder.mark(filename, 'sent')
+            redis_client.publish("sync_frame", message)
+        tick += 1
+        delay = start_time + tick / fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    return time.time() - start_time
+
+
+def observe_ai_channel(redis_client, recorder, transport, stop):
+    """Record when each frame message reaches ai-service's input"""
+    if transport == "streams":
+        stream = os.getenv("REDIS_STREAM_INPUT", "ai_stream")
+        last_id = "$"
+        while not stop.is_set():
+            for _, entries in redis_client.xread({stream: last_id}, block=500) or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    recorder.mark(decode_payload(fields[b'data'])['filename'], 'ingested')
+        return
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("ai_channel")
+    while not stop.is_set():
+        message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.5)
+        if message and message['type'] == 'message':
+            recorder.mark(decode_payload(message['data'])['filename'], 'ingested')
+    pubsub.close()
+
+
+def observe_results(redis_client, recorder, stop):
+    """Record when each result is published by ai-service"""
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("ai_results")
+    while not stop.is_set():
+        message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.5)
+        if message and message['type'] == 'message':
+            recorder.result(decode_payload(message['data']), time.time())
+    pubsub.close()
+
+
+def observe_websocket(url, recorder, stop, connected):
+    """Record when each result is broadcast to WebSocket clients"""
+    import websockets
+
+    async def listen():
+        async with websockets.connect(url, max_size=None) as websocket:
+            connected.set()
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(websocket.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                received = time.time()
+                message = json.loads(raw)
+                if message.get('type') == 'ai_result':
+                    data = message.get('data', {})
+                    if data.get('status') != 'error':
+                        recorder.mark(data.get('original_filename'), 'broadcast', received)
+
+    asyncio.run(listen())
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = np.array(values) * 1000
+    return {
+        'count': int(len(values)),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max())
+    }
+
+
+def build_report(recorder, drive_time, elapsed):
+    hops = {hop: [] for hop in HOPS}
+    counts = {'sent': 0, 'ingested': 0, 'results': 0, 'broadcast': 0, 'errors': recorder.errors}
+    stage_values = {}
+    for filename, times in recorder.times.items():
+        if 'sent' not in times:
+            continue
+        counts['sent'] += 1
+        counts['ingested'] += 'ingested' in times
+        counts['results'] += 'result' in times
+        counts['broadcast'] += 'broadcast' in times
+        for hop, (start, end) in {
+            'ingest': ('sent', 'ingested'),
+            'inference': ('ingested', 'result'),
+            'broadcast': ('result', 'broadcast'),
+            'total': ('sent', 'broadcast')
+        }.items():
+            if start in times and end in times:
+                hops[hop].append(times[end] - times[start])
+        for stage, duration in recorder.stage_times.get(filename, {}).items():
+            stage_values.setdefault(stage, []).append(duration)
+
+    return {
+        'frames': counts,
+        'throughput_fps': {
+            'offered': counts['sent'] / drive_time if drive_time else 0.0,
+            'results': counts['results'] / elapsed if elapsed else 0.0,
+            'broadcast': counts['broadcast'] / elapsed if elapsed else 0.0
+        },
+        'latency': {hop: percentiles(values) for hop, values in hops.items()},
+        'ai_stages': {stage: percentiles(values) for stage, values in sorted(stage_values.items())}
+    }
+
+
+def print_report(report):
+    frames = report['frames']
+    print(f"\nFrames: sent={frames['sent']} ingested={frames['ingested']} results={frames['results']} "
+          f"broadcast={frames['broadcast']} errors={frames['errors']}")
+    throughput = report['throughput_fps']
+    print(f"Throughput: offered {throughput['offered']:.2f} fps, results {throughput['results']:.2f} fps, "
+          f"broadcast {throughput['broadcast']:.2f} fps")
+    print(f"\n{'hop':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for section in ('latency', 'ai_stages'):
+        for name, stats in report[section].items():
+            if stats['count']:
+                print(f"{name:<12}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                      f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+        print()
+    print(f"{'process':<14}{'cpu % mean':>12}{'cpu % max':>12}{'rss MB mean':>13}{'rss MB max':>12}")
+    for name, stats in report['resources'].items():
+        print(f"{name:<14}{stats['cpu_percent_mean']:>12.1f}{stats['cpu_percent_max']:>12.1f}"
+              f"{stats['rss_mb_mean']:>13.1f}{stats['rss_mb_max']:>12.1f}")
+
+
+def compare(base_path, candidate_path):
+    """Print the key metrics of two saved runs side by side"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    print(f"base:      {base.get('commit')} ({base.get('timestamp')})")
+    print(f"candidate: {candidate.get('commit')} ({candidate.get('timestamp')})\n")
+    rows = [('results fps', ('throughput_fps', 'results'))]
+    for hop in HOPS:
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            rows.append((f"{hop} {key}", ('latency', hop, key)))
+    for name in sorted(set(base.get('resources', {})) & set(candidate.get('resources', {}))):
+        rows.append((f"{name} cpu %", ('resources', name, 'cpu_percent_mean')))
+        rows.append((f"{name} rss MB", ('resources', name, 'rss_mb_max')))
+
+    def lookup(report, path):
+        for key in path:
+            report = report.get(key, {}) if isinstance(report, dict) else {}
+        return report if isinstance(report, (int, float)) else None
+
+    print(f"{'metric':<24}{'base':>12}{'candidate':>12}{'change':>10}")
+    for label, path in rows:
+        old, new = lookup(base, path), lookup(candidate, path)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{label:<24}{old:>12.2f}{new:>12.2f}{change:>10}")
+
+
+def run(args):
+    output_dir = os.path.dirname(os.path.abspath(args.output)) or "."
+    log_dir = os.path.join(output_dir, "e2e-logs")
+    os.makedirs(log_dir, exist_ok=True)
+    processes = []
+    try:
+        # Local Redis
+        redis_port = args.redis_port
+        if redis_port is None:
+            if not shutil.which("redis-server"):
+                sys.exit("redis-server not found on PATH, install it or pass --redis-port")
+            redis_port = free_port()
+            processes.append(ManagedProcess(
+                "redis", ["redis-server", "--port", str(redis_port), "--save", "", "--appendonly", "no"],
+                REPO_ROOT, os.environ.copy(), log_dir
+            ))
+        r = redis.Redis(host="127.0.0.1", port=redis_port)
+        wait_until(r.ping, 10, what="redis-server")
+
+        # Object store
+        env = dict(os.environ, REDIS_HOST="127.0.0.1", REDIS_PORT=str(redis_port), PYTHONUNBUFFERED="1")
+        if args.s3_endpoint:
+            env.update(MINIO_ENDPOINT=args.s3_endpoint)
+        else:
+            s3_port = free_port()
+            processes.append(ManagedProcess(
+                "fake-s3", [sys.executable, os.path.join(os.path.dirname(__file__), "fake_s3.py"), "--port", str(s3_port)],
+                REPO_ROOT, os.environ.copy(), log_dir
+            ))
+            env.update(MINIO_ENDPOINT=f"127.0.0.1:{s3_port}", MINIO_SECURE="false",
+                       MINIO_ACCESS_KEY="bench", MINIO_SECRET_KEY="bench-secret")
+
+        # Services
+        metrics_port, frame_port = free_port(), free_port()
+        ai_service = ManagedProcess(
+            "ai-service", [sys.executable, "main.py"], os.path.join(REPO_ROOT, "ai-service"),
+            dict(env, METRICS_HOST="127.0.0.1", METRICS_PORT=str(metrics_port)), log_dir
+        )
+        frame_service = ManagedProcess(
+            "frame-service",
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(frame_port)],
+            os.path.join(REPO_ROOT, "frame-service"), env, log_dir
+        )
+        processes.extend([ai_service, frame_service])
+
+        def services_ready():
+            for process in processes:
+                process.check_alive()
+            return (http_ok(f"http://127.0.0.1:{metrics_port}/ready")
+                    and http_ok(f"http://127.0.0.1:{frame_port}/health")
+                    and r.pubsub_numsub("sync_frame")[0][1] >= 1
+                    and r.pubsub_numsub("ai_results")[0][1] >= 1)
+
+        print(f"Starting services (logs in {log_dir})")
+        startup_time = time.time()
+        wait_until(services_ready, args.startup_timeout, what="services to become ready")
+        startup_time = time.time() - startup_time
+        print(f"Services ready after {startup_time:.1f}s")
+
+        recorder = Recorder()
+        stop = threading.Event()
+        connected = threading.Event()
+        observers = [
+            threading.Thread(target=observe_ai_channel, daemon=True,
+                             args=(redis.Redis(host="127.0.0.1", port=redis_port), recorder,
+                                   os.getenv("REDIS_TRANSPORT", "pubsub"), stop)),
+            threading.Thread(target=observe_results, daemon=True,
+                             args=(redis.Redis(host="127.0.0.1", port=redis_port), recorder, stop)),
+            threading.Thread(target=observe_websocket, daemon=True,
+                             args=(f"ws://127.0.0.1:{frame_port}/ws/ai_results", recorder, stop, connected))
+        ]
+        for observer in observers:
+            observer.start()
+        if not connected.wait(10):
+            raise TimeoutError("Could not connect to the frame-service WebSocket")
+        time.sleep(0.5)  # let the subscriptions settle
+
+        if args.images:
+            source = image_frames(args.images, args.width, args.height)
+            frames_by_camera = {f"cam{i}": source for i in range(args.cameras)}
+        else:
+            frames_by_camera = {f"cam{i}": synthetic_frames(i, args.width, args.height) for i in range(args.cameras)}
+
+        sampler = ResourceSampler({process.name: process.pid for process in processes})
+        sampler.start()
+        print(f"Driving {args.cameras} camera(s) at {args.fps} fps ({args.width}x{args.height}) for {args.duration}s")
+        start_time = time.time()
+        drive_time = drive(r, recorder, frames_by_camera, args.fps, args.duration, args.jpeg_quality, stop)
+
+        # Wait for in-flight frames to come out the other end
+        deadline = time.time() + args.drain
+        while time.time() < deadline:
+            pending = sum(1 for times in recorder.times.values() if 'broadcast' not in times)
+            if pending <= recorder.errors:
+                break
+            time.sleep(0.5)
+        elapsed = time.time() - start_time
+        stop.set()
+        sampler.stop()
+
+        commit, dirty = git_revision()
+        report = dict(
+            commit=commit,
+            dirty=dirty,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            config={
+                'cameras': args.cameras, 'fps': args.fps, 'width': args.width, 'height': args.height,
+                'duration': args.duration, 'jpeg_quality': args.jpeg_quality, 'images': args.images,
+                'object_store': args.s3_endpoint or 'fake_s3',
+                'env': {key: value for key, value in os.environ.items() if key in SERVICE_SETTINGS}
+            },
+            startup_seconds=startup_time,
+            **build_report(recorder, drive_time, elapsed),
+            resources=sampler.summary()
+        )
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"\nWrote report to {args.output}")
+    finally:
+        for process in reversed(processes):
+            process.stop()
+
+
+# Environment settings recorded with each run so reports are comparable
+SERVICE_SETTINGS = {
+    "MODEL_BACKEND", "MODEL_QUANTIZATION", "MODEL_BATCH_SIZE", "MODEL_DEVICE", "PIPELINE_ENABLED",
+    "WORKER_PROCESSES", "LATEST_FRAME_ONLY", "MOTION_GATE_ENABLED", "OUTPUT_FORMAT", "OUTPUT_QUALITY",
+    "REDIS_TRANSPORT", "FRAME_PAYLOAD", "MESSAGE_CODEC", "URL_MODE"
+}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="run_e2e.py compare")
+        parser.add_argument("base")
+        parser.add_argument("candidate")
+        args = parser.parse_args(sys.argv[2:])
+        compare(args.base, args.candidate)
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=5.0, help="Frames per second per camera")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--jpeg-quality", type=int, default=85)
+    parser.add_argument("--images", help="Directory of real frames to send instead of synthetic ones")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to send frames for")
+    parser.add_argument("--drain", type=float, default=30.0, help="Seconds to wait for in-flight frames")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--redis-port", type=int, default=None, help="Use a running local Redis")
+    parser.add_argument("--s3-endpoint", default=None,
+                        help="Use this MinIO endpoint (credentials from the environment) instead of fake_s3")
+    parser.add_argument("--output", default="e2e-results.json")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from datetime import datetime
+from typing import Optional
 import io
 from PIL import Image
 import base64
@@ -11,11 +12,15 @@ import base64
 from utils import (
     # Configuration
     WEBSOCKET_CONFIG,
+    FRAME_PAYLOAD_CONFIG,
+    INDEX_CONFIG,
     
     # Redis utilities
     initialize_redis,
     subscribe_to_channel,
     publish_message,
+    publish_ai_frame,
+    stash_frame,
     get_message_with_timeout,
     safe_redis_operation,
     REDIS_CHANNEL_SYNC_FRAME,
@@ -23,16 +28,26 @@ from utils import (
     
     # MinIO utilities
     get_object,
-    put_object,
-    get_presigned_url,
-    list_objects,
+    put_object_async,
+    put_object_in_background,
+    get_pending_uploads,
+    get_presigned_urls_async,
+    get_io_stats,
+    url_signer,
     MINIO_BUCKET,
-    ensure_bucket_exists,
+    MINIO_BUCKET_PROCESSED,
+    ensure_bucket_exists_async,
+    
+    # Recent object index
+    RecentObjectIndex,
+    warm_up_index,
+    start_bucket_notifications,
     
     # WebSocket utilities
     ConnectionManager,
     
     # Frame utilities
+    encode_frame_to_base64,
     format_frame_message,
     format_ai_result_message,
     parse_message_data,
@@ -70,6 +85,17 @@ app.add_middleware(
 # Initialize connection manager
 manager = ConnectionManager()
 
+# Newest processed images and raw frames per camera, behind the image endpoints
+processed_index = RecentObjectIndex(MINIO_BUCKET_PROCESSED, prefix="processed_")
+frame_index = RecentObjectIndex(MINIO_BUCKET)
+
+def index_when_stored(upload: asyncio.Task, filename: str, **metadata):
+    """Add a frame to the index once its background upload has succeeded"""
+    def on_done(task):
+        if not task.cancelled() and task.exception() is None and task.result() is not None:
+            frame_index.add(filename, **metadata)
+    upload.add_done_callback(on_done)
+
 async def frame_listener():
     """Background task to listen for new frames from Redis"""
     logger.info("Starting frame listener task")
@@ -110,25 +136,46 @@ async def frame_listener():
                             timestamp = frame_data['timestamp']
                             camera_id = frame_data['camera_id']
                             
-                            # Upload to MinIO
-                            put_object(
-                                MINIO_BUCKET, 
-                                filename, 
-                                image_data, 
-                                content_type="image/jpeg"
-                            )
+                            ai_message = {
+                                'bucket': MINIO_BUCKET,
+                                'filename': filename,
+                                'timestamp': timestamp,
+                                'camera_id': camera_id,
+                                'upload_time': datetime.now().isoformat()
+                            }
+                            
+                            # Hand ai-service the frame bytes directly when configured
+                            payload_mode = FRAME_PAYLOAD_CONFIG["mode"]
+                            if payload_mode == "inline" and len(image_data) <= FRAME_PAYLOAD_CONFIG["max_inline_bytes"]:
+                                ai_message['image_b64'] = encode_frame_to_base64(image_data)
+                            elif payload_mode == "redis_key":
+                                frame_key = await stash_frame(redis_client, filename, image_data)
+                                if frame_key:
+                                    ai_message['frame_key'] = frame_key
+                            
+                            frame_metadata = {'camera_id': camera_id, 'timestamp': timestamp, 'size': len(image_data)}
+                            if 'image_b64' in ai_message or 'frame_key' in ai_message:
+                                # Persist for the record, off the critical path
+                                upload = put_object_in_background(
+                                    MINIO_BUCKET, filename, image_data, content_type="image/jpeg"
+                                )
+                                if upload is not None:
+                                    index_when_stored(upload, filename, **frame_metadata)
+                            else:
+                                # ai-service downloads the frame, so it must be stored first
+                                stored = await put_object_async(
+                                    MINIO_BUCKET, 
+                                    filename, 
+                                    image_data, 
+                                    content_type="image/jpeg"
+                                )
+                                if stored is not None:
+                                    frame_index.add(filename, **frame_metadata)
                             
                             # Publish to AI channel
                             try:
-                                ai_message = {
-                                    'bucket': MINIO_BUCKET,
-                                    'filename': filename,
-                                    'timestamp': timestamp,
-                                    'camera_id': camera_id,
-                                    'upload_time': datetime.now().isoformat()
-                                }
-                                await publish_message(redis_client, 'ai_channel', str(ai_message))
-                                logger.info(f"Published to AI channel: {filename}")
+                                await publish_ai_frame(redis_client, ai_message)
+                                logger.info(f"Published to AI service: {filename}")
                             except Exception as e:
                                 logger.error(f"Failed to publish to AI channel: {e}")
                 
@@ -185,6 +232,8 @@ async def ai_result_listener():
                         result_message = format_ai_result_message(message['data'])
                         
                         if result_message:
+                            processed_index.add_result(result_message['data'])
+                            
                             # Broadcast to all connected clients
                             await manager.broadcast(result_message)
                             logger.info(f"Broadcasted AI result: {result_message.get('data', {}).get('processed_filename', 'unknown')}")
@@ -270,6 +319,13 @@ async def health_check():
             "status": "healthy",
             "redis_connected": redis_ok,
             "websocket_clients": connection_stats,
+            "pending_frame_uploads": get_pending_uploads(),
+            "minio_io": get_io_stats(),
+            "url_cache": url_signer.get_stats(),
+            "recent_objects": {
+                "processed": processed_index.get_stats(),
+                "frames": frame_index.get_stats()
+            },
             "server_time": datetime.now().isoformat()
         }
     except Exception as e:
@@ -280,60 +336,27 @@ async def health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+async def format_recent_images(index, limit, camera_id=None, since=None, until=None):
+    """Newest objects of a recent object index with their URLs, newest first"""
+    entries = index.latest(max(0, limit), camera_id, since, until)
+    urls = await get_presigned_urls_async(index.bucket, [entry['object_name'] for entry in entries])
+    results = []
+    for entry, url in zip(entries, urls):
+        metadata = dict(entry['metadata'])
+        metadata['last_modified'] = entry['last_modified'].isoformat()
+        results.append({
+            'filename': entry['object_name'],
+            'url': url,
+            'metadata': metadata
+        })
+    return results
+
 @app.get("/api/latest-processed-images")
-async def get_latest_processed_images(limit: int = 5):
+async def get_latest_processed_images(limit: int = 5, camera_id: Optional[str] = None,
+                                      since: Optional[datetime] = None, until: Optional[datetime] = None):
     """Get the latest processed images from the AI results bucket"""
     try:
-        # Get the AI results bucket name from config
-        # This assumes the AI service is storing processed images in a specific bucket
-        processed_bucket = "yolo-images"  # You might want to add this to your config
-        
-        # List objects in the bucket, sorted by last modified time (newest first)
-        objects = list_objects(processed_bucket)
-        
-        # Sort objects by last modified time (newest first)
-        sorted_objects = sorted(
-            objects, 
-            key=lambda obj: obj.last_modified, 
-            reverse=True
-        )[:limit]
-        
-        # Generate presigned URLs for each object
-        results = []
-        for obj in sorted_objects:
-            # Generate a presigned URL
-            url = get_presigned_url(processed_bucket, obj.object_name)
-            
-            # Extract timestamp and camera_id from filename if possible
-            filename = obj.object_name
-            metadata = {}
-            
-            # Try to parse metadata from filename (assuming format like camera_id_timestamp.jpg)
-            try:
-                parts = filename.split('_')
-                if len(parts) >= 2:
-                    camera_id = parts[0]
-                    timestamp_str = '_'.join(parts[1:]).replace('.jpg', '')
-                    
-                    metadata = {
-                        'camera_id': camera_id,
-                        'timestamp': timestamp_str.replace('-', ':'),
-                        'size': obj.size,
-                        'last_modified': obj.last_modified.isoformat()
-                    }
-            except:
-                # If parsing fails, just use basic metadata
-                metadata = {
-                    'size': obj.size,
-                    'last_modified': obj.last_modified.isoformat()
-                }
-            
-            results.append({
-                'filename': filename,
-                'url': url,
-                'metadata': metadata
-            })
-        
+        results = await format_recent_images(processed_index, limit, camera_id, since, until)
         return {
             'status': 'success',
             'count': len(results),
@@ -349,56 +372,11 @@ async def get_latest_processed_images(limit: int = 5):
         }
 
 @app.get("/images")
-async def get_latest_frames(limit: int = 5):
+async def get_latest_frames(limit: int = 5, camera_id: Optional[str] = None,
+                            since: Optional[datetime] = None, until: Optional[datetime] = None):
     """Get the latest raw frames from the frames bucket"""
     try:
-        processed_bucket = "yolo-images"
-        # List objects in the frames bucket, sorted by last modified time (newest first)
-        objects = list_objects(processed_bucket)
-        
-        # Sort objects by last modified time (newest first)
-        sorted_objects = sorted(
-            objects, 
-            key=lambda obj: obj.last_modified, 
-            reverse=True
-        )[:limit]
-        
-        # Generate presigned URLs for each object
-        results = []
-        for obj in sorted_objects:
-            # Generate a presigned URL
-            url = get_presigned_url(MINIO_BUCKET, obj.object_name)
-            
-            # Extract timestamp and camera_id from filename if possible
-            filename = obj.object_name
-            metadata = {}
-            
-            # Try to parse metadata from filename (assuming format like camera_id_timestamp.jpg)
-            try:
-                parts = filename.split('_')
-                if len(parts) >= 2:
-                    camera_id = parts[0]
-                    timestamp_str = '_'.join(parts[1:]).replace('.jpg', '')
-                    
-                    metadata = {
-                        'camera_id': camera_id,
-                        'timestamp': timestamp_str.replace('-', ':'),
-                        'size': obj.size,
-                        'last_modified': obj.last_modified.isoformat()
-                    }
-            except:
-                # If parsing fails, just use basic metadata
-                metadata = {
-                    'size': obj.size,
-                    'last_modified': obj.last_modified.isoformat()
-                }
-            
-            results.append({
-                'filename': filename,
-                'url': url,
-                'metadata': metadata
-            })
-        
+        results = await format_recent_images(frame_index, limit, camera_id, since, until)
         return {
             'status': 'success',
             'count': len(results),
@@ -417,7 +395,16 @@ async def get_latest_frames(limit: int = 5):
 async def startup_event():
     """Start background tasks on application startup"""
     # Ensure bucket exists
-    ensure_bucket_exists(MINIO_BUCKET)
+    await ensure_bucket_exists_async(MINIO_BUCKET)
+    
+    # Fill the recent object indexes, then keep them current
+    for index in (processed_index, frame_index):
+        if INDEX_CONFIG["warmup"]:
+            asyncio.create_task(warm_up_index(index))
+        else:
+            index.ready = True
+        if INDEX_CONFIG["notifications"]:
+            start_bucket_notifications(index)
     
     # Start background tasks
     asyncio.create_task(ai_result_listener())
@@ -1,24 +1,58 @@
 # This file makes the utils directory a Python package
-from .config import MINIO_CONFIG, REDIS_CONFIG, WEBSOCKET_CONFIG
+from .config import (
+    MINIO_CONFIG,
+    URL_CONFIG,
+    REDIS_CONFIG,
+    CODEC_CONFIG,
+    FRAME_PAYLOAD_CONFIG,
+    WEBSOCKET_CONFIG,
+    INDEX_CONFIG
+)
 from .redis_utils import (
     initialize_redis,
     subscribe_to_channel,
     publish_message,
+    append_to_stream,
+    publish_ai_frame,
+    stash_frame,
     get_message_with_timeout,
     safe_redis_operation,
     REDIS_CHANNEL_SYNC_FRAME,
-    REDIS_CHANNEL_AI_RESULTS
+    REDIS_CHANNEL_AI_RESULTS,
+    REDIS_CHANNEL_AI_FRAMES
 )
 from .minio_utils import (
     get_object,
     put_object,
+    put_object_async,
+    put_object_in_background,
+    get_pending_uploads,
     get_presigned_url,
     list_objects,
+    iter_objects,
     ensure_bucket_exists,
+    run_minio_io,
+    get_object_async,
+    list_objects_async,
+    get_presigned_urls_async,
+    ensure_bucket_exists_async,
+    get_io_stats,
+    UploadLimiter,
+    upload_limiter,
     minio_client,
-    MINIO_BUCKET
+    url_signer,
+    MINIO_BUCKET,
+    MINIO_BUCKET_PROCESSED
+)
+from .url_utils import UrlSigner
+from .index_utils import (
+    RecentObjectIndex,
+    parse_object_name,
+    warm_up_index,
+    start_bucket_notifications
 )
 from .websocket_utils import ConnectionManager
+from .codec_utils import encode_message, decode_message
 from .frame_utils import (
     encode_frame_to_base64,
     format_frame_message,
@@ -36,30 +70,63 @@ from .error_utils import (
 __all__ = [
     # Configuration
     'MINIO_CONFIG',
+    'URL_CONFIG',
     'REDIS_CONFIG',
+    'CODEC_CONFIG',
+    'FRAME_PAYLOAD_CONFIG',
     'WEBSOCKET_CONFIG',
+    'INDEX_CONFIG',
     
     # Redis utilities
     'initialize_redis',
     'subscribe_to_channel',
     'publish_message',
+    'append_to_stream',
+    'publish_ai_frame',
+    'stash_frame',
     'get_message_with_timeout',
     'safe_redis_operation',
     'REDIS_CHANNEL_SYNC_FRAME',
     'REDIS_CHANNEL_AI_RESULTS',
+    'REDIS_CHANNEL_AI_FRAMES',
     
     # MinIO utilities
     'get_object',
     'put_object',
+    'put_object_async',
+    'put_object_in_background',
+    'get_pending_uploads',
     'get_presigned_url',
     'list_objects',
+    'iter_objects',
     'ensure_bucket_exists',
+    'run_minio_io',
+    'get_object_async',
+    'list_objects_async',
+    'get_presigned_urls_async',
+    'ensure_bucket_exists_async',
+    'get_io_stats',
+    'UploadLimiter',
+    'upload_limiter',
     'minio_client',
+    'url_signer',
+    'UrlSigner',
     'MINIO_BUCKET',
+    'MINIO_BUCKET_PROCESSED',
+    
+    # Recent object index
+    'RecentObjectIndex',
+    'parse_object_name',
+    'warm_up_index',
+    'start_bucket_notifications',
     
     # WebSocket utilities
     'ConnectionManager',
     
+    # Message codec
+    'encode_message',
+    'decode_message',
+    
     # Frame utilities
     'encode_frame_to_base64',
     'format_frame_message',
@@ -6,7 +6,46 @@ MINIO_CONFIG = {
     "access_key": os.getenv("MINIO_ACCESS_KEY", "negar-dev"),
     "secret_key": os.getenv("MINIO_SECRET_KEY", "negar-dev"),
     "secure": os.getenv("MINIO_SECURE", "True").lower() == "true",
-    "bucket": "frames"
+    "bucket": "frames",
+    # Where ai-service stores annotated frames
+    "processed_bucket": os.getenv("MINIO_BUCKET_PROCESSED", "yolo-images"),
+    # Set to skip the bucket location lookup before the first presigned URL
+    "region": os.getenv("MINIO_REGION") or None,
+    # Threads running blocking MinIO calls off the event loop; the HTTP
+    # connection pool is sized to match
+    "io_threads": int(os.getenv("MINIO_IO_THREADS", "16")),
+    # Uploads running at once; further uploads wait for a slot
+    "upload_concurrency": int(os.getenv("MINIO_UPLOAD_CONCURRENCY", "8")),
+    # Background uploads allowed to wait for a slot before new ones are dropped (0 = no limit)
+    "max_queued_uploads": int(os.getenv("MINIO_MAX_QUEUED_UPLOADS", "500")),
+    "connect_timeout": float(os.getenv("MINIO_CONNECT_TIMEOUT", "5")),  # seconds
+    "read_timeout": float(os.getenv("MINIO_READ_TIMEOUT", "30"))  # seconds
+}
+
+# Object URL configuration
+URL_CONFIG = {
+    # "presigned" signs every URL; "public" builds plain URLs for public-read buckets
+    "mode": os.getenv("URL_MODE", "presigned").lower(),
+    "expires": int(os.getenv("URL_EXPIRES", "3600")),  # seconds
+    # Presigned URLs are reused within a window, so they are handed out with
+    # at least expires - window seconds left
+    "window": int(os.getenv("URL_SIGNING_WINDOW", "900")),  # seconds
+    "max_entries": int(os.getenv("URL_CACHE_SIZE", "10000")),
+    # ai-service's ensure_bucket_exists makes these buckets public-read
+    "public_buckets": [bucket for bucket in os.getenv("URL_PUBLIC_BUCKETS", "frames,yolo-images").split(",") if bucket],
+    # Base for public URLs, e.g. a CDN; defaults to the MinIO endpoint
+    "public_base_url": os.getenv("URL_PUBLIC_BASE_URL", "")
+}
+
+# Recent object index behind /images and /api/latest-processed-images
+INDEX_CONFIG = {
+    # Newest objects kept per camera, and cameras kept per bucket
+    "per_camera": int(os.getenv("INDEX_PER_CAMERA", "100")),
+    "max_cameras": int(os.getenv("INDEX_MAX_CAMERAS", "1000")),
+    # List each bucket once at startup to fill the index
+    "warmup": os.getenv("INDEX_WARMUP", "true").lower() == "true",
+    # Also follow MinIO bucket notifications, for objects written by others
+    "notifications": os.getenv("INDEX_BUCKET_NOTIFICATIONS", "false").lower() == "true"
 }
 
 # Redis configuration
@@ -16,10 +55,38 @@ REDIS_CONFIG = {
     "db": int(os.getenv('REDIS_DB', 0)),
     "channels": {
         "sync_frame": "sync_frame",
-        "ai_results": "ai_results"
+        "ai_results": "ai_results",
+        "ai_frames": "ai_channel"
+    },
+    # Frame transport to ai-service: "pubsub" (default) or "streams"
+    "transport": os.getenv("REDIS_TRANSPORT", "pubsub").lower(),
+    "streams": {
+        "ai_frames": os.getenv("REDIS_STREAM_INPUT", "ai_stream"),
+        # Approximate cap on the stream length, older entries are trimmed
+        "maxlen": int(os.getenv("REDIS_STREAM_MAXLEN", "10000"))
     }
 }
 
+# Redis message codec configuration
+CODEC_CONFIG = {
+    # Encoding for published messages: "json", "msgpack" or "legacy" (str(dict));
+    # every format is always accepted when decoding
+    "codec": os.getenv("MESSAGE_CODEC", "json").lower()
+}
+
+# Frame payload handed to ai-service
+FRAME_PAYLOAD_CONFIG = {
+    # "minio": upload to MinIO first and send only bucket/filename
+    # "inline": send the JPEG base64-encoded in the ai_channel message
+    # "redis_key": store the JPEG under a short-lived Redis key and send the key
+    # With "inline" and "redis_key" the MinIO upload happens in the background
+    "mode": os.getenv("FRAME_PAYLOAD", "minio").lower(),
+    "key_prefix": os.getenv("FRAME_KEY_PREFIX", "frame:"),
+    "key_ttl": int(os.getenv("FRAME_KEY_TTL", "30")),  # seconds
+    # Larger frames are sent by reference even in inline mode
+    "max_inline_bytes": int(os.getenv("FRAME_MAX_INLINE_BYTES", str(2 * 1024 * 1024)))
+}
+
 # WebSocket configuration
 WEBSOCKET_CONFIG = {
     "cors_origins": [
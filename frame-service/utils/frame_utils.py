@@ -3,8 +3,8 @@ import base64
 from datetime import datetime
 import io
 from typing import Dict, Optional, Any, Union
-import json
 from .error_utils import async_error_handler
+from .codec_utils import decode_message
 
 logger = logging.getLogger(__name__)
 
@@ -41,24 +41,14 @@ def format_frame_message(filename: str, frame_data, timestamp=None, metadata=Non
     return message
 
 def parse_message_data(data: Union[str, bytes, Dict]) -> Dict:
-    """Parse message data from various formats to a dictionary"""
+    """Parse message data from any codec format (or plain JSON) to a dictionary"""
+    if not isinstance(data, (str, bytes, dict)):
+        raise ValueError(f"Unsupported data type: {type(data)}")
     try:
-        if isinstance(data, dict):
-            return data
-        elif isinstance(data, str):
-            return json.loads(data)
-        elif isinstance(data, bytes):
-            return json.loads(data.decode('utf-8'))
-        else:
-            raise ValueError(f"Unsupported data type: {type(data)}")
-    except json.JSONDecodeError:
-        # Try with eval as fallback for string representation of dict
-        try:
-            import ast
-            return ast.literal_eval(data) if isinstance(data, str) else ast.literal_eval(data.decode('utf-8'))
-        except:
-            logger.error(f"Failed to parse message data: {data[:100]}...")
-            raise
+        return decode_message(data)
+    except Exception:
+        logger.error(f"Failed to parse message data: {data[:100]}...")
+        raise
 
 def format_ai_result_message(result_data):
     """Format an AI result message for broadcasting"""
@@ -0,0 +1,310 @@
+"""
+In-memory index of the most recent objects per camera.
+
+Listing a bucket and sorting every object by last_modified to show the
+newest few gets slower as the bucket grows. Instead, the objects that
+frame-service stores or hears about (ai_results messages, optional MinIO
+bucket notifications) are added to a bounded, sorted list per camera,
+after a one-time scan of the bucket at startup. Lookups then touch at
+most limit entries per camera.
+"""
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+from .config import INDEX_CONFIG
+from .minio_utils import minio_client, iter_objects, run_minio_io
+
+logger = logging.getLogger(__name__)
+
+# Objects whose name doesn't start with a camera id
+UNKNOWN_CAMERA = "unknown"
+
+# Sorts after every object name, for bisecting entries by time alone
+_LAST_NAME = chr(0x10FFFF)
+
+
+def _to_epoch(value) -> Optional[float]:
+    """Seconds since the epoch of a datetime, ISO string or number; naive times are local"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value.timestamp()
+
+
+def _event_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse the eventTime of a bucket notification, e.g. 2024-01-01T12:00:00.000Z"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _timestamp_from_name(timestamp: str) -> str:
+    """Undo the ':' and '.' -> '-' replacement of frame filenames where the format allows it"""
+    date, separator, clock = timestamp.partition('T')
+    if not separator:
+        return timestamp.replace('-', ':')
+    parts = clock.split('-')
+    if len(parts) >= 3 and all(part.isdigit() for part in parts[:3]):
+        clock = ':'.join(parts[:3]) + ('.' + '-'.join(parts[3:]) if len(parts) > 3 else '')
+    return f"{date}T{clock}"
+
+
+def parse_object_name(object_name: str, prefix: str = "") -> Dict:
+    """
+    Camera id and capture timestamp from a "{camera_id}_{timestamp}.jpg" name.
+
+    Args:
+        object_name: Object name, e.g. "processed_cam1_2024-01-01T12-00-00-000000.webp"
+        prefix: Prefix added to the frame filename, e.g. "processed_"
+
+    Returns:
+        dict: camera_id and timestamp, empty when the name doesn't follow the format
+    """
+    name = os.path.basename(object_name)
+    if prefix and name.startswith(prefix):
+        name = name[len(prefix):]
+    # Timestamps have no underscores, camera ids may
+    camera_id, separator, timestamp = os.path.splitext(name)[0].rpartition('_')
+    if not separator or not camera_id or not timestamp:
+        return {}
+    return {'camera_id': camera_id, 'timestamp': _timestamp_from_name(timestamp)}
+
+
+def _newest_first(entries: List, end: int):
+    """Entries before end, from the newest"""
+    for i in range(end - 1, -1, -1):
+        yield entries[i]
+
+
+class RecentObjectIndex:
+    """
+    Bounded index of the newest objects of a bucket, per camera.
+
+    Each camera keeps its newest per_camera entries sorted by time; when
+    more than max_cameras cameras are known, the camera that was updated
+    longest ago is dropped. Adding an object that is already indexed merges
+    the new metadata into its entry, so the startup scan, notifications
+    and result messages can all report the same object.
+
+    Safe to use from the event loop and worker threads at the same time.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", per_camera: Optional[int] = None,
+                 max_cameras: Optional[int] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.per_camera = per_camera or INDEX_CONFIG["per_camera"]
+        self.max_cameras = max_cameras or INDEX_CONFIG["max_cameras"]
+        # camera_id -> (time, object name, metadata) entries, sorted; names are
+        # unique, so metadata never takes part in the comparison
+        self._cameras: Dict[str, List] = {}
+        # object name -> entry of every indexed object
+        self._objects: Dict[str, tuple] = {}
+        self._updated: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+        self.added = 0
+        self.scanned = 0
+
+    def add(self, object_name: str, last_modified=None, **metadata):
+        """
+        Index an object, or update the metadata of an indexed one.
+
+        Args:
+            object_name: Object name in the bucket
+            last_modified: When the object was written (datetime, ISO string or
+                           epoch seconds), defaults to now
+            metadata: camera_id, timestamp, size and any other fields returned
+                      by lookups; camera_id and timestamp are parsed from the
+                      name when missing
+        """
+        modified = _to_epoch(last_modified)
+        if modified is None:
+            modified = time.time()
+        for key, value in parse_object_name(object_name, self.prefix).items():
+            metadata.setdefault(key, value)
+        camera_id = str(metadata.get('camera_id') or UNKNOWN_CAMERA)
+        metadata = {key: value for key, value in metadata.items() if value is not None}
+
+        with self._lock:
+            indexed = self._objects.get(object_name)
+            if indexed is not None:
+                indexed[2].update(metadata)
+                return
+
+            entries = self._cameras.get(camera_id)
+            if entries is None:
+                if len(self._cameras) >= self.max_cameras:
+                    self._drop_camera(min(self._updated, key=self._updated.get))
+                entries = self._cameras[camera_id] = []
+            elif len(entries) >= self.per_camera and (modified, object_name) <= entries[0][:2]:
+                # Older than anything kept for this camera
+                return
+
+            entry = (modified, object_name, metadata)
+            bisect.insort(entries, entry)
+            self._objects[object_name] = entry
+            if len(entries) > self.per_camera:
+                del self._objects[entries.pop(0)[1]]
+            self._updated[camera_id] = max(modified, self._updated.get(camera_id, modified))
+            self.added += 1
+
+    def _drop_camera(self, camera_id: str):
+        for _, object_name, _ in self._cameras.pop(camera_id):
+            del self._objects[object_name]
+        del self._updated[camera_id]
+
+    def add_result(self, result: Dict) -> bool:
+        """
+        Index the processed image of an ai_results message.
+
+        Returns:
+            bool: Whether the message referred to a processed image of this bucket
+        """
+        object_name = result.get('processed_filename')
+        if result.get('status') == 'error' or not object_name:
+            return False
+        if result.get('processed_bucket', self.bucket) != self.bucket:
+            return False
+
+        metadata = parse_object_name(result.get('original_filename') or '')
+        detections = result.get('detections') or {}
+        self.add(
+            object_name,
+            result.get('timestamp'),
+            total_persons=detections.get('total_persons'),
+            processing_time=result.get('processing_time'),
+            original_filename=result.get('original_filename'),
+            **metadata
+        )
+        return True
+
+    def scan(self, objects) -> int:
+        """
+        Index a bucket listing, keeping only what fits the index.
+
+        Args:
+            objects: Iterable of MinIO objects (object_name, last_modified, size)
+
+        Returns:
+            int: Number of objects scanned
+        """
+        count = 0
+        for obj in objects:
+            if getattr(obj, 'is_dir', False):
+                continue
+            self.add(obj.object_name, obj.last_modified, size=obj.size)
+            count += 1
+        with self._lock:
+            self.scanned += count
+            self.ready = True
+        return count
+
+    def latest(self, limit: int = 5, camera_id: Optional[str] = None,
+               since=None, until=None) -> List[Dict]:
+        """
+        Newest indexed objects, newest first.
+
+        Args:
+            limit: Maximum number of objects
+            camera_id: Only objects of this camera
+            since: Only objects written at or after this time
+            until: Only objects written at or before this time
+
+        Returns:
+            list: {'object_name', 'last_modified', 'metadata'} dicts
+        """
+        since, until = _to_epoch(since), _to_epoch(until)
+        with self._lock:
+            if camera_id is not None:
+                cameras = [self._cameras.get(str(camera_id), [])]
+            else:
+                cameras = list(self._cameras.values())
+            # Walk every camera from its newest entry, skipping anything after until
+            walks = []
+            for entries in cameras:
+                end = len(entries)
+                if until is not None:
+                    end = bisect.bisect_right(entries, (until, _LAST_NAME))
+                walks.append(_newest_first(entries, end))
+
+            results = []
+            for modified, object_name, metadata in heapq.merge(*walks, key=lambda item: item[:2], reverse=True):
+                if len(results) >= limit or (since is not None and modified < since):
+                    break
+                results.append({
+                    'object_name': object_name,
+                    'last_modified': datetime.fromtimestamp(modified, timezone.utc),
+                    'metadata': dict(metadata)
+                })
+        return results
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'bucket': self.bucket,
+                'ready': self.ready,
+                'cameras': len(self._cameras),
+                'objects': len(self._objects),
+                'added': self.added,
+                'scanned': self.scanned
+            }
+
+
+async def warm_up_index(index: RecentObjectIndex) -> int:
+    """Fill the index from one listing of its bucket, on the MinIO I/O threads"""
+    start_time = time.time()
+    count = await run_minio_io(index.scan, iter_objects(index.bucket, index.prefix))
+    stats = index.get_stats()
+    logger.info(
+        f"Indexed {stats['objects']} recent object(s) of {stats['cameras']} camera(s) "
+        f"from {count} in {index.bucket} in {time.time() - start_time:.1f}s"
+    )
+    return count
+
+
+def follow_bucket_notifications(index: RecentObjectIndex, retry_delay: float = 5):
+    """
+    Add objects created in the index's bucket as MinIO reports them.
+
+    Blocks forever, reconnecting after errors; run it in its own thread.
+    """
+    while True:
+        try:
+            with minio_client.listen_bucket_notification(
+                index.bucket, prefix=index.prefix, events=["s3:ObjectCreated:*"]
+            ) as events:
+                logger.info(f"Listening for new objects in {index.bucket}")
+                for event in events:
+                    for record in event.get('Records', []):
+                        obj = record.get('s3', {}).get('object', {})
+                        if obj.get('key'):
+                            index.add(unquote(obj['key']), _event_time(record.get('eventTime')), size=obj.get('size'))
+        except Exception as e:
+            logger.error(f"Error listening for bucket notifications on {index.bucket}: {e}")
+        time.sleep(retry_delay)
+
+
+def start_bucket_notifications(index: RecentObjectIndex) -> threading.Thread:
+    """Follow the index's bucket notifications in a daemon thread"""
+    thread = threading.Thread(
+        target=follow_bucket_notifications, args=(index,),
+        name=f"notifications-{index.bucket}", daemon=True
+    )
+    thread.start()
+    return thread
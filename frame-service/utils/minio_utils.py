@@ -1,9 +1,16 @@
+import asyncio
+import functools
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import certifi
+import urllib3
 from minio import Minio
-from datetime import timedelta
 import io
 from typing import Union, Optional
 from .config import MINIO_CONFIG
+from .url_utils import UrlSigner
 from .error_utils import async_error_handler
 
 logger = logging.getLogger(__name__)
@@ -14,15 +21,34 @@ MINIO_ACCESS_KEY = MINIO_CONFIG["access_key"]
 MINIO_SECRET_KEY = MINIO_CONFIG["secret_key"]
 MINIO_SECURE = MINIO_CONFIG["secure"]
 MINIO_BUCKET = MINIO_CONFIG["bucket"]
+MINIO_BUCKET_PROCESSED = MINIO_CONFIG["processed_bucket"]
+MINIO_IO_THREADS = MINIO_CONFIG["io_threads"]
+
+# One pooled connection per I/O thread, so no thread waits on or discards a connection
+_http_client = urllib3.PoolManager(
+    maxsize=MINIO_IO_THREADS,
+    timeout=urllib3.Timeout(connect=MINIO_CONFIG["connect_timeout"], read=MINIO_CONFIG["read_timeout"]),
+    cert_reqs="CERT_REQUIRED",
+    ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+    retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+)
 
 # Initialize MinIO client
 minio_client = Minio(
     MINIO_ENDPOINT,
     access_key=MINIO_ACCESS_KEY,
     secret_key=MINIO_SECRET_KEY,
-    secure=MINIO_SECURE
+    secure=MINIO_SECURE,
+    region=MINIO_CONFIG["region"],
+    http_client=_http_client
 )
 
+# Blocking MinIO calls run here instead of on the event loop
+_io_executor = ThreadPoolExecutor(max_workers=MINIO_IO_THREADS, thread_name_prefix="minio")
+
+# Cached presigned / public object URLs
+url_signer = UrlSigner(minio_client, MINIO_ENDPOINT, MINIO_SECURE)
+
 def get_object(bucket_name, object_name):
     """Get an object from MinIO"""
     try:
@@ -59,15 +85,167 @@ def put_object(bucket_name: str, object_name: str, data: Union[bytes, io.BytesIO
         logger.error(f"Error uploading {object_name} to bucket {bucket_name}: {e}")
         return None
 
+# MinIO calls submitted to the I/O threads and not finished yet, running or waiting for a thread
+_io_calls = 0
+
+async def run_minio_io(func, *args, **kwargs):
+    """Run a blocking MinIO call on the MinIO I/O threads and wait for it without blocking the event loop"""
+    global _io_calls
+    loop = asyncio.get_running_loop()
+    _io_calls += 1
+    try:
+        return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        _io_calls -= 1
+
+class UploadLimiter:
+    """
+    Caps the number of uploads running at once and keeps queueing stats.
+
+    Uploads beyond the limit wait for a slot in arrival order. Only used
+    from the event loop thread.
+    """
+    
+    def __init__(self, concurrency=None, max_queued=None):
+        self.concurrency = concurrency or MINIO_CONFIG["upload_concurrency"]
+        self.max_queued = max_queued if max_queued is not None else MINIO_CONFIG["max_queued_uploads"]
+        # Created on first use, inside the running event loop
+        self._semaphore = None
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.upload_time = 0.0
+    
+    def is_full(self):
+        """Whether the wait queue is at its limit"""
+        return bool(self.max_queued) and self.queued >= self.max_queued
+    
+    def enqueue(self):
+        """Count an upload as waiting from the moment it is scheduled, before its task runs"""
+        self.queued += 1
+    
+    async def run(self, upload, *args, enqueued=False):
+        """
+        Run a blocking upload on the MinIO I/O threads once a slot is free.
+        
+        Args:
+            upload: Blocking upload function, returning None on failure
+            args: Arguments for upload
+            enqueued: Whether enqueue() already counted this upload
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        
+        start_time = time.perf_counter()
+        if not enqueued:
+            self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        wait_time = time.perf_counter() - start_time
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        
+        self.in_flight += 1
+        start_time = time.perf_counter()
+        try:
+            result = await run_minio_io(upload, *args)
+        finally:
+            self.in_flight -= 1
+            self.upload_time += time.perf_counter() - start_time
+            self._semaphore.release()
+        if result is None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        return result
+    
+    def get_stats(self):
+        finished = self.completed + self.failed
+        return {
+            'concurrency': self.concurrency,
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_wait_ms': self.wait_time / finished * 1000 if finished else 0.0,
+            'max_wait_ms': self.max_wait_time * 1000,
+            'avg_upload_ms': self.upload_time / finished * 1000 if finished else 0.0
+        }
+
+upload_limiter = UploadLimiter()
+
+# Strong references to in-flight background uploads, so they aren't garbage collected
+_background_uploads = set()
+
+async def put_object_async(bucket_name: str, object_name: str, data: Union[bytes, io.BytesIO],
+                           content_length: Optional[int] = None, content_type: str = "application/octet-stream",
+                           enqueued: bool = False):
+    """Upload an object to MinIO without blocking the event loop, within the upload concurrency limit"""
+    return await upload_limiter.run(
+        put_object, bucket_name, object_name, data, content_length, content_type, enqueued=enqueued
+    )
+
+def put_object_in_background(bucket_name: str, object_name: str, data: Union[bytes, io.BytesIO],
+                             content_type: str = "application/octet-stream"):
+    """
+    Schedule an upload to MinIO off the critical path and return its task.
+    
+    Returns None without uploading when too many uploads are already waiting.
+    """
+    if upload_limiter.is_full():
+        upload_limiter.rejected += 1
+        logger.warning(f"Upload queue full, dropping upload of {object_name} to bucket {bucket_name}")
+        return None
+    upload_limiter.enqueue()
+    task = asyncio.create_task(
+        put_object_async(bucket_name, object_name, data, content_type=content_type, enqueued=True)
+    )
+    _background_uploads.add(task)
+    task.add_done_callback(_background_uploads.discard)
+    return task
+
+def get_pending_uploads():
+    """Number of background uploads still in flight"""
+    return len(_background_uploads)
+
+async def get_object_async(bucket_name, object_name):
+    """Get an object from MinIO without blocking the event loop"""
+    return await run_minio_io(get_object, bucket_name, object_name)
+
+async def list_objects_async(bucket_name, prefix="", recursive=True):
+    """List objects in a bucket without blocking the event loop"""
+    return await run_minio_io(list_objects, bucket_name, prefix, recursive)
+
+async def get_presigned_urls_async(bucket_name, object_names, expires=3600):
+    """Presigned URLs for several objects, signed together off the event loop"""
+    return await run_minio_io(
+        lambda: [get_presigned_url(bucket_name, object_name, expires) for object_name in object_names]
+    )
+
+async def ensure_bucket_exists_async(bucket_name):
+    """Create a bucket if it doesn't exist, without blocking the event loop"""
+    return await run_minio_io(ensure_bucket_exists, bucket_name)
+
+def get_io_stats():
+    """Upload queueing and I/O thread stats"""
+    return {
+        'io_threads': MINIO_IO_THREADS,
+        'io_calls': _io_calls,
+        'background_uploads': len(_background_uploads),
+        'uploads': upload_limiter.get_stats()
+    }
+
 def get_presigned_url(bucket_name, object_name, expires=3600):
     """Generate a presigned URL for an object"""
     try:
-        url = minio_client.presigned_get_object(
-            bucket_name=bucket_name,
-            object_name=object_name,
-            expires=timedelta(seconds=expires)
-        )
-        return url
+        return url_signer.get_url(bucket_name, object_name, expires)
     except Exception as e:
         logger.error(f"Error generating presigned URL for {object_name}: {e}")
         return f"https://{MINIO_ENDPOINT}/{bucket_name}/{object_name}"
@@ -85,6 +263,10 @@ def list_objects(bucket_name, prefix="", recursive=True):
         logger.error(f"Error listing objects in bucket {bucket_name}: {e}")
         return []
 
+def iter_objects(bucket_name, prefix="", recursive=True):
+    """Iterate over the objects in a bucket page by page, without holding the whole listing"""
+    return minio_client.list_objects(bucket_name, prefix=prefix, recursive=recursive)
+
 def ensure_bucket_exists(bucket_name):
     """Create bucket if it doesn't exist"""
     try:
@@ -1,8 +1,8 @@
 import logging
 import redis.asyncio as redis
-import json
-from .config import REDIS_CONFIG
+from .config import REDIS_CONFIG, FRAME_PAYLOAD_CONFIG
 from .error_utils import retry_async_operation, async_error_handler
+from .codec_utils import encode_message
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +12,12 @@ REDIS_PORT = REDIS_CONFIG["port"]
 REDIS_DB = REDIS_CONFIG["db"]
 REDIS_CHANNEL_SYNC_FRAME = REDIS_CONFIG["channels"]["sync_frame"]
 REDIS_CHANNEL_AI_RESULTS = REDIS_CONFIG["channels"]["ai_results"]
+REDIS_CHANNEL_AI_FRAMES = REDIS_CONFIG["channels"]["ai_frames"]
+REDIS_TRANSPORT = REDIS_CONFIG["transport"]
+REDIS_STREAM_AI_FRAMES = REDIS_CONFIG["streams"]["ai_frames"]
+REDIS_STREAM_MAXLEN = REDIS_CONFIG["streams"]["maxlen"]
+FRAME_KEY_PREFIX = FRAME_PAYLOAD_CONFIG["key_prefix"]
+FRAME_KEY_TTL = FRAME_PAYLOAD_CONFIG["key_ttl"]
 
 # Redis connection pool
 _redis_pool = None
@@ -62,11 +68,38 @@ async def subscribe_to_channel(redis_client, channel):
 async def publish_message(redis_client, channel, message):
     """Publish a message to a Redis channel with error handling"""
     if isinstance(message, dict):
-        message = json.dumps(message)
+        message = encode_message(message)
     result = await redis_client.publish(channel, message)
     logger.info(f"Published message to channel: {channel}")
     return result
 
+@async_error_handler
+async def append_to_stream(redis_client, stream, message, maxlen=None):
+    """Append a message to a Redis stream, trimming it to roughly maxlen entries"""
+    if isinstance(message, dict):
+        message = encode_message(message)
+    entry_id = await redis_client.xadd(
+        stream,
+        {'data': message},
+        maxlen=maxlen or REDIS_STREAM_MAXLEN,
+        approximate=True
+    )
+    logger.info(f"Appended message to stream: {stream}")
+    return entry_id
+
+async def publish_ai_frame(redis_client, message):
+    """Hand a frame message to ai-service over the configured transport"""
+    if REDIS_TRANSPORT == "streams":
+        return await append_to_stream(redis_client, REDIS_STREAM_AI_FRAMES, message)
+    return await publish_message(redis_client, REDIS_CHANNEL_AI_FRAMES, message)
+
+@async_error_handler
+async def stash_frame(redis_client, filename, image_data, ttl=None):
+    """Store frame bytes under a short-lived key for ai-service and return the key"""
+    key = f"{FRAME_KEY_PREFIX}{filename}"
+    await redis_client.set(key, image_data, ex=ttl or FRAME_KEY_TTL)
+    return key
+
 @async_error_handler
 async def get_message_with_timeout(pubsub, timeout=1.0):
     """Get a message from a pubsub channel with timeout"""